@@ -1,3 +1,3 @@
 # Core package for TuxTechIaaC utilities
 
-__all__ = ['gpg_manager', 'iso_manager']
\ No newline at end of file
+__all__ = ['gpg_manager', 'iso_manager', 'openwrt']
\ No newline at end of file
@@ -1,4 +1,8 @@
-from .gpg_utils import GPGKeyManager
+from .gpg_utils import GPGError, GPGKeyManager
 from .git_gpg_setup import GitGPGSetup
+from .jobs import JobQueue, QueueFullError
+from .keyring import KeyIndex, KeyRecord, parse_colons
+from .signing import BatchSigner, PathError
 
-__all__ = ['GPGKeyManager', 'GitGPGSetup']
+__all__ = ['GPGError', 'GPGKeyManager', 'GitGPGSetup', 'JobQueue', 'QueueFullError',
+           'KeyIndex', 'KeyRecord', 'parse_colons', 'BatchSigner', 'PathError']
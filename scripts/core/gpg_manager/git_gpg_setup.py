@@ -15,16 +15,17 @@ from typing import Optional, Dict, List
 class GitGPGSetup:
     def __init__(self, gpg_manager):
         """Initialize with a GPGKeyManager instance."""
+        self.manager = gpg_manager
         self.gpg = gpg_manager.gpg
         self.gnupghome = gpg_manager.gnupghome
         
     def list_keys_for_git(self) -> List[Dict]:
         """List keys in a format suitable for Git configuration."""
         keys = []
-        for key in self.gpg.list_keys(True):  # List secret keys
+        for key in self.manager.list_keys(secret=True):  # Cached listing of secret keys
             key_info = {
                 'fingerprint': key['fingerprint'],
-                'key_id': key['keyid'],
+                'key_id': key['key_id'],
                 'uids': key['uids'],
                 'created': key.get('date'),
                 'expires': key.get('expires'),
@@ -1,6 +1,65 @@
 import gnupg
+import hashlib
 import os
-from typing import Dict, List, Optional
+import shutil
+import subprocess
+import threading
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .keyring import KeyIndex, parse_colons
+
+# Keyring files whose changes invalidate the cached key listings: the keybox
+# (GnuPG 2.1+), legacy keyrings and the secret key directory, whose mtime
+# changes whenever a secret key is added, replaced or removed
+KEYRING_FILES = ('pubring.kbx', 'pubring.gpg', 'secring.gpg', 'private-keys-v1.d')
+
+# Bytes moved per read/write when streaming key data to and from gpg
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Bytes read per chunk when hashing and signing files (multi-GB images)
+SIGN_CHUNK_SIZE = 1024 * 1024
+
+# Verification status keywords of gpg --status-fd and their messages
+# (the wording python-gnupg uses, see _verification_result)
+SIGNATURE_STATUSES = {
+    'GOODSIG': 'signature good',
+    'BADSIG': 'signature bad',
+    'EXPSIG': 'signature expired',
+    'EXPKEYSIG': 'signing key has expired',
+    'REVKEYSIG': 'signing key was revoked',
+    'ERRSIG': 'signature error',
+    'NO_PUBKEY': 'no public key',
+}
+
+# IMPORT_OK reason flags and IMPORT_PROBLEM codes (see doc/DETAILS in GnuPG)
+IMPORT_OK_REASONS = {
+    1: 'Entirely new key',
+    2: 'New user IDs',
+    4: 'New signatures',
+    8: 'New subkeys',
+    16: 'Contains private key',
+}
+IMPORT_PROBLEMS = {
+    '0': 'No specific reason given',
+    '1': 'Invalid Certificate',
+    '2': 'Issuer Certificate missing',
+    '3': 'Certificate Chain too long',
+    '4': 'Error storing certificate',
+}
+# Fields of the IMPORT_RES status line, in order
+IMPORT_COUNTS = ('count', 'no_user_id', 'imported', 'imported_rsa', 'unchanged',
+                 'n_uids', 'n_subk', 'n_sigs', 'n_revoc', 'sec_read', 'sec_imported',
+                 'sec_dups', 'skipped_new_keys', 'not_imported', 'skipped_v3_keys')
+
+
+class GPGError(Exception):
+    """Raised when a streaming gpg operation fails before producing any output."""
+
+    def __init__(self, message: str, missing: Optional[List[str]] = None):
+        super().__init__(message)
+        # Requested keys that are not in the keyring
+        self.missing = missing or []
+
 
 class GPGKeyManager:
     def __init__(self, gnupghome: str = None):
@@ -12,6 +71,9 @@ class GPGKeyManager:
         """
         self.gnupghome = gnupghome or os.path.join(os.path.expanduser('~'), '.gnupg')
         self.gpg = gnupg.GPG(gnupghome=self.gnupghome)
+        # secret flag -> (keyring stamp, key index)
+        self._key_cache: Dict[bool, Tuple[Tuple, KeyIndex]] = {}
+        self._cache_lock = threading.Lock()
         
     def generate_key(self, name: str, email: str, passphrase: str, key_type: str = 'RSA', 
                     key_length: int = 4096, expire_date: str = '1y') -> Dict:
@@ -39,6 +101,7 @@ class GPGKeyManager:
         )
         
         key = self.gpg.gen_key(input_data)
+        self.invalidate_cache()
         if key.fingerprint:
             # The key_id is the last 16 characters of the fingerprint
             key_id = key.fingerprint[-16:].upper()
@@ -56,34 +119,126 @@ class GPGKeyManager:
         """
         List all available GPG keys
         
+        Listings are cached until this manager changes the keyring or the
+        keyring files in ``gnupghome`` change on disk (see KEYRING_FILES), so
+        repeated calls cost a few stat() calls instead of a gpg process.
+        
         Args:
             secret: If True, list secret keys. Otherwise, list public keys.
             
         Returns:
             List of key information dictionaries with proper type conversion
         """
-        keys = self.gpg.list_keys(secret=secret)
-        result = []
-        for key in keys:
-            # Convert date and expires to integers, defaulting to 0 if empty or invalid
-            try:
-                date = int(key['date']) if key['date'] else 0
-            except (ValueError, TypeError):
-                date = 0
-                
+        return [record.to_dict() for record in self.key_index(secret).records]
+    
+    def key_index(self, secret: bool = False) -> KeyIndex:
+        """
+        Cached, indexed view of the public or secret keyring
+        
+        Args:
+            secret: If True, index secret keys. Otherwise, public keys.
+            
+        Returns:
+            KeyIndex shared between callers; treat it as read-only
+        """
+        # Stamp before listing: a change made while gpg runs shows up next time
+        stamp = self._keyring_stamp()
+        with self._cache_lock:
+            cached = self._key_cache.get(secret)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, KeyIndex(self._list_keys(secret)))
+            with self._cache_lock:
+                self._key_cache[secret] = cached
+        return cached[1]
+    
+    def search_keys(self, query: str = '', secret: bool = False, status: str = 'all',
+                    sort: str = 'keyring', page: int = 1, per_page: int = 50) -> Dict:
+        """
+        Search, filter and paginate keys (see KeyIndex.search)
+        
+        Args:
+            query: Fingerprint, key ID, email, or text to find in user IDs
+            secret: If True, search secret keys. Otherwise, public keys.
+            status: 'all', 'valid', 'expired', 'expiring' (within 30 days) or 'revoked'
+            sort: 'keyring', 'uid', 'created' or 'expires'
+            page: 1-based page number
+            per_page: Keys per page
+            
+        Returns:
+            Dictionary with the page of 'keys' (list_keys format), the 'total'
+            number of matches, 'page', 'per_page' and 'pages'
+        """
+        page, per_page = max(page, 1), max(per_page, 1)
+        total, records = self.key_index(secret).search(query, status, sort,
+                                                       offset=(page - 1) * per_page, limit=per_page)
+        return {
+            'keys': [record.to_dict() for record in records],
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': max((total + per_page - 1) // per_page, 1),
+        }
+    
+    def invalidate_cache(self) -> None:
+        """Drop the cached key listings, e.g. after changing the keyring behind our back."""
+        with self._cache_lock:
+            self._key_cache.clear()
+    
+    def _keyring_stamp(self) -> Tuple:
+        """Identity (mtime, size, inode) of every keyring file, None for missing ones."""
+        stamp = []
+        for name in KEYRING_FILES:
             try:
-                expires = int(key['expires']) if key['expires'] else 0
-            except (ValueError, TypeError):
-                expires = 0
-                
-            result.append({
-                'key_id': key['keyid'],
-                'fingerprint': key['fingerprint'],
-                'uids': key['uids'],
-                'date': date,
-                'expires': expires
-            })
-        return result
+                st = os.stat(os.path.join(self.gnupghome, name))
+                stamp.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+    
+    def _list_keys(self, secret: bool):
+        """
+        List keys with gpg, bypassing the cache
+        
+        The colon listing is parsed while gpg writes it (see keyring.parse_colons).
+        
+        Returns:
+            List of KeyRecord objects
+        """
+        cmd = self._gpg_command(
+            '--with-colons', '--fixed-list-mode', '--with-fingerprint',
+            '--list-secret-keys' if secret else '--list-keys'
+        )
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              encoding='utf-8', errors='replace') as process:
+            return list(parse_colons(process.stdout))
+    
+    def missing_keys(self, names: Iterable[str], secret: bool = False) -> List[str]:
+        """
+        Requested keys that are not in the keyring
+        
+        Names are looked up in the cached key index first; only names it does
+        not match (e.g. subkey fingerprints) are checked with gpg.
+        
+        Args:
+            names: Fingerprints, key IDs or emails
+            secret: If True, look for secret keys
+            
+        Returns:
+            The names no key matches, in the given order
+        """
+        index = self.key_index(secret)
+        missing = []
+        for name in names:
+            if index.search(name, limit=1)[0]:
+                continue
+            cmd = self._gpg_command('--with-colons', '--list-secret-keys' if secret else '--list-keys', '--', name)
+            if subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode != 0:
+                missing.append(name)
+        return missing
+    
+    def _gpg_command(self, *args: str) -> List[str]:
+        """Command line running this manager's gpg binary non-interactively on its home directory."""
+        return [self.gpg.gpgbinary, '--homedir', self.gnupghome, '--batch', '--no-tty', *args]
     
     def delete_key(self, fingerprint: str, secret: bool = False, passphrase: str = None) -> Dict:
         """
@@ -116,6 +271,8 @@ class GPGKeyManager:
             
         except Exception as e:
             return {'status': 'error', 'message': str(e), 'requires_passphrase': True}
+        finally:
+            self.invalidate_cache()
     
     def export_key(self, fingerprint: str, secret: bool = False, 
                   passphrase: str = None) -> str:
@@ -136,32 +293,13 @@ class GPGKeyManager:
                 if not passphrase:
                     return "Error: Passphrase is required to export secret keys"
                 
-                # Use --pinentry-mode loopback to allow passphrase input
-                import subprocess
-                cmd = [
-                    'gpg',
-                    '--batch',
-                    '--pinentry-mode', 'loopback',
-                    '--passphrase', passphrase,
-                    '--armor',
-                    '--export-secret-keys',
-                    fingerprint
-                ]
-                
-                result = subprocess.run(
-                    cmd,
-                    cwd=self.gnupghome,
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode != 0:
-                    error_msg = result.stderr or 'Unknown error exporting secret key'
-                    if 'bad passphrase' in error_msg.lower():
+                try:
+                    return b''.join(self.export_keys([fingerprint], secret=True,
+                                                     passphrase=passphrase)).decode('ascii')
+                except GPGError as e:
+                    if 'bad passphrase' in str(e).lower():
                         return "Error: Incorrect passphrase"
-                    return f"Error exporting key: {error_msg}"
-                    
-                return result.stdout
+                    return f"Error exporting key: {e}"
                 
             # For public key export, use the standard method
             return str(self.gpg.export_keys(fingerprint, secret=False))
@@ -169,6 +307,229 @@ class GPGKeyManager:
         except Exception as e:
             return f"Error exporting key: {str(e)}"
     
+    def verify_detached(self, data: bytes, signature: bytes) -> Dict:
+        """
+        Verify a detached signature over some data
+        
+        Args:
+            data: The signed data
+            signature: Binary or ASCII armored detached signature
+            
+        Returns:
+            Dictionary with verification result (see _verification_result)
+        """
+        import tempfile
+        with tempfile.NamedTemporaryFile(suffix='.sig', delete=False) as f:
+            f.write(signature)
+            sig_path = f.name
+        try:
+            return self._verification_result(self.gpg.verify_data(sig_path, data))
+        finally:
+            os.unlink(sig_path)
+    
+    def sign_detached(self, source: Union[str, os.PathLike, BinaryIO], key: str = None,
+                      passphrase: str = None, armor: bool = True, algorithm: str = 'sha256',
+                      chunk_size: int = SIGN_CHUNK_SIZE) -> Dict:
+        """
+        Create a detached signature over a file or stream
+        
+        The data is read once, in chunks: each chunk is added to a checksum and
+        piped to gpg, which hashes it and only hands the digest to gpg-agent for
+        the private key operation. Nothing is held in memory beyond one chunk,
+        however large the image.
+        
+        Args:
+            source: Path of the file to sign, or a binary file object (e.g. an upload)
+            key: Fingerprint, key ID or email of the signing key; None uses gpg's default key
+            passphrase: Passphrase for the key, unless gpg-agent has it cached or the key has none
+            armor: ASCII armored (.asc) instead of binary (.sig) signature
+            algorithm: hashlib algorithm of the checksum computed alongside
+            
+        Returns:
+            Dictionary with 'status', the 'signature' bytes, the data's 'size',
+            its 'digest' under 'algorithm' and gpg's 'message'
+        """
+        args = (['--armor'] if armor else []) + (['--local-user', key] if key else [])
+        returncode, out, err, digest, size = self._pipe_through(
+            args + ['--detach-sign', '--output', '-'], source, passphrase, algorithm, chunk_size)
+        ok = returncode == 0 and bool(out)
+        message = err.decode('utf-8', 'replace').strip()
+        return {
+            'status': 'success' if ok else 'failed',
+            'signature': out if ok else None,
+            'size': size,
+            'algorithm': algorithm,
+            'digest': digest,
+            'message': message if not ok else 'Data signed successfully'
+        }
+    
+    def verify_detached_file(self, source: Union[str, os.PathLike, BinaryIO], signature: bytes,
+                             algorithm: str = 'sha256', chunk_size: int = SIGN_CHUNK_SIZE) -> Dict:
+        """
+        Verify a detached signature over a file or stream without loading the data
+        
+        Args:
+            source: Path of the signed file, or a binary file object
+            signature: Binary or ASCII armored detached signature
+            algorithm: hashlib algorithm of the checksum computed alongside
+            
+        Returns:
+            Dictionary with verification result (see _verification_result) plus the
+            data's 'size' and 'digest'
+        """
+        import tempfile
+        with tempfile.NamedTemporaryFile(suffix='.sig', delete=False) as f:
+            f.write(signature)
+            sig_path = f.name
+        try:
+            returncode, out, _, digest, size = self._pipe_through(
+                ['--status-fd', '1', '--verify', sig_path, '-'], source, None, algorithm, chunk_size)
+        finally:
+            os.unlink(sig_path)
+        result = self._status_verification(out.decode('utf-8', 'replace'), returncode)
+        result.update(size=size, algorithm=algorithm, digest=digest)
+        return result
+    
+    def _pipe_through(self, args: List[str], source: Union[str, os.PathLike, BinaryIO],
+                      passphrase: Optional[str], algorithm: str,
+                      chunk_size: int) -> Tuple[int, bytes, bytes, Optional[str], int]:
+        """
+        Run gpg with ``source`` on its stdin, checksumming it on the way
+        
+        The passphrase travels over a pipe of its own (--passphrase-fd) since
+        stdin carries the data.
+        
+        Returns:
+            Tuple of gpg's exit code, stdout, stderr, the hex digest (None if gpg
+            stopped reading early) and the number of bytes sent
+        """
+        # The source is opened first: nothing else is left to clean up if that fails
+        owned = isinstance(source, (str, os.PathLike))
+        stream = open(source, 'rb') if owned else source
+        pass_fds = []
+        try:
+            if passphrase is not None:
+                read_fd, write_fd = os.pipe()
+                pass_fds.append(read_fd)
+                try:
+                    os.write(write_fd, passphrase.encode('utf-8') + b'\n')
+                finally:
+                    os.close(write_fd)
+                args = ['--pinentry-mode', 'loopback', '--passphrase-fd', str(read_fd)] + args
+            process = subprocess.Popen(self._gpg_command(*args), stdin=subprocess.PIPE,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       pass_fds=pass_fds)
+        except BaseException:
+            if owned:
+                stream.close()
+            raise
+        finally:
+            for fd in pass_fds:
+                os.close(fd)
+        
+        output = {}
+        readers = [threading.Thread(target=lambda name=name, pipe=pipe: output.__setitem__(name, pipe.read()),
+                                    daemon=True)
+                   for name, pipe in (('out', process.stdout), ('err', process.stderr))]
+        for reader in readers:
+            reader.start()
+        hasher = hashlib.new(algorithm)
+        size = 0
+        complete = False
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                size += len(chunk)
+                process.stdin.write(chunk)
+            process.stdin.close()
+            complete = True
+        except BrokenPipeError:
+            pass  # gpg gave up early; stderr says why
+        finally:
+            if owned:
+                stream.close()
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            # A failed source (e.g. an aborted upload) would leave gpg waiting for input forever
+            if not complete:
+                process.kill()
+            process.wait()
+            for reader in readers:
+                reader.join()
+            process.stdout.close()
+            process.stderr.close()
+        return (process.returncode, output.get('out', b''), output.get('err', b''),
+                hasher.hexdigest() if complete else None, size)
+    
+    @staticmethod
+    def _status_verification(status: str, returncode: int) -> Dict:
+        """
+        Convert ``gpg --status-fd --verify`` output into the format of _verification_result
+        """
+        keyword, key_id, username, fingerprint = None, None, None, None
+        valid = False
+        for line in status.splitlines():
+            if not line.startswith('[GNUPG:] '):
+                continue
+            fields = line[9:].split(' ', 2)
+            if fields[0] in SIGNATURE_STATUSES:
+                # The first problem reported wins over a later GOODSIG
+                if keyword is None or keyword == 'GOODSIG':
+                    keyword = fields[0]
+                key_id = fields[1] if len(fields) > 1 else key_id
+                if fields[0] not in ('ERRSIG', 'NO_PUBKEY') and len(fields) > 2:
+                    username = fields[2]
+            elif fields[0] == 'VALIDSIG':
+                values = line[9:].split()
+                # The primary key's fingerprint is the last field, the signing (sub)key's the first
+                fingerprint = values[10] if len(values) > 10 else values[1]
+                valid = True
+        valid = valid and keyword == 'GOODSIG' and returncode == 0
+        return {
+            'status': 'success' if valid else 'failed',
+            'valid': valid,
+            'fingerprint': fingerprint,
+            'key_id': key_id,
+            'username': username,
+            'message': 'signature valid' if valid else SIGNATURE_STATUSES.get(keyword, 'No valid signature found')
+        }
+    
+    def verify_clearsigned(self, data: bytes) -> Dict:
+        """
+        Verify a clearsigned message
+        
+        Args:
+            data: The clearsigned message
+            
+        Returns:
+            Dictionary with verification result (see _verification_result)
+        """
+        return self._verification_result(self.gpg.verify(data))
+    
+    @staticmethod
+    def _verification_result(verified) -> Dict:
+        """
+        Convert a python-gnupg verification result
+        
+        Returns:
+            Dictionary with 'status' ('success' or 'failed'), 'valid', the signing
+            key 'fingerprint' (primary key), 'key_id', 'username' and a 'message'
+        """
+        fingerprint = getattr(verified, 'pubkey_fingerprint', None) or verified.fingerprint
+        return {
+            'status': 'success' if verified.valid else 'failed',
+            'valid': bool(verified.valid),
+            'fingerprint': fingerprint,
+            'key_id': verified.key_id,
+            'username': verified.username,
+            'message': verified.status or 'No valid signature found'
+        }
+    
     def import_key(self, key_data: str) -> Dict:
         """
         Import a GPG key
@@ -179,9 +540,186 @@ class GPGKeyManager:
         Returns:
             Dictionary with import result
         """
-        import_result = self.gpg.import_keys(key_data)
+        return self.import_keys([key_data])
+    
+    def import_keys(self, sources: Iterable[Union[str, bytes, BinaryIO]],
+                    chunk_size: int = COPY_CHUNK_SIZE) -> Dict:
+        """
+        Import any number of keys with one gpg process per data format
+        
+        Each source is copied to gpg's stdin in chunks as it is read, so uploads
+        and request bodies are never held in memory as a whole. gpg only detects
+        ASCII armor at the start of its input, so armored and binary sources are
+        fed to separate processes (at most two per call).
+        
+        Args:
+            sources: Armored or binary key data, as strings, bytes or binary file objects
+                     (e.g. uploaded files or a request stream); several keys may share one source
+            chunk_size: Bytes copied per write
+            
+        Returns:
+            Dictionary with 'status', 'imported' (keys processed), 'fingerprints',
+            per-key 'results', gpg's 'counts' and its diagnostic 'message'
+        """
+        # armored flag -> [(first chunk, rest of the source or None)]
+        batches: Dict[bool, List[Tuple[bytes, Optional[BinaryIO]]]] = {}
+        for source in sources:
+            if isinstance(source, str):
+                source = source.encode('utf-8')
+            if isinstance(source, (bytes, bytearray)):
+                head, rest = bytes(source), None
+            else:
+                head, rest = source.read(chunk_size), source
+            if head:
+                # Binary OpenPGP data starts with a packet tag, which has the high bit set
+                batches.setdefault(not head[0] & 0x80, []).append((head, rest))
+        
+        output: List[bytes] = []
+        returncode = 0
+        try:
+            for parts in batches.values():
+                returncode = max(returncode, self._run_import(parts, output, chunk_size))
+        finally:
+            self.invalidate_cache()
+        return self._import_result(output, returncode)
+    
+    def _run_import(self, parts: List[Tuple[bytes, Optional[BinaryIO]]], output: List[bytes],
+                    chunk_size: int) -> int:
+        """Stream ``parts`` through one ``gpg --import``, collecting its output lines; returns its exit code."""
+        process = subprocess.Popen(self._gpg_command('--status-fd', '1', '--import'),
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        # gpg reports each key as it goes; drain its output concurrently so a large
+        # bundle cannot fill the pipe while we are still writing to stdin
+        reader = threading.Thread(target=lambda: output.extend(process.stdout), daemon=True)
+        reader.start()
+        try:
+            tail = b''
+            for chunk, rest in parts:
+                if tail.endswith(b'-----'):
+                    # Armor block without a trailing newline: keep the next
+                    # BEGIN line from running into its END line
+                    process.stdin.write(b'\n')
+                while chunk:
+                    process.stdin.write(chunk)
+                    tail = (tail + chunk)[-5:]
+                    chunk = rest.read(chunk_size) if rest is not None else b''
+            process.stdin.close()
+        except BrokenPipeError:
+            pass  # gpg gave up early; its status output says why
+        finally:
+            process.wait()
+            reader.join()
+            process.stdout.close()
+        return process.returncode
+    
+    @staticmethod
+    def _import_result(output: List[bytes], returncode: int) -> Dict:
+        """Summarize the status and diagnostic lines of ``gpg --status-fd 1 --import`` runs."""
+        results, messages, counts = [], [], {}
+        for line in output:
+            line = line.decode('utf-8', 'replace').rstrip('\r\n')
+            if not line.startswith('[GNUPG:] '):
+                if line:
+                    messages.append(line)
+                continue
+            fields = line.split()[1:]
+            if fields[0] == 'IMPORT_OK' and len(fields) > 2:
+                flags = int(fields[1]) if fields[1].isdigit() else 0
+                reasons = [text for flag, text in IMPORT_OK_REASONS.items() if flags & flag]
+                results.append({'fingerprint': fields[2], 'ok': fields[1],
+                                'text': ', '.join(reasons) or 'Not actually changed'})
+            elif fields[0] == 'IMPORT_PROBLEM' and len(fields) > 1:
+                results.append({'fingerprint': fields[2] if len(fields) > 2 else None, 'problem': fields[1],
+                                'text': IMPORT_PROBLEMS.get(fields[1], 'Unknown problem')})
+            elif fields[0] == 'IMPORT_RES':
+                for name, value in zip(IMPORT_COUNTS, fields[1:]):
+                    counts[name] = counts.get(name, 0) + (int(value) if value.isdigit() else 0)
+        fingerprints = list(dict.fromkeys(result['fingerprint'] for result in results if 'ok' in result))
         return {
-            'imported': import_result.count,
-            'fingerprints': import_result.fingerprints,
-            'results': import_result.results
+            'status': 'success' if fingerprints else 'failed',
+            'imported': counts.get('count', 0),
+            'fingerprints': fingerprints,
+            'results': results,
+            'counts': counts,
+            'returncode': returncode,
+            'message': '\n'.join(messages)
         }
+    
+    def export_keys(self, fingerprints: Optional[Iterable[str]] = None, secret: bool = False,
+                    passphrase: str = None, armor: bool = True,
+                    chunk_size: int = COPY_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Export many keys with a single gpg process, streamed
+        
+        gpg is started, and its first chunk read, before this returns, so a failing
+        export raises here rather than halfway through a response body.
+        
+        Args:
+            fingerprints: Fingerprints, key IDs or emails; None or empty exports the whole keyring
+            secret: If True, export secret keys (requires ``passphrase``)
+            passphrase: Passphrase for the secret keys, handed to gpg on stdin
+            armor: ASCII armored output instead of binary
+            chunk_size: Bytes per yielded chunk
+            
+        Returns:
+            Iterator over the exported key data
+            
+        Raises:
+            GPGError: If any of ``fingerprints`` is not in the keyring (listed in
+                      its ``missing``), or gpg exported nothing (bad passphrase, ...)
+        """
+        names = [name.strip() for name in fingerprints or () if name.strip()]
+        missing = self.missing_keys(names, secret)
+        if missing:
+            raise GPGError(f"Key(s) not found: {', '.join(missing)}", missing=missing)
+        args = ['--armor'] if armor else []
+        if secret:
+            if not passphrase:
+                raise GPGError('Passphrase is required to export secret keys')
+            args += ['--pinentry-mode', 'loopback', '--passphrase-fd', '0', '--export-secret-keys']
+        else:
+            args += ['--export']
+        # '--' keeps user-supplied names from being read as options
+        cmd = self._gpg_command(*args, '--', *names)
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        # Drained while stdout is read, so a chatty gpg cannot block on a full stderr pipe
+        errors = []
+        reader = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+        reader.start()
+        try:
+            if secret:
+                process.stdin.write(passphrase.encode('utf-8') + b'\n')
+            process.stdin.close()
+            first = process.stdout.read(chunk_size)
+        except BaseException:
+            process.kill()
+            self._finish_export(process, reader, errors)
+            raise
+        if not first:
+            error = self._finish_export(process, reader, errors)
+            raise GPGError(error or 'No keys exported')
+        return self._stream_export(process, reader, errors, first, chunk_size)
+    
+    def _stream_export(self, process: subprocess.Popen, reader: threading.Thread, errors: List[bytes],
+                       first: bytes, chunk_size: int) -> Iterator[bytes]:
+        try:
+            chunk = first
+            while chunk:
+                yield chunk
+                chunk = process.stdout.read(chunk_size)
+        finally:
+            # Stops gpg if the consumer went away (e.g. the client disconnected)
+            if process.poll() is None:
+                process.kill()
+            self._finish_export(process, reader, errors)
+    
+    @staticmethod
+    def _finish_export(process: subprocess.Popen, reader: threading.Thread, errors: List[bytes]) -> str:
+        """Reap an export process and return its diagnostics."""
+        process.stdout.close()
+        process.wait()
+        reader.join()
+        process.stderr.close()
+        return b''.join(errors).decode('utf-8', 'replace').strip()
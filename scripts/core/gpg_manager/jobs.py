@@ -0,0 +1,153 @@
+"""
+Background job queue for slow GPG operations
+
+Key generation can keep gpg busy for minutes while it gathers entropy. Jobs
+run on a fixed pool of worker threads instead of inside web requests; callers
+get a job ID back immediately and poll its status.
+"""
+import functools
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    description: str
+    submitted: float
+    status: str = QUEUED
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    # Dropped as soon as the job starts, so arguments such as passphrases
+    # do not outlive the job
+    func: Optional[Callable] = field(default=None, repr=False)
+
+    def to_dict(self, position: Optional[int] = None) -> Dict:
+        end = self.finished or time.time()
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'description': self.description,
+            'status': self.status,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+            'elapsed': round(end - self.started, 1) if self.started else None,
+            'position': position,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, workers: int = 2, max_queued: int = 16, keep_finished: float = 3600,
+                 name: str = 'gpg-job'):
+        """
+        Start the worker pool
+
+        Args:
+            workers: Number of jobs running at the same time
+            max_queued: Jobs waiting for a worker before submit() is refused
+            keep_finished: Seconds finished jobs stay available for polling
+            name: Prefix of the worker thread names
+        """
+        self.workers = workers
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs: Dict[str, Job] = {}  # in submission order
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True).start()
+
+    def submit(self, kind: str, description: str, func: Callable, *args, **kwargs) -> Dict:
+        """
+        Queue ``func(*args, **kwargs)``
+
+        The job fails if ``func`` raises; its return value becomes the job result.
+
+        Returns:
+            Status dictionary of the new job (see Job.to_dict)
+
+        Raises:
+            QueueFullError: If ``max_queued`` jobs are already waiting
+        """
+        job = Job(uuid.uuid4().hex, kind, description, time.time(),
+                  func=functools.partial(func, *args, **kwargs))
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFullError(f"{self.max_queued} job(s) already waiting, try again later")
+        return self.get(job.id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Status dictionary of a job, with its place in the queue while it waits."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            position = None
+            if job.status == QUEUED:
+                position = 1 + sum(1 for other in self._jobs.values()
+                                   if other.status == QUEUED and other.submitted < job.submitted)
+            return job.to_dict(position)
+
+    def jobs(self) -> List[Dict]:
+        """Status dictionaries of all known jobs, oldest first."""
+        with self._lock:
+            self._expire()
+            job_ids = list(self._jobs)
+        return [job for job in map(self.get, job_ids) if job]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING, DONE, FAILED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return dict(counts, workers=self.workers, capacity=self.max_queued)
+
+    def _expire(self) -> None:
+        """Forget finished jobs older than ``keep_finished``; call with the lock held."""
+        cutoff = time.time() - self.keep_finished
+        for job_id in [job.id for job in self._jobs.values() if job.finished and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                job.status = RUNNING
+                job.started = time.time()
+                func, job.func = job.func, None
+            try:
+                result = func()
+            except Exception as e:
+                status, result, error = FAILED, None, str(e) or type(e).__name__
+            else:
+                status, error = DONE, None
+            with self._lock:
+                job.status, job.result, job.error = status, result, error
+                job.finished = time.time()
+            self._queue.task_done()
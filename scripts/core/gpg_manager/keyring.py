@@ -0,0 +1,205 @@
+"""
+Streaming parser and searchable index for ``gpg --with-colons`` key listings
+
+The listing is read line by line straight from gpg's stdout into compact
+``KeyRecord`` objects, so large keyrings never exist as one big string or as
+python-gnupg's generic per-field dictionaries. ``KeyIndex`` looks keys up by
+fingerprint, key ID and email and answers expiry queries with a sorted list.
+"""
+import bisect
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+EMAIL_RE = re.compile(r'<([^<>\s]+@[^<>\s]+)>\s*$')
+ESCAPE_RE = re.compile(r'\\x([0-9a-fA-F]{2})')
+HEX_RE = re.compile(r'(?:0x)?([0-9a-fA-F]{8}|[0-9a-fA-F]{16}|[0-9a-fA-F]{40}|[0-9a-fA-F]{64})')
+
+# Key filters accepted by KeyIndex.search
+STATUSES = ('all', 'valid', 'expired', 'expiring', 'revoked')
+SORTS = ('keyring', 'uid', 'created', 'expires')
+
+
+def _int(value: str) -> int:
+    return int(value) if value.isdigit() else 0
+
+
+def _unescape(value: str) -> str:
+    """Undo gpg's ``\\xNN`` escaping of colons and control characters in user IDs."""
+    return ESCAPE_RE.sub(lambda match: chr(int(match.group(1), 16)), value) if '\\x' in value else value
+
+
+class KeyRecord:
+    """One primary key of a listing."""
+
+    __slots__ = ('fingerprint', 'key_id', 'uids', 'emails', 'date', 'expires',
+                 'validity', 'length', 'algo', 'search_text')
+
+    def __init__(self, fields: List[str]):
+        self.fingerprint = ''
+        self.key_id = fields[4]
+        self.uids: Tuple[str, ...] = ()
+        self.emails: Tuple[str, ...] = ()
+        self.date = _int(fields[5])
+        self.expires = _int(fields[6])
+        self.validity = fields[1]
+        self.length = _int(fields[2])
+        self.algo = fields[3]
+        self.search_text = ''
+
+    @property
+    def revoked(self) -> bool:
+        return self.validity == 'r'
+
+    def expired(self, now: float = None) -> bool:
+        return bool(self.expires) and self.expires < (now or time.time())
+
+    def _add_uid(self, uid: str) -> None:
+        self.uids += (uid,)
+        match = EMAIL_RE.search(uid)
+        email = match.group(1) if match else uid if '@' in uid and ' ' not in uid else None
+        if email:
+            self.emails += (email.lower(),)
+
+    def _finish(self) -> None:
+        self.search_text = '\n'.join(self.uids + (self.fingerprint, self.key_id)).lower()
+
+    def to_dict(self) -> Dict:
+        """The dictionary format of GPGKeyManager.list_keys."""
+        return {
+            'key_id': self.key_id,
+            'fingerprint': self.fingerprint,
+            'uids': list(self.uids),
+            'date': self.date,
+            'expires': self.expires,
+            'length': self.length,
+            'algo': self.algo,
+            'validity': self.validity,
+        }
+
+
+def parse_colons(lines: Iterable[str]) -> Iterator[KeyRecord]:
+    """
+    Parse ``gpg --with-colons --fixed-list-mode --with-fingerprint`` output
+
+    Args:
+        lines: Lines of the listing, e.g. a gpg process's stdout
+
+    Yields:
+        A KeyRecord per primary key (``pub``/``sec`` record) as soon as it is complete
+    """
+    record = None
+    primary = False  # whether the next fpr record belongs to the primary key
+    for line in lines:
+        fields = line.rstrip('\r\n').split(':')
+        kind = fields[0]
+        if kind in ('pub', 'sec'):
+            if record is not None:
+                record._finish()
+                yield record
+            if len(fields) < 7:
+                record = None
+                continue
+            record = KeyRecord(fields)
+            primary = True
+        elif record is None:
+            continue
+        elif kind == 'fpr':
+            if primary and len(fields) > 9:
+                record.fingerprint = fields[9]
+            primary = False
+        elif kind == 'uid' and len(fields) > 9:
+            record._add_uid(_unescape(fields[9]))
+        elif kind in ('sub', 'ssb'):
+            primary = False
+    if record is not None:
+        record._finish()
+        yield record
+
+
+class KeyIndex:
+    """Keys of one listing, indexed for lookups, filters and pagination."""
+
+    def __init__(self, records: Iterable[KeyRecord]):
+        self.records: List[KeyRecord] = list(records)
+        self.by_fingerprint: Dict[str, KeyRecord] = {}
+        self.by_key_id: Dict[str, KeyRecord] = {}
+        self.by_email: Dict[str, List[KeyRecord]] = {}
+        for record in self.records:
+            self.by_fingerprint[record.fingerprint.upper()] = record
+            self.by_key_id[record.key_id.upper()] = record
+            self.by_key_id[record.key_id[-8:].upper()] = record
+            for email in record.emails:
+                self.by_email.setdefault(email, []).append(record)
+        # (expires, position) of the keys that expire, for range queries
+        self._expiry = sorted((record.expires, i) for i, record in enumerate(self.records) if record.expires)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, key: str) -> Optional[KeyRecord]:
+        """Look up a key by fingerprint or long/short key ID (optionally 0x-prefixed)."""
+        match = HEX_RE.fullmatch(key.strip())
+        if not match:
+            return None
+        key = match.group(1).upper()
+        return self.by_fingerprint.get(key) or self.by_key_id.get(key)
+
+    def expiring_between(self, start: float, end: float) -> List[KeyRecord]:
+        """Keys whose expiry lies in [start, end)."""
+        lo = bisect.bisect_left(self._expiry, (start, -1))
+        hi = bisect.bisect_left(self._expiry, (end, -1))
+        return [self.records[i] for _, i in sorted(self._expiry[lo:hi], key=lambda item: item[1])]
+
+    def _matching(self, query: str) -> List[KeyRecord]:
+        query = query.strip()
+        if not query:
+            return self.records
+        record = self.get(query)
+        if record is not None:
+            return [record]
+        if '@' in query and query.lower() in self.by_email:
+            return self.by_email[query.lower()]
+        needle = query.lower()
+        return [record for record in self.records if needle in record.search_text]
+
+    def search(self, query: str = '', status: str = 'all', sort: str = 'keyring',
+               offset: int = 0, limit: int = 50, now: float = None,
+               expiring_days: int = 30) -> Tuple[int, List[KeyRecord]]:
+        """
+        Filter, sort and page the keys
+
+        Args:
+            query: Fingerprint, key ID, email, or text to find in user IDs
+            status: One of STATUSES; 'expiring' means within ``expiring_days``
+            sort: One of SORTS ('keyring' keeps gpg's order)
+            offset: Number of matching keys to skip
+            limit: Maximum number of keys to return
+
+        Returns:
+            Tuple of the number of matching keys and the requested page of them
+        """
+        now = now or time.time()
+        if status in ('expired', 'expiring'):
+            if status == 'expired':
+                candidates = self.expiring_between(0, now)
+            else:
+                candidates = self.expiring_between(now, now + expiring_days * 86400)
+            if query.strip():
+                wanted = {id(record) for record in self._matching(query)}
+                candidates = [record for record in candidates if id(record) in wanted]
+        else:
+            candidates = self._matching(query)
+            if status == 'valid':
+                candidates = [record for record in candidates if not record.revoked and not record.expired(now)]
+            elif status == 'revoked':
+                candidates = [record for record in candidates if record.revoked]
+
+        if sort == 'uid':
+            candidates = sorted(candidates, key=lambda record: record.uids[0].lower() if record.uids else '')
+        elif sort == 'created':
+            candidates = sorted(candidates, key=lambda record: record.date, reverse=True)
+        elif sort == 'expires':
+            # Soonest first, keys that never expire last
+            candidates = sorted(candidates, key=lambda record: record.expires or float('inf'))
+        return len(candidates), candidates[offset:offset + limit]
@@ -0,0 +1,239 @@
+"""
+Parallel detached signing and verification of release sets
+
+A batch names files below a signing root (e.g. the ``iso/`` tree). Each file
+is hashed and signed by its own gpg process, driven from a shared, bounded
+thread pool: gpg does the hashing and gpg-agent only the private key
+operation, so signing many images scales with the cores and disks available.
+The checksums computed in the same pass go into a ``sha256sum``-compatible
+manifest, which is signed as well.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .gpg_utils import SIGN_CHUNK_SIZE, GPGKeyManager
+
+MANIFEST_NAME = 'SHA256SUMS'
+# Signature file suffixes, preferred first when looking for a file's signature
+SIGNATURE_SUFFIXES = ('.asc', '.sig')
+
+
+class PathError(ValueError):
+    """Raised for files outside the signing root or otherwise unusable."""
+
+
+def hash_file(path: str, algorithm: str = 'sha256', chunk_size: int = SIGN_CHUNK_SIZE) -> str:
+    """Hex digest of a file, read in chunks."""
+    hasher = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        # e.g. a full disk: leave no partial .tmp behind
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class BatchSigner:
+    def __init__(self, manager: GPGKeyManager, root: str, workers: Optional[int] = None):
+        """
+        Create the worker pool
+
+        Args:
+            manager: Key manager whose keyring signs and verifies
+            root: Directory all batch paths are relative to
+            workers: Files processed at the same time (default: number of CPUs)
+        """
+        self.manager = manager
+        self.root = os.path.realpath(root)
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='gpg-sign')
+
+    def resolve(self, name: str) -> str:
+        """
+        Absolute path of ``name`` below the signing root
+
+        Raises:
+            PathError: If the path leaves the root (``..``, absolute paths, symlinks)
+        """
+        path = os.path.realpath(os.path.join(self.root, name))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise PathError(f"{name} is outside {self.root}")
+        return path
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def sign(self, files: Iterable[str], key: str = None, passphrase: str = None,
+             armor: bool = True, detached: bool = True,
+             manifest: Optional[str] = MANIFEST_NAME) -> Dict:
+        """
+        Sign many files in parallel
+
+        Args:
+            files: Paths relative to the signing root
+            key: Signing key (fingerprint, key ID or email); None uses gpg's default key
+            passphrase: Passphrase for the key, unless gpg-agent has it cached
+            armor: Write ``.asc`` instead of binary ``.sig`` signatures
+            detached: Write a signature next to every file; if False the files are only
+                      hashed and just the manifest is signed
+            manifest: Path of the checksum manifest to write and sign, or None for none
+
+        Returns:
+            Dictionary with overall 'status', per-file results, the 'manifest'
+            result, total 'bytes' and 'elapsed' seconds
+
+        Raises:
+            PathError: If a path is outside the signing root
+        """
+        started = time.time()
+        paths = [self.resolve(name) for name in files]
+        manifest_path = self.resolve(manifest) if manifest else None
+        if manifest_path in paths:
+            raise PathError(f"{manifest} cannot be both signed and the manifest")
+        suffix = SIGNATURE_SUFFIXES[0] if armor else SIGNATURE_SUFFIXES[1]
+
+        def sign_one(path: str) -> Dict:
+            result = {'file': self._relative(path)}
+            try:
+                if not detached:
+                    return dict(result, status='success', digest=hash_file(path), size=os.path.getsize(path))
+                signed = self.manager.sign_detached(path, key=key, passphrase=passphrase, armor=armor)
+            except OSError as e:
+                return dict(result, status='failed', message=str(e))
+            result.update(status=signed['status'], digest=signed['digest'], size=signed['size'])
+            if signed['status'] != 'success':
+                return dict(result, message=signed['message'])
+            try:
+                _write_atomic(path + suffix, signed['signature'])
+            except OSError as e:
+                return dict(result, status='failed', message=f"Cannot write signature: {e}")
+            return dict(result, signature=self._relative(path + suffix))
+
+        results = list(self._pool.map(sign_one, paths))
+        ok = all(result['status'] == 'success' for result in results)
+        report = {'files': results, 'manifest': None}
+        if manifest_path and ok:
+            # sha256sum -c format, with paths relative to the manifest's directory
+            base = os.path.dirname(manifest_path)
+            lines = ''.join(f"{result['digest']}  {os.path.relpath(path, base).replace(os.sep, '/')}\n"
+                            for path, result in zip(paths, results))
+            report['manifest'] = {'file': manifest, 'entries': len(results)}
+            try:
+                _write_atomic(manifest_path, lines.encode('utf-8'))
+                signed = self.manager.sign_detached(manifest_path, key=key, passphrase=passphrase, armor=armor)
+                if signed['status'] == 'success':
+                    _write_atomic(manifest_path + suffix, signed['signature'])
+                    report['manifest'].update(status='success', signature=self._relative(manifest_path + suffix))
+                else:
+                    report['manifest'].update(status=signed['status'], message=signed['message'])
+            except OSError as e:
+                report['manifest'].update(status='failed', message=str(e))
+            ok = report['manifest']['status'] == 'success'
+        report.update(status='success' if ok else 'failed',
+                      bytes=sum(result.get('size') or 0 for result in results),
+                      elapsed=round(time.time() - started, 3))
+        return report
+
+    def signature_for(self, path: str) -> Optional[str]:
+        """The ``.asc`` or ``.sig`` file next to ``path``, if any."""
+        for suffix in SIGNATURE_SUFFIXES:
+            if os.path.isfile(path + suffix):
+                return path + suffix
+        return None
+
+    def verify(self, files: Iterable[str] = (), manifest: Optional[str] = None) -> Dict:
+        """
+        Verify files against their detached signatures and/or a signed manifest, in parallel
+
+        Args:
+            files: Paths relative to the signing root, each with a ``.asc``/``.sig`` next to it
+            manifest: Path of a signed checksum manifest; every file it lists is checked
+
+        Returns:
+            Dictionary with overall 'status', per-file results, the 'manifest'
+            result, total 'bytes' and 'elapsed' seconds
+
+        Raises:
+            PathError: If a path is outside the signing root
+        """
+        started = time.time()
+        paths = [self.resolve(name) for name in files]
+
+        def verify_one(path: str) -> Dict:
+            result = {'file': self._relative(path)}
+            signature = self.signature_for(path)
+            if signature is None:
+                return dict(result, status='failed', valid=False, message='No signature file found')
+            try:
+                with open(signature, 'rb') as f:
+                    verified = self.manager.verify_detached_file(path, f.read())
+            except OSError as e:
+                return dict(result, status='failed', valid=False, message=str(e))
+            return dict(result, signature=self._relative(signature), **verified)
+
+        results = list(self._pool.map(verify_one, paths))
+        ok = all(result['valid'] for result in results)
+        report = {'files': results, 'manifest': None}
+        if manifest:
+            report['manifest'] = self._verify_manifest(manifest)
+            ok = ok and report['manifest']['valid']
+        report.update(status='success' if ok else 'failed',
+                      bytes=sum(result.get('size') or 0 for result in results),
+                      elapsed=round(time.time() - started, 3))
+        return report
+
+    def _verify_manifest(self, manifest: str) -> Dict:
+        """Check a manifest's signature, then re-hash every file it lists."""
+        manifest_path = self.resolve(manifest)
+        result = {'file': manifest, 'valid': False}
+        signature = self.signature_for(manifest_path)
+        if not os.path.isfile(manifest_path) or signature is None:
+            return dict(result, status='failed', message='Manifest or its signature not found')
+        with open(signature, 'rb') as f:
+            verified = self.manager.verify_detached_file(manifest_path, f.read())
+        result.update(verified, valid=False)
+        if not verified['valid']:
+            return result
+
+        entries: List[Tuple[str, str]] = []
+        base = os.path.dirname(manifest_path)
+        with open(manifest_path, encoding='utf-8') as f:
+            for line in f:
+                digest, _, name = line.rstrip('\n').partition(' ')
+                if digest and name:
+                    # '*' marks binary mode in sha256sum output
+                    entries.append((digest.lower(), name[1:] if name[0] in ' *' else name))
+
+        def check(entry: Tuple[str, str]) -> Dict:
+            digest, name = entry
+            path = os.path.realpath(os.path.join(base, name))
+            if os.path.commonpath([self.root, path]) != self.root:
+                return {'file': name, 'status': 'failed', 'message': 'Outside the signing root'}
+            try:
+                actual = hash_file(path)
+            except OSError as e:
+                return {'file': name, 'status': 'failed', 'message': str(e)}
+            return {'file': self._relative(path), 'status': 'success' if actual == digest else 'failed',
+                    'digest': actual, 'expected': digest}
+
+        checked = list(self._pool.map(check, entries))
+        mismatched = [entry for entry in checked if entry['status'] != 'success']
+        result.update(entries=checked, valid=bool(entries) and not mismatched,
+                      status='success' if entries and not mismatched else 'failed')
+        if mismatched:
+            result['message'] = f"{len(mismatched)} of {len(entries)} file(s) do not match"
+        return result
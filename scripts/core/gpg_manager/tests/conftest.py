@@ -0,0 +1,30 @@
+"""Shared fixtures: the gpg_manager package importable as core.gpg_manager and a throwaway keyring."""
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from core.gpg_manager import GPGKeyManager  # noqa: E402
+
+SIGNER = 'Release Signer <release@example.com>'
+
+
+@pytest.fixture
+def manager():
+    """GPGKeyManager on a fresh home with one passphrase-less signing key."""
+    if shutil.which('gpg') is None:
+        pytest.skip('gpg is not installed')
+    # Short path: gpg-agent's socket must fit in a sockaddr_un
+    home = tempfile.mkdtemp(prefix='gpgt-')
+    manager = GPGKeyManager(home)
+    subprocess.run(manager._gpg_command('--passphrase', '', '--quick-gen-key', SIGNER, 'ed25519', 'sign', 'never'),
+                   check=True, capture_output=True)
+    manager.invalidate_cache()
+    yield manager
+    subprocess.run(['gpgconf', '--homedir', home, '--kill', 'all'], capture_output=True)
+    shutil.rmtree(home, ignore_errors=True)
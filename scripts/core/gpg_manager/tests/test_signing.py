@@ -0,0 +1,59 @@
+"""Detached signing of streams through GPGKeyManager._pipe_through."""
+import io
+import threading
+
+import pytest
+
+
+class FailingStream(io.RawIOBase):
+    """Upload that is aborted after ``chunks`` reads, like a client dropping the connection."""
+
+    def __init__(self, chunks: int):
+        self.chunks = chunks
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self.chunks == 0:
+            raise ConnectionResetError('client went away')
+        self.chunks -= 1
+        return b'x' * size
+
+
+def run_with_timeout(func, timeout: float = 30):
+    """Result or exception of ``func``; fails the test if it does not return in time."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = func()
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'gpg is still waiting for input'
+    return outcome
+
+
+def test_sign_detached_stream(manager):
+    signed = manager.sign_detached(io.BytesIO(b'image' * 1000), key='release@example.com', chunk_size=1024)
+
+    assert signed['status'] == 'success'
+    assert signed['size'] == 5000
+    verified = manager.verify_detached_file(io.BytesIO(b'image' * 1000), signed['signature'])
+    assert verified['valid'] and 'release@example.com' in verified['username']
+
+
+@pytest.mark.parametrize('method', ['sign', 'verify'])
+def test_source_failing_mid_read_stops_gpg(manager, method):
+    if method == 'sign':
+        call = lambda: manager.sign_detached(FailingStream(2), key='release@example.com', chunk_size=4096)
+    else:
+        signature = manager.sign_detached(io.BytesIO(b'data'), key='release@example.com')['signature']
+        call = lambda: manager.verify_detached_file(FailingStream(2), signature, chunk_size=4096)
+
+    outcome = run_with_timeout(call)
+    assert isinstance(outcome.get('error'), ConnectionResetError)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Synthetic HTTP origin for benchmarking ISO downloads.
+
+Serves the files below a directory like a download mirror would, with
+configurable latency, per-connection bandwidth, Range support, conditional
+GETs and injected connection drops. ``benchmark.py`` starts one per scenario; it can also be
+run on its own to point a lab node at it::
+
+    truncate -s 4G /tmp/origin/test.img
+    python3 bench_server.py /tmp/origin --port 8000 --latency-ms 40 --bandwidth 100MiB
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+from rich.console import Console
+
+try:
+    from .mirror_server import MirrorRequestHandler
+    from .ratelimit import TokenBucket
+    from .units import parse_size
+except ImportError:  # executed as a script
+    from mirror_server import MirrorRequestHandler
+    from ratelimit import TokenBucket
+    from units import parse_size
+
+# Chunk size of throttled transfers, also the token bucket burst
+THROTTLE_CHUNK_SIZE = 64 * 1024
+
+
+class OriginRequestHandler(MirrorRequestHandler):
+    """Serves files with the network conditions configured on the ``OriginServer``.
+
+    Range parsing and validators are shared with the LAN mirror. Unthrottled
+    bodies are sent with ``sendfile``, so the origin costs as little CPU as
+    possible next to the client being measured.
+    """
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.console:
+            super().log_message(format, *args)
+
+    def _serve(self, head: bool) -> None:
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        path = server.resolve(self.path)
+        if path is None:
+            self.send_error(404)
+            return
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            etag = f'"{st.st_ino:x}-{size:x}-{st.st_mtime_ns:x}"'
+            last_modified = formatdate(st.st_mtime, usegmt=True)
+            if self._not_modified(etag, last_modified):
+                return
+
+            byte_range = self._parse_range(size, etag, last_modified) if server.ranges else None
+            if byte_range == 'unsatisfiable':
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start, end = byte_range or (0, size)
+
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(end - start))
+            self.send_header('Accept-Ranges', 'bytes' if server.ranges else 'none')
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            if byte_range:
+                self.send_header('Content-Range', f"bytes {start}-{end - 1}/{size}")
+            self.end_headers()
+            if head or end <= start:
+                return
+
+            drop = server.drop_point(path, size)
+            if drop is not None and start < drop < end:
+                # Cut the transfer short, as a flaky upstream would
+                end = drop
+                self.close_connection = True
+            if server.bandwidth:
+                bucket = TokenBucket(server.bandwidth, burst=THROTTLE_CHUNK_SIZE)
+                f.seek(start)
+                remaining = end - start
+                while remaining:
+                    chunk = f.read(min(THROTTLE_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    bucket.consume(len(chunk))
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            else:
+                self.connection.sendfile(f, start, end - start)
+
+
+class OriginServer(ThreadingHTTPServer):
+    """HTTP server for the files below ``root``.
+
+    Args:
+        address: (host, port) to bind, port 0 picks a free one
+        root: Directory to serve
+        latency: Seconds to wait before answering each request
+        bandwidth: Bytes per second per connection (None: unlimited)
+        ranges: Whether Range requests are honoured
+        drop_after: Fraction of each file after which its first GET is cut off
+        console: Console to log requests to (None: silent)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], root: Path, latency: float = 0.0,
+                 bandwidth: Optional[int] = None, ranges: bool = True,
+                 drop_after: Optional[float] = None, console: Console = None):
+        self.root = Path(root).resolve()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.ranges = ranges
+        self.drop_after = drop_after
+        self.console = console
+        self._dropped: Set[Path] = set()
+        self._lock = threading.Lock()
+        super().__init__(address, OriginRequestHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def resolve(self, request_path: str) -> Optional[Path]:
+        """Map a request path to a file below the root.
+
+        Directories are served from their ``index.html``, so recorded index
+        pages can stand in for upstream download sites.
+        """
+        path = (self.root / unquote(urlsplit(request_path).path).lstrip('/')).resolve()
+        if path.is_dir():
+            path = path / 'index.html'
+        if os.path.commonpath([self.root, path]) != str(self.root) or not path.is_file():
+            return None
+        return path
+
+    def drop_point(self, path: Path, size: int) -> Optional[int]:
+        """Offset at which to cut off this GET of ``path``, only for its first one."""
+        if self.drop_after is None:
+            return None
+        with self._lock:
+            if path in self._dropped:
+                return None
+            self._dropped.add(path)
+        return int(size * self.drop_after)
+
+    def start(self) -> threading.Thread:
+        """Serve from a daemon thread until ``shutdown()``."""
+        thread = threading.Thread(target=self.serve_forever, name='bench-origin', daemon=True)
+        thread.start()
+        return thread
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a directory with simulated network conditions")
+    parser.add_argument('root', help="Directory to serve")
+    parser.add_argument('--bind', default='127.0.0.1', help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="Port (default: 8000)")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay before every response")
+    parser.add_argument('--bandwidth', help="Per-connection limit in bytes/s, e.g. 100MiB")
+    parser.add_argument('--no-ranges', action='store_true', help="Ignore Range requests")
+    parser.add_argument('--drop-after', type=float, metavar='FRACTION',
+                        help="Cut off the first GET of every file after this fraction of it")
+    args = parser.parse_args(argv)
+
+    console = Console()
+    server = OriginServer((args.bind, args.port), Path(args.root), latency=args.latency_ms / 1000,
+                          bandwidth=parse_size(args.bandwidth) if args.bandwidth else None,
+                          ranges=not args.no_ranges, drop_after=args.drop_after, console=console)
+    console.print(f"[cyan]Serving {server.root} on {server.url}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
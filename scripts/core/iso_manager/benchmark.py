@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""Benchmarks for the ISO manager's download, resume, hashing and verification paths.
+
+Scenarios run against synthetic sparse files, so multi-GB workloads cost no
+disk space. HTTP scenarios download them from a local ``OriginServer`` with
+configurable latency, bandwidth and Range support. Every run happens in a
+fresh process and reports wall time, CPU time, throughput, peak RSS and the
+read/write system calls counted in ``/proc/self/io``.
+
+Results can be saved and later compared, failing when a scenario got slower::
+
+    python3 benchmark.py --size 2GiB --save before.json
+    python3 benchmark.py --size 2GiB --compare before.json
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import yaml
+from rich.console import Console
+from rich.table import Table
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    from .bench_server import OriginServer
+    from .hashing import hash_file, hash_files
+    from .iso_manager import ISOManager
+    from .units import parse_size
+except ImportError:  # executed as a script
+    from bench_server import OriginServer
+    from hashing import hash_file, hash_files
+    from iso_manager import ISOManager
+    from units import parse_size
+
+# Downloads settings for the benchmark catalog: fail fast, never sleep between retries
+DOWNLOAD_SETTINGS = {'retries': 3, 'backoffFactor': 0, 'httpRetries': 0, 'dedupe': False}
+
+
+def legacy_checksum(path: Path, algorithm: str = 'sha256') -> str:
+    """The original ISOManager._get_checksum implementation."""
+    h = getattr(hashlib, algorithm)()
+    with open(path, 'rb') as f:
+        while chunk := f.read(8192):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_digest_checksum(path: Path, algorithm: str = 'sha256') -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, algorithm).hexdigest()
+
+
+def make_files(directory: Path, count: int, size: int, sparse: bool = True) -> List[Path]:
+    """Create ``count`` files of ``size`` bytes, sparse (all holes) or random-ish data."""
+    block = None if sparse else os.urandom(1024 * 1024)
+    paths = []
+    for i in range(count):
+        path = directory / f"bench-{i}.img"
+        with open(path, 'wb') as f:
+            if sparse:
+                f.truncate(size)
+            else:
+                remaining = size
+                while remaining:
+                    n = min(remaining, len(block))
+                    f.write(block[:n])
+                    remaining -= n
+        paths.append(path)
+    return paths
+
+
+@dataclass
+class Workload:
+    """What a scenario process works on."""
+    files: List[str]
+    size: int
+    digest: str
+    work_dir: str = ''
+    base_url: Optional[str] = None
+    segments: int = 4
+
+
+# name -> (group, description, prepare, origin server options or None)
+SCENARIOS: Dict[str, Tuple[str, str, Callable[[Workload], Tuple[Callable, int]], Optional[Dict]]] = {}
+
+
+def scenario(name: str, group: str, description: str, http: Dict = None):
+    """Register ``prepare(workload) -> (run, bytes processed)``; ``http`` starts an origin server."""
+    def register(prepare):
+        SCENARIOS[name] = (group, description, prepare, http)
+        return prepare
+    return register
+
+
+def _expect(value, expected, what: str) -> None:
+    if value != expected:
+        raise RuntimeError(f"unexpected {what}: {value!r}")
+
+
+def _catalog(workload: Workload) -> List[Dict]:
+    base_url = workload.base_url or 'http://localhost'
+    return [{'name': Path(path).stem, 'version': '1', 'fileName': Path(path).name,
+             'downloadLocation': 'bench', 'downloadLink': f"{base_url}/{Path(path).name}",
+             'checkSum': workload.digest} for path in workload.files]
+
+
+def _manager(workload: Workload, **downloads) -> ISOManager:
+    """An ISOManager for the benchmark catalog with an empty tree in the run directory."""
+    work_dir = Path(workload.work_dir)
+    config_path = work_dir / 'config.yml'
+    config = {'settings': {'downloads': dict(DOWNLOAD_SETTINGS, **downloads)}, 'isos': _catalog(workload)}
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f)
+    return ISOManager(str(config_path), str(work_dir / 'iso'), quiet=True)
+
+
+def _linked_manager(workload: Workload) -> ISOManager:
+    """Like ``_manager``, with the origin files already in the tree (hardlinked)."""
+    manager = _manager(workload)
+    for iso, origin in zip(manager.config['isos'], workload.files):
+        path = manager._iso_path(iso)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(origin, path)
+        except OSError:
+            shutil.copyfile(origin, path)
+    return manager
+
+
+def _downloaded(results) -> None:
+    for result in results:
+        _expect(result.status, 'downloaded', f"status of {result.name} ({result.error})")
+
+
+@scenario('hash-legacy', 'hash', "legacy 8 KiB read, sha256")
+def _hash_legacy(w: Workload):
+    return lambda: _expect(legacy_checksum(Path(w.files[0])), w.digest, 'digest'), w.size
+
+
+@scenario('hash-readinto', 'hash', "readinto 4 MiB, sha256")
+def _hash_readinto(w: Workload):
+    return lambda: _expect(hash_file(Path(w.files[0]))['sha256'], w.digest, 'digest'), w.size
+
+
+if hasattr(hashlib, 'file_digest'):
+    @scenario('hash-file-digest', 'hash', "hashlib.file_digest, sha256")
+    def _hash_file_digest(w: Workload):
+        return lambda: _expect(file_digest_checksum(Path(w.files[0])), w.digest, 'digest'), w.size
+
+
+@scenario('hash-legacy-two', 'hash', "legacy, sha256 + md5 (two passes)")
+def _hash_legacy_two(w: Workload):
+    path = Path(w.files[0])
+    return lambda: (legacy_checksum(path), legacy_checksum(path, 'md5')), w.size
+
+
+@scenario('hash-readinto-two', 'hash', "readinto, sha256 + md5 (one pass)")
+def _hash_readinto_two(w: Workload):
+    return lambda: hash_file(Path(w.files[0]), ('sha256', 'md5')), w.size
+
+
+@scenario('hash-sequential', 'hash', "legacy, all files sequential")
+def _hash_sequential(w: Workload):
+    return lambda: [legacy_checksum(Path(path)) for path in w.files], w.size * len(w.files)
+
+
+@scenario('hash-parallel', 'hash', "hash_files, all files parallel")
+def _hash_parallel(w: Workload):
+    return lambda: hash_files([Path(path) for path in w.files]), w.size * len(w.files)
+
+
+@scenario('verify-iso', 'verify', "ISOManager.verify_iso, uncached")
+def _verify_iso(w: Workload):
+    manager = _linked_manager(w)
+    path = manager._iso_path(manager.config['isos'][0])
+    return lambda: _expect(manager.verify_iso(path, w.digest), True, 'verification result'), w.size
+
+
+@scenario('verify-all', 'verify', "verify_all --rehash, all files")
+def _verify_all(w: Workload):
+    manager = _linked_manager(w)
+    return lambda: _expect(manager.verify_all(rehash=True)['ok'], True, 'audit result'), w.size * len(w.files)
+
+
+@scenario('verify-cached', 'verify', "verify_all from the verification cache")
+def _verify_cached(w: Workload):
+    manager = _linked_manager(w)
+    manager.verify_all()
+    return lambda: _expect(manager.verify_all()['ok'], True, 'audit result'), w.size * len(w.files)
+
+
+@scenario('download', 'download', "single stream", http={})
+def _download(w: Workload):
+    manager = _manager(w)
+    iso = manager.config['isos'][0]
+    return lambda: _downloaded([manager.download_iso(iso)]), w.size
+
+
+@scenario('download-segmented', 'download', "segmented (--segments)", http={})
+def _download_segmented(w: Workload):
+    manager = _manager(w, segments=w.segments, minSegmentSize=1)
+    iso = manager.config['isos'][0]
+    return lambda: _downloaded([manager.download_iso(iso)]), w.size
+
+
+@scenario('resume', 'resume', "dropped at 50%, resumed with Range", http={'drop_after': 0.5})
+def _resume(w: Workload):
+    manager = _manager(w)
+    iso = manager.config['isos'][0]
+    return lambda: _downloaded([manager.download_iso(iso)]), w.size
+
+
+@scenario('batch', 'batch', "download_all, all files", http={})
+def _batch(w: Workload):
+    manager = _manager(w, maxWorkers=len(w.files), maxPerHost=len(w.files))
+    return lambda: _downloaded(manager.download_all()), w.size * len(w.files)
+
+
+def _sample() -> Dict[str, float]:
+    """Wall clock, CPU time of all threads and read/write syscall counters of this process."""
+    sample = {'wall': time.perf_counter(), 'cpu': time.process_time()}
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('syscr', 'syscw'):
+                    sample[key] = int(value)
+    except OSError:
+        pass
+    return sample
+
+
+def _peak_rss() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run_scenario(name: str, workload: Workload, conn) -> None:
+    """Scenario process: prepare, then measure one run and send the result back."""
+    try:
+        run, volume = SCENARIOS[name][2](workload)
+        before = _sample()
+        run()
+        after = _sample()
+        result = {key: after[key] - before[key] for key in after if key in before}
+        result.update(volume=volume, peakRss=_peak_rss())
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    conn.send(result)
+    conn.close()
+
+
+def run_scenario(name: str, workload: Workload, origin: Path, scratch: Path,
+                 repeat: int, server_options: Dict) -> Dict:
+    """Run ``name`` ``repeat`` times in fresh processes and return the fastest run."""
+    http = SCENARIOS[name][3]
+    context = multiprocessing.get_context('spawn')
+    best = None
+    for _ in range(repeat):
+        run_dir = Path(tempfile.mkdtemp(prefix='run-', dir=scratch))
+        server = None
+        try:
+            if http is not None:
+                server = OriginServer(('127.0.0.1', 0), origin, **dict(server_options, **http))
+                server.start()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_run_scenario, args=(
+                name, replace(workload, work_dir=str(run_dir), base_url=server.url if server else None), sender))
+            process.start()
+            sender.close()
+            try:
+                result = receiver.recv()
+            except EOFError:
+                result = None
+            process.join()
+            if result is None:
+                result = {'error': f"scenario process exited with code {process.exitcode}"}
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+            shutil.rmtree(run_dir, ignore_errors=True)
+        if 'error' in result:
+            return result
+        best = result if best is None or result['wall'] < best['wall'] else best
+    return best
+
+
+def select_scenarios(spec: str) -> List[str]:
+    """Scenario names from a comma-separated list of names and groups ('all' for every one)."""
+    selected = []
+    for item in (part.strip() for part in spec.split(',')):
+        matches = [name for name, (group, *_) in SCENARIOS.items()
+                   if item in ('all', name, group)]
+        if not matches:
+            raise ValueError(f"Unknown scenario or group {item!r} "
+                             f"(groups: {', '.join(sorted({s[0] for s in SCENARIOS.values()}))})")
+        selected.extend(name for name in matches if name not in selected)
+    return selected
+
+
+def _mib(value: float) -> str:
+    return f"{value / 1024 ** 2:,.0f} MiB"
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ISO manager's download and verification paths")
+    parser.add_argument('--size', default='512MiB', help="Size of each test file (default: 512MiB)")
+    parser.add_argument('--files', type=int, default=4, help="Files for the parallel and batch scenarios")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per scenario, best is reported")
+    parser.add_argument('--dir', help="Directory for the test files (default: system temp dir)")
+    parser.add_argument('--scenarios', default='all',
+                        help="Comma-separated scenarios or groups: hash, verify, download, resume, batch")
+    parser.add_argument('--list', action='store_true', help="List the scenarios and exit")
+    parser.add_argument('--dense', action='store_true',
+                        help="Write random data instead of sparse files (exercises the disk)")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Origin delay before every response")
+    parser.add_argument('--bandwidth', help="Origin limit per connection in bytes/s, e.g. 100MiB")
+    parser.add_argument('--no-ranges', action='store_true', help="Origin ignores Range requests")
+    parser.add_argument('--segments', type=int, default=4, help="Connections for download-segmented")
+    parser.add_argument('--save', metavar='FILE', help="Write the results as JSON")
+    parser.add_argument('--compare', metavar='FILE', help="Compare with results saved by --save")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Wall time increase in percent counted as a regression (default: 10)")
+    args = parser.parse_args(argv)
+
+    console = Console()
+    if args.list:
+        for name, (group, description, *_) in SCENARIOS.items():
+            console.print(f"[green]{name:<20}[/] [cyan]{group:<9}[/] {description}")
+        return 0
+    try:
+        names = select_scenarios(args.scenarios)
+    except ValueError as e:
+        console.print(f"[red]✗ {e}")
+        return 2
+    size = parse_size(args.size)
+    options = {'size': size, 'files': args.files, 'dense': args.dense, 'latencyMs': args.latency_ms,
+               'bandwidth': args.bandwidth, 'ranges': not args.no_ranges, 'segments': args.segments}
+    server_options = {'latency': args.latency_ms / 1000,
+                      'bandwidth': parse_size(args.bandwidth) if args.bandwidth else None,
+                      'ranges': not args.no_ranges}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('options') != options:
+            console.print(f"[yellow]⚠ {args.compare} was recorded with different options: {baseline.get('options')}")
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        origin = Path(tmp) / 'origin'
+        origin.mkdir()
+        kind = "random" if args.dense else "sparse"
+        with console.status(f"[cyan]Creating {args.files} x {args.size} {kind} test files..."):
+            paths = make_files(origin, args.files, size, sparse=not args.dense)
+            digest = hash_file(paths[0])['sha256']
+        workload = Workload([str(path) for path in paths], size, digest, segments=args.segments)
+        for name in names:
+            with console.status(f"[cyan]{name}..."):
+                results[name] = run_scenario(name, workload, origin, Path(tmp), args.repeat, server_options)
+
+    title = f"ISO manager benchmark ({args.size} per file, {args.files} files, best of {args.repeat})"
+    table = Table(title=title, header_style="bold magenta")
+    for column, justify in (("Scenario", 'left'), ("Wall", 'right'), ("CPU", 'right'),
+                            ("Throughput", 'right'), ("Peak RSS", 'right'), ("Syscalls r/w", 'right')):
+        table.add_column(column, justify=justify)
+    if baseline:
+        table.add_column("vs baseline", justify='right')
+    failed = regressed = 0
+    for name, result in results.items():
+        label = f"[green]{name}"
+        if 'error' in result:
+            failed += 1
+            table.add_row(label, f"[red]failed: {result['error']}")
+            continue
+        syscalls = f"{result['syscr']:,} / {result['syscw']:,}" if 'syscr' in result else "-"
+        row = [label, f"{result['wall']:.2f}s", f"{result['cpu']:.2f}s",
+               f"[yellow]{_mib(result['volume'] / result['wall'])}/s",
+               _mib(result['peakRss']) if result['peakRss'] else "-", syscalls]
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous and 'wall' in previous:
+            change = (result['wall'] - previous['wall']) / previous['wall'] * 100
+            style = 'red' if change > args.threshold else 'green' if change < -args.threshold else 'dim'
+            regressed += change > args.threshold
+            row.append(f"[{style}]{change:+.1f}%")
+        elif baseline:
+            row.append("-")
+        table.add_row(*row)
+    console.print(table)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'options': options, 'results': results}, f, indent=1)
+        console.print(f"[dim]Results written to {args.save}")
+    if regressed:
+        console.print(f"[red]✗ {regressed} scenario(s) slower than {args.compare} by more than {args.threshold:g}%")
+    return 1 if failed or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Content-addressed store of downloaded ISO images."""
+import errno
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Linux FICLONE ioctl: copy-on-write clone on btrfs, XFS and similar
+FICLONE = 0x40049409
+
+
+class BlobStore:
+    """Blobs keyed by digest, linked into the ISO tree.
+
+    Every verified image is kept once as ``<root>/<algorithm>/<ab>/<digest>``
+    and each configured path is a hardlink to it (a reflink or plain copy
+    when hardlinks are not possible), so catalog entries sharing a checksum
+    share both the download and the disk space. A blob whose link count
+    drops to one is no longer referenced by the tree.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def blob_path(self, algorithm: str, digest: str) -> Path:
+        digest = digest.lower()
+        return self.root / algorithm.lower() / digest[:2] / digest
+
+    def lock(self, algorithm: str, digest: str) -> threading.Lock:
+        """Per-digest lock so concurrent downloads of the same content fetch it once."""
+        key = f"{algorithm.lower()}:{digest.lower()}"
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def has(self, algorithm: str, digest: str) -> bool:
+        return self.blob_path(algorithm, digest).is_file()
+
+    def materialize(self, algorithm: str, digest: str, dest: Path) -> Optional[str]:
+        """Create ``dest`` from the stored blob.
+
+        Returns:
+            How the file was created ('hardlink', 'reflink' or 'copy'), or
+            None if the blob is not in the store
+        """
+        blob = self.blob_path(algorithm, digest)
+        if not blob.is_file():
+            return None
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.link")
+        tmp.unlink(missing_ok=True)
+        try:
+            method = self._clone(blob, tmp)
+            tmp.replace(dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return method
+
+    def adopt(self, path: Path, algorithm: str, digest: str) -> bool:
+        """Add a verified file to the store, or replace it with a link to the stored copy.
+
+        Returns:
+            True if ``path`` now shares its inode with the blob
+        """
+        blob = self.blob_path(algorithm, digest)
+        try:
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.link(path, blob)
+                return True
+            if os.path.samefile(path, blob):
+                return True
+            tmp = path.with_name(f".{path.name}.link")
+            tmp.unlink(missing_ok=True)
+            os.link(blob, tmp)
+            tmp.replace(path)
+            return True
+        except OSError:
+            return False
+
+    def discard(self, algorithm: str, digest: str, path: Path) -> None:
+        """Drop the blob if it is the same file as ``path``, which failed verification."""
+        blob = self.blob_path(algorithm, digest)
+        try:
+            if os.path.samefile(path, blob):
+                blob.unlink()
+        except OSError:
+            pass
+
+    def unreferenced(self) -> List[Dict]:
+        """Blobs no path in the tree links to any more."""
+        entries = []
+        if not self.root.is_dir():
+            return entries
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(directory) / filename
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                if st.st_nlink <= 1:
+                    entries.append({'path': str(path), 'size': st.st_size})
+        return entries
+
+    @staticmethod
+    def _clone(src: Path, dest: Path) -> str:
+        try:
+            os.link(src, dest)
+            return 'hardlink'
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+                raise
+        if fcntl is not None:
+            try:
+                with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+                    fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+                shutil.copystat(src, dest)
+                return 'reflink'
+            except OSError:
+                dest.unlink(missing_ok=True)
+        shutil.copy2(src, dest)
+        return 'copy'
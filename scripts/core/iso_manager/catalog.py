@@ -0,0 +1,359 @@
+"""Typed, indexed ISO catalog loaded from one or more YAML files."""
+import glob
+import hashlib
+import os
+import pickle
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+try:
+    from .postprocess import COMPRESSION_FORMATS, CONVERT_FORMATS, POST_PROCESS_KEYS
+except ImportError:  # executed as a script
+    from postprocess import COMPRESSION_FORMATS, CONVERT_FORMATS, POST_PROCESS_KEYS
+
+# Bump when the pickled layout of Catalog/IsoEntry changes
+CACHE_VERSION = 1
+
+# Config key -> IsoEntry attribute
+ISO_FIELDS = {
+    'name': 'name',
+    'version': 'version',
+    'platform': 'platform',
+    'tags': 'tags',
+    'fileName': 'file_name',
+    'checkSum': 'checksum',
+    'checkSumAlgo': 'checksum_algo',
+    'downloadLink': 'download_link',
+    'downloadLocation': 'download_location',
+}
+REQUIRED_FIELDS = ('name', 'fileName', 'downloadLink', 'downloadLocation')
+
+
+class CatalogError(ValueError):
+    """The catalog is malformed; ``errors`` lists every problem found."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("Invalid ISO catalog:\n  " + "\n  ".join(errors))
+        self.errors = errors
+
+
+@dataclass(eq=False)
+class IsoEntry(Mapping):
+    """One ISO of the catalog.
+
+    The entry is also a read-only mapping of its original camelCase config
+    keys, so ``iso.get('fileName')`` works as it did on the raw YAML
+    dictionaries. Keys without a dedicated attribute (``segments``,
+    ``snapshot``, ...) are kept in ``options``.
+    """
+
+    __slots__ = ('name', 'version', 'platform', 'tags', 'file_name', 'checksum', 'checksum_algo',
+                 'download_link', 'download_location', 'options', 'source')
+
+    name: str
+    version: Optional[str]
+    platform: Optional[str]
+    tags: Tuple[str, ...]
+    file_name: str
+    checksum: Optional[str]
+    checksum_algo: str
+    download_link: str
+    download_location: str
+    options: Dict[str, Any]
+    source: str
+
+    def __getitem__(self, key: str) -> Any:
+        attribute = ISO_FIELDS.get(key)
+        value = getattr(self, attribute) if attribute else self.options.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        for key, attribute in ISO_FIELDS.items():
+            if getattr(self, attribute) is not None:
+                yield key
+        yield from self.options
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    @property
+    def relative_path(self) -> str:
+        """Path of the file below the ISO root."""
+        return f"{self.download_location.strip('/')}/{self.file_name}".lstrip('/')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: list(value) if key == 'tags' else value for key, value in self.items()}
+
+
+class Catalog:
+    """All configured tags and ISOs with lookup indexes.
+
+    Indexes are built once at load time:
+
+    - ``by_tag``: tag name -> entries
+    - ``by_name``: lower-cased ``name`` and ``fileName`` -> entries
+    - ``by_platform``: platform -> entries
+    - ``by_digest``: (algorithm, lower-cased checksum) -> entries
+    """
+
+    def __init__(self, settings: Dict, tags: List[Dict], isos: List[IsoEntry], files: List[str]):
+        self.settings = settings
+        self.tags = tags
+        self.isos = isos
+        self.files = files
+        self.by_tag: Dict[str, List[IsoEntry]] = {}
+        self.by_name: Dict[str, List[IsoEntry]] = {}
+        self.by_platform: Dict[str, List[IsoEntry]] = {}
+        self.by_digest: Dict[Tuple[str, str], List[IsoEntry]] = {}
+        self._tags_lower: Dict[str, List[IsoEntry]] = {}
+        for iso in isos:
+            for tag in iso.tags:
+                self.by_tag.setdefault(tag, []).append(iso)
+                self._tags_lower.setdefault(tag.lower(), []).append(iso)
+            for key in {iso.name.lower(), iso.file_name.lower()}:
+                self.by_name.setdefault(key, []).append(iso)
+            if iso.platform:
+                self.by_platform.setdefault(iso.platform, []).append(iso)
+            if iso.checksum:
+                self.by_digest.setdefault((iso.checksum_algo, iso.checksum.lower()), []).append(iso)
+
+    def find(self, target: str) -> List[IsoEntry]:
+        """Entries carrying tag ``target``, else those named ``target`` (case-insensitive)."""
+        wanted = target.lower()
+        return list(self._tags_lower.get(wanted) or self.by_name.get(wanted) or [])
+
+    def to_config(self) -> Dict:
+        """The catalog in the layout of a single config file."""
+        return {'settings': self.settings, 'tags': self.tags, 'isos': self.isos}
+
+    @classmethod
+    def load(cls, path: Path, cache_path: Path = None) -> 'Catalog':
+        """Load ``path`` and everything it includes.
+
+        The parsed catalog is pickled to ``cache_path`` together with the
+        mtime and size of every file (and include directory) it came from, and
+        reused as long as none of them changed.
+
+        Raises:
+            CatalogError: If a file cannot be read or parsed, or fails validation
+        """
+        path = Path(path).resolve()
+        if cache_path:
+            catalog = cls._load_cache(cache_path, path)
+            if catalog is not None:
+                return catalog
+
+        documents, watched, errors = [], [], []
+        cls._collect(path, documents, watched, errors, ())
+        catalog = None if errors else cls._build(documents, errors)
+        if errors:
+            raise CatalogError(errors)
+
+        if cache_path:
+            cls._save_cache(cache_path, path, watched, catalog)
+        return catalog
+
+    @staticmethod
+    def _stamp(paths: List[str]) -> List[Tuple[str, int, int]]:
+        stamp = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                # e.g. the directory of a glob include that does not exist yet
+                stamp.append((path, -1, -1))
+                continue
+            stamp.append((path, st.st_mtime_ns, st.st_size))
+        return stamp
+
+    @classmethod
+    def _load_cache(cls, cache_path: Path, path: Path) -> Optional['Catalog']:
+        try:
+            with open(cache_path, 'rb') as f:
+                version, root, stamp, catalog = pickle.load(f)
+        except Exception:
+            return None
+        if version != CACHE_VERSION or root != str(path):
+            return None
+        if cls._stamp([entry[0] for entry in stamp]) != stamp:
+            return None
+        return catalog
+
+    @classmethod
+    def _save_cache(cls, cache_path: Path, path: Path, watched: List[str], catalog: 'Catalog') -> None:
+        stamp = cls._stamp(watched)
+        cache_path = Path(cache_path)
+        tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((CACHE_VERSION, str(path), stamp, catalog), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
+    @classmethod
+    def _collect(cls, path: Path, documents: List, watched: List[str], errors: List[str],
+                 stack: Tuple[Path, ...]) -> None:
+        """Parse ``path`` and, depth first, the files it includes."""
+        watched.append(str(path))
+        try:
+            with open(path, 'r') as f:
+                data = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError) as e:
+            errors.append(f"{path}: {e}")
+            return
+        if not isinstance(data, dict):
+            errors.append(f"{path}: expected a mapping at the top level")
+            return
+        documents.append((path, data))
+
+        includes = data.get('include') or []
+        if isinstance(includes, str):
+            includes = [includes]
+        for pattern in includes:
+            full_pattern = str(path.parent / os.path.expanduser(str(pattern)))
+            matches = sorted(glob.glob(full_pattern))
+            if glob.has_magic(full_pattern):
+                # A new file matching the pattern changes the directory mtime
+                watched.append(os.path.dirname(full_pattern))
+            elif not matches:
+                errors.append(f"{path}: included file {pattern!r} does not exist")
+            for match in matches:
+                included = Path(match).resolve()
+                if included in stack or included == path:
+                    errors.append(f"{path}: include cycle through {included}")
+                    continue
+                cls._collect(included, documents, watched, errors, stack + (path,))
+
+    @classmethod
+    def _build(cls, documents: List[Tuple[Path, Dict]], errors: List[str]) -> Optional['Catalog']:
+        """Merge parsed documents into a validated catalog.
+
+        Settings and tags of the including file take precedence over those of
+        included files; ISO lists are concatenated in include order.
+        """
+        settings: Dict = {}
+        tags: List[Dict] = []
+        isos: List[IsoEntry] = []
+        for path, data in documents:
+            file_settings = data.get('settings') or {}
+            if not isinstance(file_settings, dict):
+                errors.append(f"{path}: 'settings' must be a mapping")
+            else:
+                for section, values in file_settings.items():
+                    if isinstance(values, dict) and isinstance(settings.get(section), dict):
+                        settings[section] = {**values, **settings[section]}
+                    else:
+                        settings.setdefault(section, values)
+            for i, tag in enumerate(data.get('tags') or []):
+                if not isinstance(tag, dict) or not tag.get('name'):
+                    errors.append(f"{path}: tags[{i}] needs a name")
+                elif all(known['name'] != tag['name'] for known in tags):
+                    tags.append(tag)
+            raw_isos = data.get('isos') or []
+            if not isinstance(raw_isos, list):
+                errors.append(f"{path}: 'isos' must be a list")
+                continue
+            for i, raw in enumerate(raw_isos):
+                entry = cls._parse_iso(raw, f"{path} isos[{i}]", errors)
+                if entry is not None:
+                    isos.append(entry)
+
+        known_tags = {tag['name'] for tag in tags}
+        destinations: Dict[str, IsoEntry] = {}
+        for iso in isos:
+            for tag in iso.tags:
+                if tag not in known_tags:
+                    errors.append(f"{iso.source} ({iso.name}): tag {tag!r} is not defined under 'tags'")
+            other = destinations.setdefault(iso.relative_path, iso)
+            if other is not iso:
+                errors.append(f"{iso.source} ({iso.name}): {iso.relative_path} is also the destination "
+                              f"of {other.source} ({other.name})")
+        if errors:
+            return None
+        return cls(settings, tags, isos, [str(path) for path, _ in documents])
+
+    @staticmethod
+    def _parse_iso(raw: Any, source: str, errors: List[str]) -> Optional[IsoEntry]:
+        if not isinstance(raw, dict):
+            errors.append(f"{source}: expected a mapping")
+            return None
+        label = f"{source} ({raw.get('name', '?')})"
+        problems = [f"missing '{key}'" for key in REQUIRED_FIELDS
+                    if not isinstance(raw.get(key), str) or not raw.get(key).strip()]
+
+        link = raw.get('downloadLink')
+        if isinstance(link, str) and not link.startswith(('http://', 'https://')):
+            problems.append(f"downloadLink must be an http(s) URL, got {link!r}")
+
+        tags = raw.get('tags') or []
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            problems.append("'tags' must be a list of tag names")
+            tags = []
+
+        algorithm = str(raw.get('checkSumAlgo') or 'sha256').lower()
+        checksum = raw.get('checkSum')
+        try:
+            digest_size = hashlib.new(algorithm).digest_size
+        except ValueError:
+            digest_size = None
+        if not digest_size:
+            # Unknown, or a variable-length digest such as shake_128
+            problems.append(f"unsupported checkSumAlgo {algorithm!r}")
+        if checksum is not None:
+            checksum = str(checksum).strip()
+            if digest_size and (len(checksum) != digest_size * 2
+                                or any(c not in '0123456789abcdefABCDEF' for c in checksum)):
+                problems.append(f"checkSum is not a {algorithm} hex digest")
+        sums_url = raw.get('checkSumUrl')
+        if sums_url is not None and sums_url != 'auto' and not (
+                isinstance(sums_url, str) and sums_url.startswith(('http://', 'https://'))):
+            problems.append(f"checkSumUrl must be 'auto' or an http(s) URL, got {sums_url!r}")
+
+        segments = raw.get('segments')
+        if segments is not None and (not isinstance(segments, int) or segments < 1):
+            problems.append("'segments' must be a positive integer")
+        if not isinstance(raw.get('priority', 0), int):
+            problems.append("'priority' must be an integer")
+
+        post_process = raw.get('postProcess')
+        if post_process is not None:
+            if not isinstance(post_process, dict):
+                problems.append("'postProcess' must be a mapping")
+            else:
+                unknown = sorted(set(post_process) - set(POST_PROCESS_KEYS))
+                if unknown:
+                    problems.append(f"unknown postProcess option(s): {', '.join(unknown)}")
+                decompress = post_process.get('decompress')
+                if decompress is not None and decompress not in (*COMPRESSION_FORMATS, 'auto'):
+                    problems.append(f"postProcess.decompress must be one of "
+                                    f"{', '.join(COMPRESSION_FORMATS)} or auto")
+                convert = post_process.get('convert')
+                if convert is not None and convert not in CONVERT_FORMATS:
+                    problems.append(f"postProcess.convert must be one of {', '.join(CONVERT_FORMATS)}")
+
+        if problems:
+            errors.extend(f"{label}: {problem}" for problem in problems)
+            return None
+
+        version, platform = raw.get('version'), raw.get('platform')
+        return IsoEntry(
+            name=raw['name'],
+            version=None if version is None else str(version),
+            platform=None if platform is None else str(platform),
+            tags=tuple(tags),
+            file_name=raw['fileName'],
+            checksum=checksum or None,
+            checksum_algo=algorithm,
+            download_link=link,
+            download_location=raw['downloadLocation'],
+            options={key: value for key, value in raw.items() if key not in ISO_FIELDS},
+            source=source,
+        )
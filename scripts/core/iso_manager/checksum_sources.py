@@ -0,0 +1,291 @@
+"""Checksums published upstream in SHA256SUMS-style files, with signature checks."""
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urljoin, urlparse
+
+import requests
+
+try:
+    from .json_store import UrlStore
+except ImportError:  # executed as a script
+    from json_store import UrlStore
+
+# Checksum file names tried in a release directory, per algorithm
+SUMS_FILES = {
+    'sha256': ('SHA256SUMS', 'sha256sums', 'SHA256SUMS.txt', 'sha256sum.txt'),
+    'sha512': ('SHA512SUMS', 'sha512sums', 'SHA512SUMS.txt', 'sha512sum.txt'),
+    'sha1': ('SHA1SUMS', 'sha1sums'),
+    'md5': ('MD5SUMS', 'md5sums'),
+}
+SIGNATURE_SUFFIXES = ('.gpg', '.asc', '.sig')
+DEFAULT_TTL = 24 * 3600
+
+CLEARSIGN_HEADER = b'-----BEGIN PGP SIGNED MESSAGE-----'
+GNU_LINE = re.compile(r'^([0-9a-fA-F]{32,128})\s+[*^ ]?(.+?)\s*$')
+BSD_LINE = re.compile(r'^(\w+)\s*\((.+)\)\s*=\s*([0-9a-fA-F]{32,128})\s*$')
+
+
+class ChecksumSourceError(IOError):
+    """An upstream checksum could not be obtained or was not trustworthy."""
+
+
+def parse_sums(text: str) -> Dict[str, str]:
+    """Parse GNU (``digest  name``) or BSD (``SHA256 (name) = digest``) checksum lists.
+
+    Returns:
+        Dictionary mapping each file name (without leading ``./``) to its
+        lower-cased digest
+    """
+    digests = {}
+    for line in text.splitlines():
+        line = line.strip()
+        gnu = GNU_LINE.match(line)
+        if gnu:
+            digest, name = gnu.groups()
+        else:
+            bsd = BSD_LINE.match(line)
+            if not bsd:
+                continue
+            _, name, digest = bsd.groups()
+        digests[name[2:] if name.startswith('./') else name] = digest.lower()
+    return digests
+
+
+def algorithm_of(url: str) -> Optional[str]:
+    """Algorithm implied by a checksum file name such as SHA512SUMS."""
+    name = os.path.basename(urlparse(url).path).lower()
+    for algorithm in SUMS_FILES:
+        if name.startswith(algorithm):
+            return algorithm
+    return None
+
+
+def clearsigned_text(data: bytes) -> bytes:
+    """Signed text of a clearsigned message, with dash-escaping removed."""
+    body = data.split(b'\n\n', 1)[1] if b'\n\n' in data else b''
+    body = body.split(b'-----BEGIN PGP SIGNATURE-----', 1)[0]
+    return b'\n'.join(line[2:] if line.startswith(b'- ') else line for line in body.splitlines())
+
+
+def is_openpgp_signature(data: bytes) -> bool:
+    """True for armored or binary OpenPGP signatures (not e.g. OpenWRT usign files)."""
+    return data.lstrip().startswith(b'-----BEGIN PGP SIGNATURE-----') or bool(data and data[0] & 0x80)
+
+
+class ChecksumCache(UrlStore):
+    """Parsed checksum files keyed by URL, and checksum file discovery per directory."""
+
+
+class ChecksumResolver:
+    """Look up the checksum of catalog entries without a ``checkSum``.
+
+    Entries set ``checkSumUrl`` to a checksum file, or to ``auto`` to probe
+    the directory of their ``downloadLink`` for ``SHA256SUMS``, ``sha256sums``
+    and friends (``settings.checksums.discover`` does that for every entry
+    without a ``checkSum``). Each checksum file is downloaded once, verified
+    against a detached (``.gpg``/``.asc``/``.sig``) or inline OpenPGP
+    signature when one is published, parsed, and cached in the state
+    directory for ``settings.checksums.ttl`` seconds; so one small request
+    covers a whole release directory.
+
+    Signatures are checked with ``GPGKeyManager`` against a dedicated keyring
+    (``settings.checksums.gnupgHome``, default ``<iso>/.isomanager/gnupg``)
+    holding the keys from ``settings.checksums.keyFiles``. A bad signature
+    is always rejected; unsigned files are only rejected with
+    ``settings.checksums.requireSignature``. ``trustedKeys`` optionally
+    restricts the accepted signing key fingerprints.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.cache = ChecksumCache(manager.state_dir / 'checksums.json', manager.iso_base_dir)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._gpg = None
+        self._gpg_lock = threading.Lock()
+
+    @property
+    def settings(self) -> Dict:
+        return (self.manager.config.get('settings') or {}).get('checksums') or {}
+
+    def resolve(self, iso: Dict, offline: bool = False) -> Optional[Tuple[str, str]]:
+        """Return ``(digest, algorithm)`` for ``iso`` from its upstream checksum file.
+
+        Args:
+            iso: Catalog entry
+            offline: Only use cached checksum files, never make a request
+
+        Returns:
+            None if the entry has no upstream checksum source (or, offline,
+            nothing is cached yet)
+
+        Raises:
+            ChecksumSourceError: If the checksum file cannot be fetched, has a
+                bad signature, is unsigned while signatures are required, or
+                does not list the file
+        """
+        source = iso.get('checkSumUrl') or ('auto' if self.settings.get('discover') else None)
+        if not source:
+            return None
+        link = iso.get('downloadLink', '')
+        algorithm = iso.get('checkSumAlgo', 'sha256').lower()
+        if source == 'auto':
+            sums_url = self._discover(urljoin(link, '.'), algorithm, offline)
+            if sums_url is None:
+                if offline:
+                    return None
+                raise ChecksumSourceError(f"No {algorithm} checksum file found next to {link}")
+        else:
+            sums_url = source
+            algorithm = algorithm_of(sums_url) or algorithm
+
+        entry = self._load_sums(sums_url, offline)
+        if entry is None:
+            return None
+        signature = entry.get('signature')
+        if self.settings.get('requireSignature') and not signature:
+            raise ChecksumSourceError(f"{sums_url} is not signed and settings.checksums.requireSignature is set")
+        trusted = [key.replace(' ', '').upper() for key in self.settings.get('trustedKeys') or []]
+        if signature and trusted and signature['fingerprint'] not in trusted:
+            raise ChecksumSourceError(f"{sums_url} is signed by untrusted key {signature['fingerprint']}")
+
+        names = [unquote(os.path.basename(urlparse(link).path)), iso.get('fileName')]
+        for name in names:
+            for listed, digest in entry['digests'].items():
+                if listed == name or os.path.basename(listed) == name:
+                    return digest, algorithm
+        raise ChecksumSourceError(f"{names[0]} is not listed in {sums_url}")
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fresh(self, entry: Optional[Dict]) -> bool:
+        ttl = self.settings.get('ttl', DEFAULT_TTL)
+        return bool(entry) and time.time() - entry.get('fetched', 0) < ttl
+
+    def _discover(self, directory: str, algorithm: str, offline: bool) -> Optional[str]:
+        """Find the checksum file of ``algorithm`` in a release directory."""
+        key = f"dir:{algorithm}:{directory}"
+        with self._lock(key):
+            cached = self.cache.get(key)
+            if offline or self._fresh(cached):
+                return cached.get('url') if cached else None
+            found = None
+            for name in SUMS_FILES.get(algorithm, ()):
+                url = urljoin(directory, name)
+                try:
+                    response = self.manager.session.head(url, allow_redirects=True,
+                                                         timeout=self.manager._timeout())
+                except requests.RequestException as e:
+                    raise ChecksumSourceError(f"Checksum discovery in {directory} failed: {e}") from e
+                if response.ok:
+                    found = url
+                    break
+            self.cache.put(key, {'url': found, 'fetched': int(time.time())})
+            return found
+
+    def _load_sums(self, url: str, offline: bool) -> Optional[Dict]:
+        """Fetch, verify and parse one checksum file, using the cache when fresh."""
+        with self._lock(url):
+            cached = self.cache.get(url)
+            if offline or self._fresh(cached):
+                return cached
+
+            headers = {}
+            if cached and cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached and cached.get('lastModified'):
+                headers['If-Modified-Since'] = cached['lastModified']
+            try:
+                response = self.manager.session.get(url, headers=headers, timeout=self.manager._timeout())
+                if response.status_code == 304 and cached:
+                    cached['fetched'] = int(time.time())
+                    self.cache.put(url, cached)
+                    return cached
+                response.raise_for_status()
+            except requests.RequestException as e:
+                raise ChecksumSourceError(f"Cannot fetch checksum file {url}: {e}") from e
+
+            content = response.content
+            signature = self._verify(url, content)
+            if content.lstrip().startswith(CLEARSIGN_HEADER):
+                content = clearsigned_text(content.lstrip())
+            entry = {
+                'fetched': int(time.time()),
+                'etag': response.headers.get('etag'),
+                'lastModified': response.headers.get('last-modified'),
+                'signature': signature,
+                'digests': parse_sums(content.decode('utf-8', 'replace')),
+            }
+            self.cache.put(url, entry)
+            return entry
+
+    def _verify(self, url: str, content: bytes) -> Optional[Dict]:
+        """Check the signature of a checksum file.
+
+        Returns:
+            Signer details, or None if no OpenPGP signature is published
+
+        Raises:
+            ChecksumSourceError: On a bad signature
+        """
+        if content.lstrip().startswith(CLEARSIGN_HEADER):
+            result = self._gpg_manager().verify_clearsigned(content)
+            signature_url = url
+        else:
+            for suffix in SIGNATURE_SUFFIXES:
+                try:
+                    response = self.manager.session.get(url + suffix, timeout=self.manager._timeout())
+                except requests.RequestException:
+                    continue
+                if response.ok and is_openpgp_signature(response.content):
+                    result = self._gpg_manager().verify_detached(content, response.content)
+                    signature_url = url + suffix
+                    break
+            else:
+                return None
+
+        if not result['valid']:
+            raise ChecksumSourceError(f"Bad signature on {url}: {result['message']}")
+        return {'url': signature_url, 'fingerprint': (result['fingerprint'] or '').upper(),
+                'signer': result['username']}
+
+    def _gpg_manager(self):
+        """GPGKeyManager on the checksum keyring, with ``keyFiles`` imported."""
+        with self._gpg_lock:
+            if self._gpg is None:
+                try:
+                    from ..gpg_manager.gpg_utils import GPGKeyManager
+                except ImportError:
+                    # Executed as a script: make scripts/core importable as 'core'
+                    sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+                    try:
+                        from core.gpg_manager.gpg_utils import GPGKeyManager
+                    except ImportError as e:
+                        raise ChecksumSourceError(
+                            f"Signature verification needs python-gnupg and gpg: {e}") from e
+
+                home = Path(self.settings.get('gnupgHome') or self.manager.state_dir / 'gnupg')
+                home.mkdir(mode=0o700, parents=True, exist_ok=True)
+                try:
+                    manager = GPGKeyManager(str(home))
+                except (OSError, ValueError, RuntimeError) as e:
+                    raise ChecksumSourceError(f"Signature verification needs gpg: {e}") from e
+                config_dir = Path(self.manager.config_path).parent
+                for key_file in self.settings.get('keyFiles') or []:
+                    try:
+                        with open(config_dir / key_file, 'rb') as f:
+                            result = manager.import_keys([f])
+                    except OSError as e:
+                        raise ChecksumSourceError(f"Cannot import key file {key_file}: {e}") from e
+                    if result['status'] != 'success':
+                        raise ChecksumSourceError(f"Cannot import key file {key_file}: "
+                                                  f"{result['message'] or 'no keys found'}")
+                self._gpg = manager
+            return self._gpg
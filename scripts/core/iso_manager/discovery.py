@@ -0,0 +1,535 @@
+"""Discovery of upstream releases and generation of catalog entries for them."""
+import abc
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+import yaml
+
+try:
+    from .catalog import Catalog
+    from .checksum_sources import parse_sums
+    from .json_store import UrlStore
+except ImportError:  # executed as a script
+    from catalog import Catalog
+    from checksum_sources import parse_sums
+    from json_store import UrlStore
+
+DEFAULT_TTL = 3600
+DEFAULT_WORKERS = 8
+DEFAULT_OUTPUT = 'generated/discovered.yml'
+GENERATED_HEADER = ("# Generated by 'isoManager.sh discover' from settings.discovery.sources.\n"
+                    "# Changes to this file are overwritten on the next run.\n")
+
+HREF_RE = re.compile(r'href\s*=\s*["\']([^"\'?#]+)', re.IGNORECASE)
+PRERELEASE_RE = re.compile(r'[-.~]?(alpha|beta|pre|rc)\.?(\d*)', re.IGNORECASE)
+
+
+class DiscoveryError(IOError):
+    """Release information could not be fetched or understood."""
+
+
+def version_key(version: str) -> Tuple:
+    """Sort key for release versions.
+
+    Orders numerically and puts pre-releases before their release:
+    ``24.10.0-rc1 < 24.10.0 < 24.10.1`` and ``9.0-1 < 9.0-2 < 9.1-1``.
+    """
+    version = version.lower().lstrip('v')
+    match = PRERELEASE_RE.search(version)
+    if match:
+        stage = (0, match.group(1), int(match.group(2) or 0))
+        version = version[:match.start()]
+    else:
+        stage = (1, '', 0)
+    return tuple(int(number) for number in re.findall(r'\d+', version)), stage
+
+
+def is_prerelease(version: str) -> bool:
+    return bool(PRERELEASE_RE.search(version))
+
+
+@dataclass
+class Release:
+    """One downloadable file of an upstream release."""
+    name: str
+    version: str
+    file_name: str
+    download_link: str
+    checksum: Optional[str] = None
+    checksum_algo: str = 'sha256'
+    platform: Optional[str] = None
+    image: Optional[str] = None
+
+
+class Crawler:
+    """Fetches index pages and metadata for the providers.
+
+    Responses are cached in a ``UrlStore`` and reused for ``ttl`` seconds;
+    after that they are revalidated with a conditional GET. When a refresh
+    fails, the stale copy is used and its URL recorded in ``stale``.
+    At most ``workers`` requests run at a time across all providers.
+    """
+
+    def __init__(self, session: requests.Session, cache: UrlStore, ttl: float = DEFAULT_TTL,
+                 workers: int = DEFAULT_WORKERS, timeout=None, refresh: bool = False):
+        self.session = session
+        self.cache = cache
+        self.ttl = ttl
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.refresh = refresh
+        self.stale: List[str] = []
+        self._limit = threading.BoundedSemaphore(self.workers)
+
+    def get(self, url: str, missing_ok: bool = False, headers: Dict = None) -> Optional[str]:
+        """Body of ``url``; None for a 404 when ``missing_ok`` is set."""
+        cached = self.cache.get(url)
+        if cached and not self.refresh and time.time() - cached.get('fetched', 0) < self.ttl:
+            return cached.get('body')
+
+        request_headers = dict(headers or {})
+        if cached and cached.get('etag'):
+            request_headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('lastModified'):
+            request_headers['If-Modified-Since'] = cached['lastModified']
+        try:
+            with self._limit:
+                response = self.session.get(url, headers=request_headers, timeout=self.timeout)
+            if response.status_code == 304 and cached:
+                cached['fetched'] = int(time.time())
+                self.cache.put(url, cached, save=False)
+                return cached.get('body')
+            if response.status_code == 404 and missing_ok:
+                self.cache.put(url, {'fetched': int(time.time()), 'body': None}, save=False)
+                return None
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if cached:
+                self.stale.append(url)
+                return cached.get('body')
+            raise DiscoveryError(f"Cannot fetch {url}: {e}") from e
+
+        self.cache.put(url, {
+            'fetched': int(time.time()),
+            'etag': response.headers.get('etag'),
+            'lastModified': response.headers.get('last-modified'),
+            'body': response.text,
+        }, save=False)
+        return response.text
+
+    def get_json(self, url: str, headers: Dict = None):
+        try:
+            return json.loads(self.get(url, headers=headers))
+        except ValueError as e:
+            raise DiscoveryError(f"{url} did not return JSON: {e}") from e
+
+    def links(self, url: str) -> List[str]:
+        """Relative link targets of a directory listing."""
+        body = self.get(url) or ''
+        return [href[2:] if href.startswith('./') else href for href in HREF_RE.findall(body)]
+
+    def map(self, func: Callable, items: Iterable) -> List:
+        """Apply ``func`` to ``items`` concurrently, keeping their order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items)),
+                                thread_name_prefix='iso-discover') as pool:
+            return list(pool.map(func, items))
+
+
+class ReleaseProvider(abc.ABC):
+    """Base class of the release providers listed in ``PROVIDERS``.
+
+    A provider is built from one ``settings.discovery.sources`` entry and
+    returns the files of the newest releases it finds. Common source options:
+
+    - ``keep``: number of newest releases to list (default: 1, 0 for all)
+    - ``prerelease``: also consider release candidates (default: false)
+    - ``minVersion``: ignore releases older than this
+    - ``images``: file name suffixes to pick from each release
+    """
+
+    title = ''
+    default_images: Tuple[str, ...] = ()
+
+    def __init__(self, source: Dict):
+        self.source = source
+        self.images = list(source.get('images') or self.default_images)
+        if not self.images:
+            raise ValueError(f"{source.get('provider')} source needs 'images'")
+
+    @abc.abstractmethod
+    def releases(self, crawler: Crawler) -> List[Release]:
+        """Files of the selected releases, fetched through ``crawler``."""
+
+    def select(self, versions: Iterable[str]) -> List[str]:
+        """Newest ``keep`` versions, honouring ``prerelease`` and ``minVersion``."""
+        prerelease = bool(self.source.get('prerelease'))
+        minimum = self.source.get('minVersion')
+        candidates = {version for version in versions
+                      if (prerelease or not is_prerelease(version))
+                      and (minimum is None or version_key(version) >= version_key(str(minimum)))}
+        ordered = sorted(candidates, key=version_key, reverse=True)
+        keep = self.source.get('keep', 1)
+        return ordered[:keep] if keep else ordered
+
+    def _release(self, version: str, image: str, file_name: str, link: str,
+                 digests: Dict[str, str], platform: Optional[str] = None) -> Optional[Release]:
+        digest = digests.get(file_name)
+        if digest is None:
+            return None
+        label = f" {image}" if len(self.images) > 1 else ""
+        return Release(name=f"{self.title} {version}{label}", version=version, file_name=file_name,
+                       download_link=link, checksum=digest, platform=platform, image=image)
+
+
+class OpenWrtProvider(ReleaseProvider):
+    """OpenWRT images of one target from downloads.openwrt.org.
+
+    ``target`` is the target/subtarget, e.g. ``ramips/mt7621``; ``images``
+    the part of the file name after ``openwrt-<version>-<target>-``, e.g.
+    ``tplink_archer-a6-v3-squashfs-factory.bin``. Checksums come from the
+    ``sha256sums`` file of each target directory.
+    """
+
+    title = 'OpenWRT'
+    VERSION_RE = re.compile(r'^(\d+\.\d+\.\d+(?:-rc\d+)?)/$')
+
+    def __init__(self, source: Dict):
+        super().__init__(source)
+        self.target = str(source.get('target') or '').strip('/')
+        if not self.target:
+            raise ValueError("openwrt source needs 'target', e.g. 'x86/64'")
+        self.base_url = source.get('baseUrl', 'https://downloads.openwrt.org/releases/')
+
+    def releases(self, crawler: Crawler) -> List[Release]:
+        versions = [match.group(1) for match in map(self.VERSION_RE.match, crawler.links(self.base_url))
+                    if match]
+
+        def fetch(version: str) -> List[Release]:
+            directory = urljoin(self.base_url, f"{version}/targets/{self.target}/")
+            sums = crawler.get(directory + 'sha256sums', missing_ok=True)
+            if sums is None:
+                return []
+            digests = parse_sums(sums)
+            prefix = f"openwrt-{version}-{self.target.replace('/', '-')}-"
+            found = [self._release(version, image, prefix + image, directory + prefix + image, digests,
+                                   self.source.get('platform', self.target))
+                     for image in self.images]
+            return [release for release in found if release]
+
+        return [release for found in crawler.map(fetch, self.select(versions)) for release in found]
+
+
+class UbuntuProvider(ReleaseProvider):
+    """Ubuntu images from releases.ubuntu.com.
+
+    ``series`` lists release series such as ``"24.04"`` (default: the newest
+    ``keep`` series, only LTS ones with ``lts: true``); ``images`` are file
+    name suffixes such as ``live-server-amd64.iso``.
+    """
+
+    title = 'Ubuntu'
+    default_images = ('live-server-amd64.iso',)
+    SERIES_RE = re.compile(r'^(\d+\.\d+)/$')
+
+    def __init__(self, source: Dict):
+        super().__init__(source)
+        self.base_url = source.get('baseUrl', 'https://releases.ubuntu.com/')
+
+    def select(self, versions: Iterable[str]) -> List[str]:
+        series = self.source.get('series')
+        if series:
+            wanted = {str(s) for s in ([series] if isinstance(series, (str, float)) else series)}
+            return sorted((v for v in versions if v in wanted), key=version_key, reverse=True)
+        if self.source.get('lts'):
+            versions = [v for v in versions if v.endswith('.04') and int(v.split('.')[0]) % 2 == 0]
+        return super().select(versions)
+
+    def releases(self, crawler: Crawler) -> List[Release]:
+        series = [match.group(1) for match in map(self.SERIES_RE.match, crawler.links(self.base_url))
+                  if match]
+
+        def fetch(version: str) -> List[Release]:
+            directory = urljoin(self.base_url, f"{version}/")
+            sums = crawler.get(directory + 'SHA256SUMS', missing_ok=True)
+            if sums is None:
+                return []
+            digests = parse_sums(sums)
+            found = []
+            for image in self.images:
+                pattern = re.compile(rf'^ubuntu-(\d+\.\d+(?:\.\d+)?)-{re.escape(image)}$')
+                for file_name in digests:
+                    match = pattern.match(file_name)
+                    if match:
+                        found.append(self._release(match.group(1), image, file_name, directory + file_name,
+                                                   digests, self.source.get('platform')))
+            return found
+
+        return [release for found in crawler.map(fetch, self.select(series)) for release in found]
+
+
+class ProxmoxProvider(ReleaseProvider):
+    """Proxmox installer ISOs from enterprise.proxmox.com/iso.
+
+    ``product`` is the file name prefix (default ``proxmox-ve``; also
+    ``proxmox-backup-server``, ``proxmox-mail-gateway``). The directory has a
+    single ``SHA256SUMS`` for all versions.
+    """
+
+    title = 'Proxmox VE'
+    default_images = ('.iso',)
+
+    def __init__(self, source: Dict):
+        super().__init__(source)
+        self.product = source.get('product', 'proxmox-ve')
+        if self.product != 'proxmox-ve':
+            self.title = self.product.replace('-', ' ').title()
+        self.base_url = source.get('baseUrl', 'https://enterprise.proxmox.com/iso/')
+
+    def releases(self, crawler: Crawler) -> List[Release]:
+        pattern = re.compile(rf'^{re.escape(self.product)}_(\d+\.\d+-\d+)\.iso$')
+        versions = [match.group(1) for match in map(pattern.match, crawler.links(self.base_url)) if match]
+        selected = self.select(versions)
+        if not selected:
+            return []
+        digests = parse_sums(crawler.get(urljoin(self.base_url, 'SHA256SUMS')) or '')
+        found = []
+        for version in selected:
+            file_name = f"{self.product}_{version}.iso"
+            found.append(self._release(version, '.iso', file_name, urljoin(self.base_url, file_name),
+                                       digests, self.source.get('platform', 'amd64:x86_64')))
+        return [release for release in found if release]
+
+
+class GitHubReleasesProvider(ReleaseProvider):
+    """Assets of GitHub releases, e.g. ``repo: siderolabs/talos``.
+
+    ``checksumAsset`` names the checksum list attached to each release
+    (default ``sha256sum.txt``). Set ``GITHUB_TOKEN`` to raise the API rate
+    limit.
+    """
+
+    title = 'GitHub'
+    default_repo = None
+    default_checksum_asset = 'sha256sum.txt'
+
+    def __init__(self, source: Dict):
+        super().__init__(source)
+        self.repo = source.get('repo', self.default_repo)
+        if not self.repo:
+            raise ValueError("github source needs 'repo', e.g. 'siderolabs/talos'")
+        if self.title == 'GitHub':
+            self.title = self.repo.split('/')[-1]
+        self.api_url = source.get('apiUrl', 'https://api.github.com/')
+        self.checksum_asset = source.get('checksumAsset', self.default_checksum_asset)
+
+    def releases(self, crawler: Crawler) -> List[Release]:
+        headers = {'Accept': 'application/vnd.github+json'}
+        if os.environ.get('GITHUB_TOKEN'):
+            headers['Authorization'] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+        listing = crawler.get_json(urljoin(self.api_url, f"repos/{self.repo}/releases?per_page=50"), headers)
+        by_version = {}
+        for release in listing if isinstance(listing, list) else []:
+            if release.get('draft') or (release.get('prerelease') and not self.source.get('prerelease')):
+                continue
+            assets = {asset['name']: asset['browser_download_url'] for asset in release.get('assets', [])}
+            by_version[release['tag_name'].lstrip('v')] = assets
+
+        def fetch(version: str) -> List[Release]:
+            assets = by_version[version]
+            sums_url = assets.get(self.checksum_asset)
+            digests = parse_sums(crawler.get(sums_url) or '') if sums_url else {}
+            found = [self._release(version, image, image, assets[image], digests, self.source.get('platform'))
+                     for image in self.images if image in assets]
+            return [release for release in found if release]
+
+        return [release for found in crawler.map(fetch, self.select(by_version)) for release in found]
+
+
+class TalosProvider(GitHubReleasesProvider):
+    """Talos Linux images from the siderolabs/talos GitHub releases."""
+
+    title = 'Talos OS'
+    default_repo = 'siderolabs/talos'
+    default_images = ('metal-amd64.iso',)
+
+
+# Provider name (``provider:`` of a source) -> class
+PROVIDERS = {
+    'openwrt': OpenWrtProvider,
+    'ubuntu': UbuntuProvider,
+    'proxmox': ProxmoxProvider,
+    'github': GitHubReleasesProvider,
+    'talos': TalosProvider,
+}
+
+
+class ReleaseDiscovery:
+    """Crawl every source of ``settings.discovery`` and maintain a generated catalog file.
+
+    Settings::
+
+        discovery:
+          output: "generated/discovered.yml"  # relative to the config file
+          ttl: 3600                           # seconds index pages are reused
+          workers: 8                          # concurrent requests
+          sources:
+            - provider: openwrt
+              target: "ramips/mt7621"
+              images: ["tplink_archer-a6-v3-squashfs-factory.bin"]
+              keep: 2
+              downloadLocation: "networking/router/openwrt/{version}"
+              tags: ["Networking"]
+              entry: {segments: 2}            # extra keys for every generated entry
+
+    The main config includes the output file (``include: ["generated/*.yml"]``).
+    ``name`` and ``downloadLocation`` may use ``{version}``, ``{image}`` and
+    ``{fileName}``. Releases already in the hand-written catalog (same
+    ``downloadLink``) are skipped. When a source fails, its previously
+    generated entries are kept.
+    """
+
+    def __init__(self, manager, refresh: bool = False):
+        self.manager = manager
+        self.settings = (manager.config.get('settings') or {}).get('discovery') or {}
+        self.config_path = Path(manager.config_path).resolve()
+        self.output = (self.config_path.parent / self.settings.get('output', DEFAULT_OUTPUT)).resolve()
+        self.cache = UrlStore(manager.state_dir / 'discovery-cache.json', manager.iso_base_dir)
+        self.crawler = Crawler(manager.session, self.cache, self.settings.get('ttl', DEFAULT_TTL),
+                               self.settings.get('workers', DEFAULT_WORKERS), manager._timeout(), refresh)
+
+    @staticmethod
+    def source_id(source: Dict) -> str:
+        """Stable identifier of a source, recorded as ``discoveredBy`` on its entries."""
+        if source.get('id'):
+            return str(source['id'])
+        detail = next((str(source[key]) for key in ('target', 'product', 'repo', 'series') if key in source), '')
+        return f"{source.get('provider')}:{detail}" if detail else str(source.get('provider'))
+
+    def discover(self) -> List[Tuple[Dict, List[Release], Optional[str]]]:
+        """Crawl all sources concurrently.
+
+        Returns:
+            ``(source, releases, error)`` per source, in configuration order
+        """
+        def crawl(source: Dict):
+            try:
+                provider_class = PROVIDERS.get(source.get('provider'))
+                if provider_class is None:
+                    raise ValueError(f"unknown provider {source.get('provider')!r} "
+                                     f"(known: {', '.join(PROVIDERS)})")
+                return source, provider_class(source).releases(self.crawler), None
+            except (DiscoveryError, ValueError, KeyError, TypeError) as e:
+                return source, [], str(e)
+
+        try:
+            return self.crawler.map(crawl, self.settings.get('sources') or [])
+        finally:
+            self.cache.save()
+
+    def entry(self, source: Dict, release: Release) -> Dict:
+        """Catalog entry (config layout) for ``release``."""
+        fields = {'version': release.version, 'image': release.image or '', 'fileName': release.file_name}
+        entry = {
+            'name': source.get('name', release.name).format(**fields),
+            'version': release.version,
+        }
+        if release.platform:
+            entry['platform'] = release.platform
+        entry.update({
+            'fileName': release.file_name,
+            'checkSum': release.checksum,
+            'checkSumAlgo': release.checksum_algo,
+            'downloadLink': release.download_link,
+            'downloadLocation': source.get('downloadLocation',
+                                           f"discovered/{source.get('provider')}/{{version}}").format(**fields),
+            'tags': list(source.get('tags') or []),
+        })
+        if not release.checksum:
+            del entry['checkSum']
+        entry.update(source.get('entry') or {})
+        entry['discoveredBy'] = self.source_id(source)
+        return entry
+
+    def update_catalog(self, dry_run: bool = False) -> Dict:
+        """Regenerate the output catalog file from the discovered releases.
+
+        The new file is validated together with the rest of the catalog
+        before it replaces the previous one.
+
+        Returns:
+            Report with the ``added``, ``removed`` and ``unchanged`` entry
+            names, per-source ``errors``, ``stale`` URLs and the ``output`` path
+
+        Raises:
+            CatalogError: If the generated entries do not validate
+        """
+        previous = self._read_output()
+        manual_links = {iso.get('downloadLink') for iso in self.manager.catalog.isos
+                        if not iso.source.startswith(str(self.output))}
+
+        entries, errors = [], []
+        for source, releases, error in self.discover():
+            if error:
+                source_id = self.source_id(source)
+                errors.append({'source': source_id, 'error': error})
+                entries.extend(entry for entry in previous if entry.get('discoveredBy') == source_id)
+                continue
+            entries.extend(self.entry(source, release) for release in releases
+                           if release.download_link not in manual_links)
+
+        old = {entry.get('downloadLink'): entry for entry in previous}
+        new = {entry.get('downloadLink'): entry for entry in entries}
+        report = {
+            'output': str(self.output),
+            'added': [entry['name'] for link, entry in new.items() if link not in old],
+            'removed': [entry['name'] for link, entry in old.items() if link not in new],
+            'updated': [entry['name'] for link, entry in new.items() if link in old and old[link] != entry],
+            'unchanged': [entry['name'] for link, entry in new.items() if old.get(link) == entry],
+            'errors': errors,
+            'stale': sorted(set(self.crawler.stale)),
+            'written': False,
+        }
+        if dry_run or (entries == previous and self.output.exists()):
+            return report
+
+        backup = self.output.read_bytes() if self.output.exists() else None
+        self._write_output(entries)
+        try:
+            Catalog.load(self.config_path)
+        except Exception:
+            if backup is None:
+                self.output.unlink(missing_ok=True)
+            else:
+                self.output.write_bytes(backup)
+            raise
+        report['written'] = True
+        return report
+
+    def _read_output(self) -> List[Dict]:
+        try:
+            with open(self.output, 'r') as f:
+                data = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError):
+            return []
+        isos = data.get('isos') if isinstance(data, dict) else None
+        return isos if isinstance(isos, list) else []
+
+    def _write_output(self, entries: List[Dict]) -> None:
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.output.with_name(self.output.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(GENERATED_HEADER)
+            yaml.safe_dump({'isos': entries}, f, sort_keys=False, allow_unicode=True)
+        os.replace(tmp_path, self.output)
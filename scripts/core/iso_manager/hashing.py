@@ -0,0 +1,181 @@
+"""Checksum helpers for the ISO manager."""
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+READ_SIZE = 1024 * 1024
+# Large reads keep hashing CPU-bound instead of syscall-bound on multi-GB images
+DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def new_hash(algorithm: str):
+    """Return a fresh hash object for ``algorithm`` (e.g. 'sha256', 'md5').
+
+    ``hashlib.new`` is used, as by the catalog's ``checkSumAlgo`` check, so
+    every algorithm OpenSSL provides (e.g. 'sha512_256') is accepted.
+    Variable-length digests (shake_*) have no fixed hex digest and are not.
+    """
+    try:
+        hash_obj = hashlib.new(algorithm.lower())
+    except ValueError:
+        raise ValueError(f"Unsupported hash algorithm: {algorithm}") from None
+    if not hash_obj.digest_size:
+        raise ValueError(f"Unsupported hash algorithm: {algorithm} (variable-length digest)")
+    return hash_obj
+
+
+def hash_file(path: Path, algorithms: Sequence[str] = ('sha256',),
+              buffer_size: int = DEFAULT_BUFFER_SIZE) -> Dict[str, str]:
+    """Compute one or more digests of a file in a single pass.
+
+    The file is read with ``readinto`` into one reusable buffer, so no bytes
+    object is allocated per read and every algorithm is fed from the same
+    memory.
+
+    Args:
+        path: File to hash
+        algorithms: Hash algorithm names, e.g. ('sha256', 'md5')
+        buffer_size: Read size in bytes
+
+    Returns:
+        Dictionary mapping each lower-cased algorithm name to its hex digest
+    """
+    hashes = {algorithm.lower(): new_hash(algorithm) for algorithm in algorithms}
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            count = f.readinto(view)
+            if not count:
+                break
+            chunk = view[:count]
+            for h in hashes.values():
+                h.update(chunk)
+    return {algorithm: h.hexdigest() for algorithm, h in hashes.items()}
+
+
+def hash_files(paths: Iterable[Path], algorithms: Sequence[str] = ('sha256',), jobs: int = None,
+               buffer_size: int = DEFAULT_BUFFER_SIZE) -> Dict[Path, Dict[str, str]]:
+    """Hash several files concurrently.
+
+    hashlib releases the GIL while digesting large buffers, so a thread pool
+    spreads the work over all cores.
+
+    Args:
+        paths: Files to hash
+        algorithms: Hash algorithm names computed for every file
+        jobs: Number of worker threads (defaults to the CPU count)
+        buffer_size: Read size in bytes
+
+    Returns:
+        Dictionary mapping each path to its digests, or to the raised
+        exception if the file could not be read
+    """
+    paths = list(paths)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(paths) or 1))
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='iso-hash') as pool:
+        futures = {path: pool.submit(hash_file, path, algorithms, buffer_size) for path in paths}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except OSError as e:
+                results[path] = e
+    return results
+
+
+class PrefixHasher:
+    """Hash a file while it is being downloaded.
+
+    Data is fed with ``update(offset, data)`` right after it has been written
+    to disk. Bytes arriving at the current hash position are hashed straight
+    from memory; bytes written further ahead (other segments of a segmented
+    download, or the persisted part of a resumed one) are read back from disk
+    exactly once, as soon as the hash position reaches them.
+
+    ``segments`` uses the resume metadata layout: ``[start, end, written]``
+    lists, where ``written`` counts the bytes already on disk from ``start``.
+
+    An optional ``sink`` (e.g. ``postprocess.StreamDecompressor``) receives
+    the same in-order bytes through ``write(data)`` and is ``reset()``
+    whenever hashing starts over.
+    """
+
+    def __init__(self, algorithm: str, sink=None):
+        self.algorithm = algorithm
+        self.sink = sink
+        self._lock = threading.Lock()
+        self.reset(None, [])
+
+    def reset(self, path: Optional[Path], segments: List[List[int]]) -> None:
+        """Start over for a new (empty) part file."""
+        with self._lock:
+            self._hash = new_hash(self.algorithm)
+            self.position = 0
+            if self.sink:
+                self.sink.reset()
+            self.path = path
+            self.segments = segments
+
+    def resume(self, path: Path, segments: List[List[int]]) -> None:
+        """Continue hashing an existing part file described by ``segments``.
+
+        Hashing progress is kept when the layout is unchanged (a retry of the
+        same download); otherwise it starts over. Data already on disk beyond
+        the hash position is read once to catch up.
+        """
+        layout = [(seg[0], seg[1]) for seg in segments]
+        if path != self.path or layout != [(seg[0], seg[1]) for seg in self.segments]:
+            self.reset(path, segments)
+        with self._lock:
+            self.segments = segments
+            self._catch_up()
+
+    def update(self, offset: int, data: bytes) -> None:
+        """Feed ``data`` that has just been written to disk at ``offset``."""
+        with self._lock:
+            end = offset + len(data)
+            if offset <= self.position < end:
+                self._feed(memoryview(data)[self.position - offset:])
+                self.position = end
+            self._catch_up()
+
+    def _feed(self, data) -> None:
+        self._hash.update(data)
+        if self.sink:
+            self.sink.write(data)
+
+    def _catch_up(self) -> None:
+        """Hash data that is already on disk directly after the hash position."""
+        while True:
+            segment = next((seg for seg in self.segments if seg[0] <= self.position < seg[1]), None)
+            if segment is None:
+                return
+            written_end = segment[0] + segment[2]
+            if written_end <= self.position:
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self.position)
+                buffer = bytearray(READ_SIZE)
+                view = memoryview(buffer)
+                remaining = written_end - self.position
+                while remaining:
+                    count = f.readinto(view[:min(READ_SIZE, remaining)])
+                    if not count:
+                        return
+                    self._feed(view[:count])
+                    remaining -= count
+                    self.position += count
+
+    def hexdigest(self, size: Optional[int]) -> Optional[str]:
+        """Return the digest once ``size`` bytes were hashed, otherwise None."""
+        with self._lock:
+            self._catch_up()
+            if size is not None and self.position != size:
+                return None
+            return self._hash.hexdigest()
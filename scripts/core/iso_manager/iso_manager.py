@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 import os
 import sys
-import yaml
-import hashlib
+import json
+import time
+import argparse
 import requests
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Set
-from urllib.parse import urlparse
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from rich.console import Console
 from rich.panel import Panel
@@ -21,127 +29,1268 @@ from rich.progress import (
 from rich.table import Table
 from rich.prompt import Prompt
 
+try:
+    from .blob_store import BlobStore
+    from .catalog import Catalog
+    from .checksum_sources import ChecksumResolver, ChecksumSourceError
+    from .discovery import ReleaseDiscovery, version_key
+    from .hashing import PrefixHasher, hash_file
+    from .mirror_server import MirrorServer
+    from .postprocess import PostProcessError, PostProcessor
+    from .ratelimit import RateSchedule, Throttle, TokenBucket
+    from .units import parse_size
+    from .remote_state import RemoteState
+    from .retention import Artifact, DeviceFirmware, RetentionPolicy, UsageLog, product_key, scan_tree
+    from .verify_cache import VerifyCache, VERIFIED, CORRUPT, STALE, UNVERIFIED, MISSING
+except ImportError:  # executed as a script by scripts/utils/isoManager.sh
+    from blob_store import BlobStore
+    from catalog import Catalog
+    from checksum_sources import ChecksumResolver, ChecksumSourceError
+    from discovery import ReleaseDiscovery, version_key
+    from hashing import PrefixHasher, hash_file
+    from mirror_server import MirrorServer
+    from postprocess import PostProcessError, PostProcessor
+    from ratelimit import RateSchedule, Throttle, TokenBucket
+    from units import parse_size
+    from remote_state import RemoteState
+    from retention import Artifact, DeviceFirmware, RetentionPolicy, UsageLog, product_key, scan_tree
+    from verify_cache import VerifyCache, VERIFIED, CORRUPT, STALE, UNVERIFIED, MISSING
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_PER_HOST = 2
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 60.0
+DEFAULT_TIMEOUT = 30
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_HTTP_RETRIES = 3
+DEFAULT_MIRROR_RETRIES = 1
+DEFAULT_MIRROR_PORT = 8080
+USER_AGENT = 'TuxTechIaaC-ISOManager'
+CHUNK_SIZE = 1024 * 1024
+STATE_DIR = '.isomanager'
+# Device profiles of the OpenWRT firmware manager, whose downloads prune keeps
+DEFAULT_DEVICE_PROFILES = Path(__file__).resolve().parent.parent / 'openwrt' / 'config' / 'devices.yml'
+DEFAULT_MIN_SEGMENT_SIZE = 64 * 1024 * 1024
+SEGMENT_META_INTERVAL = 32 * 1024 * 1024
+
+ISO_STATUS_LABELS = {
+    VERIFIED: "[green]✓ verified",
+    UNVERIFIED: "[cyan]• unverified",
+    STALE: "[yellow]⚠ stale",
+    CORRUPT: "[red]✗ corrupt",
+    MISSING: "[yellow]✗ missing",
+}
+
+
+class IncompleteDownload(IOError):
+    """Raised when a transfer ends before the advertised size was received."""
+
+
+class RangeNotHonored(IncompleteDownload):
+    """Raised when a segment request is answered without a partial response."""
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a single ISO download, used for batch summaries."""
+    name: str
+    path: Path
+    status: str  # 'downloaded', 'linked', 'skipped' or 'failed'
+    bytes: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return self.status != 'failed'
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), path=str(self.path))
+
+
 class ISOManager:
-    def __init__(self, config_path: str = None):
-        self.console = Console()
+    def __init__(self, config_path: str = None, iso_dir: str = None, quiet: bool = False):
+        """
+        Args:
+            config_path: Path to the ISO config file (default: config/config.yml)
+            iso_dir: Root of the ISO tree (default: <repo>/iso)
+            quiet: Suppress all console output and progress rendering, for
+                   programmatic use of the returned results
+        """
+        self.quiet = quiet
+        self.console = Console(quiet=quiet)
         self.repo_root = Path(__file__).resolve().parent.parent.parent.parent
         self.config_path = config_path or self.repo_root / 'scripts' / 'core' / 'iso_manager' / 'config' / 'config.yml'
+        self.iso_base_dir = Path(iso_dir) if iso_dir else self.repo_root / 'iso'
+        self.state_dir = self.iso_base_dir / STATE_DIR
         self.config = self._load_config()
-        self.iso_base_dir = self.repo_root / 'iso'
+        self.verify_cache = VerifyCache(self.state_dir / 'verify-cache.json', self.iso_base_dir)
+        self.remote_state = RemoteState(self.state_dir / 'remote-state.json', self.iso_base_dir)
+        self.blob_store = BlobStore(self.state_dir / 'blobs')
+        self.usage = UsageLog(self.state_dir / 'usage.json', self.iso_base_dir)
+        self.checksums = ChecksumResolver(self)
+        self._session = None
+        self._session_lock = threading.Lock()
+        # Shared by all downloads so rateLimit caps their sum
+        self._global_bucket = TokenBucket()
+        self._rate_schedule = None
+
+    def __enter__(self) -> 'ISOManager':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close pooled HTTP connections."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> requests.Session:
+        """Shared HTTP session used for every request the manager makes.
+
+        Connections are kept alive and pooled per host, so batch downloads,
+        segment requests and HEAD probes against the same mirror reuse TCP/TLS
+        connections instead of handshaking for every file.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        settings = self._settings()
+        max_segments = max([int(iso.get('segments', settings.get('segments', 1)))
+                            for iso in self.config.get('isos', [])] or [1])
+        pool_size = settings.get('poolSize') or max(
+            10, settings.get('maxPerHost', DEFAULT_MAX_PER_HOST) * max_segments)
+        retry = Retry(
+            total=settings.get('httpRetries', DEFAULT_HTTP_RETRIES),
+            backoff_factor=settings.get('backoffFactor', DEFAULT_BACKOFF),
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['HEAD', 'GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        return session
+
+    def _timeout(self) -> Tuple[float, float]:
+        """(connect, read) timeout for HTTP requests."""
+        settings = self._settings()
+        return (settings.get('connectTimeout', DEFAULT_CONNECT_TIMEOUT),
+                settings.get('timeout', DEFAULT_TIMEOUT))
 
     def _load_config(self) -> Dict:
-        """Load and validate the YAML configuration."""
-        try:
-            with open(self.config_path, 'r') as f:
-                config = yaml.safe_load(f)
-            return config or {}
-        except Exception as e:
-            self.console.print(f"[bold red]Error loading config:[/] {e}")
-            return {}
+        """Load and validate the YAML configuration.
+
+        The config file and the files it lists under ``include:`` are parsed
+        into a ``Catalog`` (kept in ``self.catalog``), which is cached in the
+        state directory until one of the files changes.
+
+        Raises:
+            CatalogError: If a file is unreadable, malformed or fails validation
+        """
+        self.catalog = Catalog.load(self.config_path, self.state_dir / 'catalog.pickle')
+        return self.catalog.to_config()
 
     def _get_checksum(self, file_path: Path, algorithm: str = 'sha256') -> str:
         """Calculate checksum of a file."""
-        hash_func = getattr(hashlib, algorithm.lower(), None)
-        if not hash_func:
-            raise ValueError(f"Unsupported hash algorithm: {algorithm}")
-
-        h = hash_func()
-        with open(file_path, 'rb') as f:
-            while chunk := f.read(8192):
-                h.update(chunk)
-        return h.hexdigest()
-
-    def _download_file(self, url: str, dest: Path) -> bool:
-        """Download a file with rich progress bar."""
+        return hash_file(file_path, (algorithm,))[algorithm.lower()]
+
+    def _settings(self) -> Dict:
+        """Return the download settings block from the config."""
+        return (self.config.get('settings') or {}).get('downloads') or {}
+
+    @property
+    def rate_schedule(self) -> RateSchedule:
+        """Bandwidth limits from ``settings.downloads`` (rateLimit, perDownloadLimit, schedule)."""
+        if self._rate_schedule is None:
+            self._rate_schedule = RateSchedule(self._settings())
+        return self._rate_schedule
+
+    def _throttle(self) -> Optional[Throttle]:
+        """Rate limiter for one download, or None when no limit is configured."""
+        if not self.rate_schedule.enabled:
+            return None
+        return Throttle(self.rate_schedule, self._global_bucket)
+
+    def _new_progress(self, transient: bool = True) -> Progress:
+        """Create the rich progress display used for downloads."""
+        return Progress(
+            TextColumn("[bold blue]{task.description}"),
+            BarColumn(bar_width=None),
+            "[progress.percentage]{task.percentage:>3.0f}%",
+            "•",
+            DownloadColumn(),
+            "•",
+            TransferSpeedColumn(),
+            "•",
+            TimeRemainingColumn(),
+            console=self.console,
+            transient=transient,
+            disable=self.quiet or not self.console.is_terminal,
+        )
+
+    def _expected_checksum(self, iso_config: Dict, offline: bool = False) -> Tuple[Optional[str], str]:
+        """Return the (digest, algorithm) an entry is verified against.
+
+        An explicit ``checkSum`` wins; otherwise the digest comes from the
+        upstream checksum file (``checkSumUrl``, see ``ChecksumResolver``).
+        Snapshot entries have no fixed digest.
+
+        Raises:
+            ChecksumSourceError: If the upstream checksum cannot be trusted
+        """
+        algorithm = iso_config.get('checkSumAlgo', 'sha256').lower()
+        if iso_config.get('snapshot'):
+            return None, algorithm
+        if iso_config.get('checkSum'):
+            return iso_config['checkSum'].lower(), algorithm
+        resolved = self.checksums.resolve(iso_config, offline=offline)
+        return resolved if resolved else (None, algorithm)
+
+    def _iso_path(self, iso_config: Dict) -> Path:
+        """Return the local path an ISO entry is stored at."""
+        relative_path = iso_config.get('downloadLocation', '').lstrip('/')
+        return self.iso_base_dir / relative_path / iso_config.get('fileName', '')
+
+    @staticmethod
+    def _part_paths(dest: Path):
+        """Return the partial download file and its resume metadata file."""
+        return dest.with_name(dest.name + '.part'), dest.with_name(dest.name + '.part.json')
+
+    @staticmethod
+    def _load_part_meta(meta_path: Path) -> Dict:
         try:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_part_meta(meta_path: Path, meta: Dict) -> None:
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+    def _download_file(self, url: str, dest: Path, progress: Progress = None, task=None,
+                       segments: int = 1, min_segment_size: int = DEFAULT_MIN_SEGMENT_SIZE,
+                       algorithm: str = 'sha256', retries: int = None, sink=None,
+                       throttled: bool = True) -> Optional[str]:
+        """Download a file with rich progress bar.
+
+        Data is written to ``<dest>.part`` and only renamed to ``dest`` once
+        complete. Interrupted transfers are resumed with HTTP Range requests
+        (guarded by the ETag/Last-Modified stored in ``<dest>.part.json``) and
+        retried with exponential backoff. With ``segments`` > 1 large files are
+        fetched over several connections in parallel (see ``_fetch_segmented``).
+        When ``progress`` is given the transfer is reported on ``task`` of that
+        shared display (batch mode) instead of a dedicated progress bar.
+        ``sink`` receives the downloaded bytes in order (see ``PrefixHasher``).
+        Unless ``throttled`` is False (LAN mirrors) the transfer is subject to
+        the configured bandwidth limits (see ``rate_schedule``).
+
+        Returns:
+            The ``algorithm`` digest of the file, computed while downloading,
+            or None if the download failed
+        """
+        settings = self._settings()
+        if retries is None:
+            retries = settings.get('retries', DEFAULT_RETRIES)
+        backoff = settings.get('backoffFactor', DEFAULT_BACKOFF)
+        max_backoff = settings.get('maxBackoff', DEFAULT_MAX_BACKOFF)
+        part_path, meta_path = self._part_paths(dest)
+
+        try:
+            hasher = PrefixHasher(algorithm, sink)
+            throttle = self._throttle() if throttled else None
             dest.parent.mkdir(parents=True, exist_ok=True)
-            response = requests.get(url, stream=True)
+        except (ValueError, OSError) as e:
+            self.console.print(f"[bold red]Download failed:[/] {dest.name}: {e}")
+            return None
+
+        with nullcontext(progress) if progress else self._new_progress() as progress:
+            if task is None:
+                task = progress.add_task(f"Downloading {dest.name}...", total=None)
+            else:
+                progress.update(task, description=f"Downloading {dest.name}...")
+                progress.start_task(task)
+
+            attempt = 0
+            while True:
+                try:
+                    self._fetch_to_part(url, part_path, meta_path, progress, task,
+                                        segments, min_segment_size, hasher, throttle)
+                    digest = hasher.hexdigest(part_path.stat().st_size)
+                    part_path.replace(dest)
+                    meta = self._load_part_meta(meta_path)
+                    self.remote_state.record(dest, url, meta.get('etag'), meta.get('lastModified'),
+                                             meta.get('size'))
+                    meta_path.unlink(missing_ok=True)
+                    return digest or self._get_checksum(dest, algorithm)
+                except (requests.RequestException, OSError) as e:
+                    status = getattr(getattr(e, 'response', None), 'status_code', None)
+                    if status and 400 <= status < 500 and status not in (408, 429):
+                        self.console.print(f"[bold red]Download failed:[/] {dest.name}: {e}")
+                        return None
+                    attempt += 1
+                    if attempt > retries:
+                        self.console.print(f"[bold red]Download failed:[/] {dest.name}: {e} "
+                                           f"(gave up after {retries} retries)")
+                        return None
+                    delay = min(backoff * 2 ** (attempt - 1), max_backoff)
+                    self.console.print(f"[yellow]⚠ {dest.name}: {e}; retrying in {delay:.0f}s "
+                                       f"({attempt}/{retries})")
+                    time.sleep(delay)
+
+    def _fetch_to_part(self, url: str, part_path: Path, meta_path: Path, progress: Progress, task,
+                       segments: int, min_segment_size: int, hasher: PrefixHasher,
+                       throttle: Throttle = None) -> None:
+        """Transfer ``url`` into ``part_path``, resuming from its current size."""
+        meta = self._load_part_meta(meta_path)
+        if part_path.exists() and meta.get('segments') and meta.get('url') == url:
+            hasher.resume(part_path, meta['segments'])
+            return self._fetch_segmented(url, part_path, meta_path, meta, progress, task, hasher, throttle)
+        if segments > 1 and not part_path.exists():
+            meta = self._plan_segments(url, segments, min_segment_size)
+            if meta:
+                hasher.reset(part_path, meta['segments'])
+                return self._fetch_segmented(url, part_path, meta_path, meta, progress, task, hasher, throttle)
+
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {}
+        if offset and meta.get('url', url) == url:
+            headers['Range'] = f"bytes={offset}-"
+            validator = meta.get('etag') or meta.get('lastModified')
+            if validator:
+                headers['If-Range'] = validator
+        else:
+            offset = 0
+
+        with self.session.get(url, stream=True, headers=headers, timeout=self._timeout()) as response:
+            if response.status_code == 416:
+                # Our partial file is as large as (or larger than) the remote one:
+                # it cannot be resumed, start over.
+                part_path.unlink(missing_ok=True)
+                raise IncompleteDownload("server rejected resume range, restarting download")
             response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            chunk_size = 8192
-
-            with Progress(
-                TextColumn("[bold blue]{task.description}"),
-                BarColumn(bar_width=None),
-                "[progress.percentage]{task.percentage:>3.0f}%",
-                "•",
-                DownloadColumn(),
-                "•",
-                TransferSpeedColumn(),
-                "•",
-                TimeRemainingColumn(),
-                console=self.console,
-                transient=True,
-            ) as progress:
-                task = progress.add_task(f"Downloading {dest.name}...", total=total_size)
-                
-                with open(dest, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=chunk_size):
-                        f.write(chunk)
-                        progress.update(task, advance=len(chunk))
-            
-            return True
-        except Exception as e:
-            self.console.print(f"[bold red]Download failed:[/] {e}")
-            return False
 
-    def verify_iso(self, iso_path: Path, expected_hash: str, algorithm: str = 'sha256') -> bool:
-        """Verify ISO checksum with rich output."""
+            if response.status_code == 206 and response.headers.get(
+                    'content-range', '').startswith(f"bytes {offset}-"):
+                mode = 'ab'
+            else:
+                # Server ignored the Range request (or the file changed): full fetch
+                offset, mode = 0, 'wb'
+
+            length = int(response.headers.get('content-length', 0))
+            total_size = offset + length if length else None
+            self._save_part_meta(meta_path, {
+                'url': url,
+                'etag': response.headers.get('etag'),
+                'lastModified': response.headers.get('last-modified'),
+                'size': total_size,
+            })
+
+            layout = [[0, total_size or sys.maxsize, offset]]
+            if offset:
+                hasher.resume(part_path, layout)
+            else:
+                hasher.reset(part_path, layout)
+
+            progress.update(task, total=total_size, completed=offset)
+            received = offset
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    hasher.update(received, chunk)
+                    received += len(chunk)
+                    progress.update(task, advance=len(chunk))
+                    if throttle:
+                        throttle.consume(len(chunk))
+
+        if total_size and received != total_size:
+            raise IncompleteDownload(f"received {received} of {total_size} bytes")
+
+    def _plan_segments(self, url: str, segments: int, min_segment_size: int) -> Optional[Dict]:
+        """Probe ``url`` and split it into byte ranges for a segmented download.
+
+        Returns the resume metadata describing the segments, or None when the
+        server does not advertise range support and a length, or the file is
+        too small to be worth splitting.
+        """
+        response = self.session.head(url, allow_redirects=True, timeout=self._timeout())
+        if not response.ok:
+            return None
+        size = int(response.headers.get('content-length', 0))
+        if response.headers.get('accept-ranges', '').lower() != 'bytes' or not size:
+            return None
+        count = min(segments, size // max(min_segment_size, 1))
+        if count < 2:
+            return None
+
+        step = size // count
+        bounds = [i * step for i in range(count)] + [size]
+        return {
+            'url': url,
+            'etag': response.headers.get('etag'),
+            'lastModified': response.headers.get('last-modified'),
+            'size': size,
+            # [start, end (exclusive), bytes already written]
+            'segments': [[bounds[i], bounds[i + 1], 0] for i in range(count)],
+        }
+
+    def _fetch_segmented(self, url: str, part_path: Path, meta_path: Path, meta: Dict,
+                         progress: Progress, task, hasher: PrefixHasher, throttle: Throttle = None) -> None:
+        """Fetch the segments described in ``meta`` in parallel into ``part_path``.
+
+        The part file is preallocated to the final size and every segment is
+        written at its own offset, so the per-segment progress persisted in the
+        metadata is enough to resume each connection where it stopped. The first
+        unfinished segment is hashed from memory as it arrives, later ones are
+        read back once the hash position reaches them.
+        """
+        size = meta['size']
+        pending = [seg for seg in meta['segments'] if seg[2] < seg[1] - seg[0]]
+        validator = meta.get('etag') or meta.get('lastModified')
+        timeout = self._timeout()
+        lock = threading.Lock()
+        unsaved = [0]
+
+        def save_meta() -> None:
+            with lock:
+                self._save_part_meta(meta_path, meta)
+
+        def fetch_segment(seg: List[int]) -> None:
+            start, end = seg[0], seg[1]
+            position = start + seg[2]
+            headers = {'Range': f"bytes={position}-{end - 1}"}
+            if validator:
+                headers['If-Range'] = validator
+            with self.session.get(url, stream=True, headers=headers, timeout=timeout) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise RangeNotHonored(f"server ignored range request for bytes {position}-{end - 1}")
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    chunk = chunk[:end - position]
+                    write(chunk, position)
+                    with lock:
+                        seg[2] = position + len(chunk) - start
+                        unsaved[0] += len(chunk)
+                        flush = unsaved[0] >= SEGMENT_META_INTERVAL
+                        if flush:
+                            unsaved[0] = 0
+                    hasher.update(position, chunk)
+                    position += len(chunk)
+                    progress.update(task, advance=len(chunk))
+                    if throttle:
+                        throttle.consume(len(chunk))
+                    if flush:
+                        save_meta()
+            if position != end:
+                raise IncompleteDownload(f"segment {start}-{end - 1} ended at byte {position}")
+
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        if hasattr(os, 'pwrite'):
+            def write(data: bytes, offset: int) -> None:
+                os.pwrite(fd, data, offset)
+        else:
+            def write(data: bytes, offset: int) -> None:
+                with lock:
+                    os.lseek(fd, offset, os.SEEK_SET)
+                    os.write(fd, data)
+
+        try:
+            if os.fstat(fd).st_size != size:
+                if hasattr(os, 'posix_fallocate'):
+                    try:
+                        os.posix_fallocate(fd, 0, size)
+                    except OSError:
+                        os.ftruncate(fd, size)
+                else:
+                    os.ftruncate(fd, size)
+            save_meta()
+            progress.update(task, total=size, completed=sum(seg[2] for seg in meta['segments']))
+
+            with ThreadPoolExecutor(max_workers=len(pending) or 1,
+                                    thread_name_prefix='iso-segment') as pool:
+                futures = [pool.submit(fetch_segment, seg) for seg in pending]
+                errors = [future.exception() for future in futures if future.exception()]
+        finally:
+            os.close(fd)
+            if part_path.exists():
+                save_meta()
+
+        if any(isinstance(error, RangeNotHonored) for error in errors):
+            # The remote file changed or lost range support: start from scratch
+            part_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+        if errors:
+            raise errors[0]
+
+    def verify_iso(self, iso_path: Path, expected_hash: str, algorithm: str = 'sha256',
+                   progress: Progress = None, task=None) -> bool:
+        """Verify ISO checksum with rich output.
+
+        Digests are looked up in the verification cache first, so an unchanged
+        file that was hashed before is verified without reading it.
+        """
         if not iso_path.exists():
             return False
         
         try:
-            with self.console.status(f"[cyan]Verifying {iso_path.name}..."):
-                actual_hash = self._get_checksum(iso_path, algorithm)
+            actual_hash = self.verify_cache.lookup(iso_path, algorithm)
+            if actual_hash is None:
+                if progress:
+                    progress.update(task, description=f"Verifying {iso_path.name}...")
+                    status = nullcontext()
+                else:
+                    status = self.console.status(f"[cyan]Verifying {iso_path.name}...")
+                with status:
+                    actual_hash = self._get_checksum(iso_path, algorithm)
+                self.verify_cache.store(iso_path, algorithm, actual_hash)
             
-            if actual_hash.lower() == expected_hash.lower():
-                self.console.print(f"[green]✓ Checksum verified for {iso_path.name}")
-                return True
-            else:
-                self.console.print(f"[yellow]⚠ Checksum mismatch for {iso_path.name}")
-                self.console.print(f"  Expected: {expected_hash.lower()}")
-                self.console.print(f"  Actual:   {actual_hash.lower()}")
-                return False
+            return self._compare_checksum(iso_path, expected_hash, actual_hash)
         except Exception as e:
             self.console.print(f"[red]✗ Checksum verification failed: {e}")
             return False
 
-    def download_iso(self, iso_config: Dict) -> bool:
-        """Download and verify an ISO file."""
+    def _compare_checksum(self, iso_path: Path, expected_hash: str, actual_hash: str) -> bool:
+        """Compare a computed digest with the expected one and report the result."""
+        if actual_hash.lower() == expected_hash.lower():
+            self.console.print(f"[green]✓ Checksum verified for {iso_path.name}")
+            return True
+        self.console.print(f"[yellow]⚠ Checksum mismatch for {iso_path.name}")
+        self.console.print(f"  Expected: {expected_hash.lower()}")
+        self.console.print(f"  Actual:   {actual_hash.lower()}")
+        return False
+
+    def download_iso(self, iso_config: Dict, progress: Progress = None, task=None,
+                     host_limit: threading.Semaphore = None) -> DownloadResult:
+        """Download and verify an ISO file.
+
+        ``progress``/``task`` and ``host_limit`` are supplied by ``download_all``
+        so concurrent downloads share one display and respect the per-host cap.
+        """
+        started = time.monotonic()
         iso_name = iso_config.get('fileName')
         if not iso_name:
             self.console.print("[red]✗ ISO configuration missing fileName")
-            return False
+            return DownloadResult(iso_config.get('name', 'N/A'), self.iso_base_dir, 'failed',
+                                  error='missing fileName')
+
+        dest_path = self._iso_path(iso_config)
+        try:
+            processor = PostProcessor.from_config(iso_config, dest_path)
+        except PostProcessError as e:
+            self.console.print(f"[red]✗ {iso_name}: {e}")
+            return DownloadResult(iso_name, dest_path, 'failed', error=str(e))
+
+        def finish(status: str, error: str = None) -> DownloadResult:
+            if processor and status != 'failed':
+                error = self._post_process(processor, iso_name)
+                status = 'failed' if error else status
+            size = dest_path.stat().st_size if status != 'failed' and dest_path.exists() else 0
+            if status in ('downloaded', 'linked'):
+                self.usage.touch(dest_path)
+            if progress:
+                mark = '[red]✗' if status == 'failed' else '[green]✓'
+                progress.update(task, description=f"{mark} {iso_name} ({status})")
+                if status in ('linked', 'skipped'):
+                    progress.update(task, total=size, completed=size)
+                progress.stop_task(task)
+            return DownloadResult(iso_name, dest_path, status,
+                                  bytes=size if status == 'downloaded' else 0,
+                                  elapsed=time.monotonic() - started, error=error)
 
         download_url = iso_config.get('downloadLink')
         if not download_url:
             self.console.print(f"[red]✗ No download URL provided for {iso_name}")
-            return False
+            return finish('failed', 'missing downloadLink')
 
-        relative_path = iso_config.get('downloadLocation', '').lstrip('/')
-        dest_dir = self.iso_base_dir / relative_path
-        dest_path = dest_dir / iso_name
-
-        if dest_path.exists():
-            if 'checkSum' in iso_config:
-                if self.verify_iso(dest_path, iso_config['checkSum'], 
-                                 iso_config.get('checkSumAlgo', 'sha256').lower()):
-                    self.console.print(f"[green]✓ {iso_name} already exists and checksum verified")
-                    return True
-                self.console.print(f"[yellow]⚠ Existing file checksum mismatch, re-downloading {iso_name}")
-
-        if not self._download_file(download_url, dest_path):
+        # Snapshot entries point at URLs whose content changes in place, so they
+        # have no expected digest and are refreshed when the remote changes.
+        try:
+            expected_hash, algorithm = self._expected_checksum(iso_config)
+        except ChecksumSourceError as e:
+            self.console.print(f"[red]✗ {iso_name}: {e}")
+            return finish('failed', str(e))
+
+        # With ``settings.downloads.dedupe`` every verified image is kept once in
+        # the content store; entries sharing a checksum are linked to it, and
+        # the per-digest lock makes concurrent duplicates wait for one fetch.
+        store = self.blob_store if expected_hash and self._settings().get('dedupe') else None
+        with store.lock(algorithm, expected_hash) if store else nullcontext():
+            part_path, meta_path = self._part_paths(dest_path)
+            if dest_path.exists():
+                if expected_hash:
+                    if self.verify_iso(dest_path, expected_hash, algorithm, progress, task):
+                        if store:
+                            store.adopt(dest_path, algorithm, expected_hash)
+                        self.console.print(f"[green]✓ {iso_name} already exists and checksum verified")
+                        return finish('skipped')
+                    if store:
+                        store.discard(algorithm, expected_hash, dest_path)
+                    meta_path.unlink(missing_ok=True)
+                    remote_size = self._remote_size(download_url)
+                    if remote_size and dest_path.stat().st_size < remote_size:
+                        # The existing file is just truncated: let the download resume it
+                        self.console.print(f"[yellow]⚠ Existing file checksum mismatch, resuming {iso_name}")
+                        dest_path.replace(part_path)
+                    else:
+                        # Complete (or of unknown length) but corrupt: resuming would
+                        # only hit the end of the file, so start over
+                        self.console.print(f"[yellow]⚠ Existing file checksum mismatch, downloading {iso_name} again")
+                        dest_path.unlink()
+                        part_path.unlink(missing_ok=True)
+                elif self._remote_unchanged(download_url, dest_path):
+                    self.console.print(f"[green]✓ {iso_name} is up to date (remote unchanged)")
+                    return finish('skipped')
+                else:
+                    self.console.print(f"[yellow]⚠ Remote copy of {iso_name} changed, downloading again")
+
+            if store and store.has(algorithm, expected_hash):
+                method = store.materialize(algorithm, expected_hash, dest_path)
+                if method:
+                    part_path.unlink(missing_ok=True)
+                    meta_path.unlink(missing_ok=True)
+                    self.verify_cache.store(dest_path, algorithm, expected_hash)
+                    self.console.print(f"[green]✓ {iso_name} linked from the content store ({method})")
+                    return finish('linked')
+
+            settings = self._settings()
+            segments = int(iso_config.get('segments', settings.get('segments', 1)))
+            mirror_retries = settings.get('mirrorRetries', DEFAULT_MIRROR_RETRIES)
+            min_segment_size = parse_size(iso_config.get('minSegmentSize',
+                                                         settings.get('minSegmentSize', DEFAULT_MIN_SEGMENT_SIZE)))
+
+            # The postProcess stage (e.g. gunzip) is fed from the download stream
+            sink = processor.sink if processor else None
+
+            def fetch() -> Optional[str]:
+                for mirror_url in self._mirror_urls(iso_config) if expected_hash else []:
+                    digest = self._download_file(mirror_url, dest_path, progress, task, segments,
+                                                 min_segment_size, algorithm, retries=mirror_retries,
+                                                 sink=sink, throttled=False)
+                    if digest is not None and digest.lower() == expected_hash.lower():
+                        return digest
+                    self.console.print(f"[yellow]⚠ Mirror {urlparse(mirror_url).netloc} failed for "
+                                       f"{iso_name}, trying the next source")
+                    if digest is not None:
+                        dest_path.unlink(missing_ok=True)
+                with host_limit or nullcontext():
+                    return self._download_file(download_url, dest_path, progress, task,
+                                               segments, min_segment_size, algorithm, sink=sink)
+
+            # The digest is computed while downloading, so verifying a fresh
+            # download does not read the file back from disk.
+            resumed = part_path.exists()
+            digest = fetch()
+            if digest is None:
+                return finish('failed', 'download failed')
+            self.verify_cache.store(dest_path, algorithm, digest)
+
+            if expected_hash:
+                verified = self._compare_checksum(dest_path, expected_hash, digest)
+                if not verified and resumed:
+                    self.console.print(f"[yellow]⚠ Resumed data for {iso_name} is corrupt, downloading again")
+                    dest_path.unlink(missing_ok=True)
+                    digest = fetch()
+                    if digest is None:
+                        return finish('failed', 'download failed')
+                    self.verify_cache.store(dest_path, algorithm, digest)
+                    verified = self._compare_checksum(dest_path, expected_hash, digest)
+                if not verified:
+                    if processor:
+                        processor.discard()
+                    self.console.print(f"[red]✗ Checksum verification failed for {iso_name}")
+                    return finish('failed', 'checksum mismatch')
+                if store:
+                    store.adopt(dest_path, algorithm, expected_hash)
+
+            self.console.print(f"[green]✓ Successfully downloaded and verified {iso_name}")
+            return finish('downloaded')
+
+    def _post_process(self, processor: PostProcessor, iso_name: str) -> Optional[str]:
+        """Run the ``postProcess`` stage of a verified file.
+
+        Returns:
+            An error message, or None on success (or if the output is up to date)
+        """
+        if processor.up_to_date():
+            return None
+        try:
+            output = processor.finish()
+        except OSError as e:
+            self.console.print(f"[red]✗ Post-processing {iso_name} failed: {e}")
+            return str(e)
+        self.console.print(f"[green]✓ {iso_name} processed into {output.name}")
+        return None
+
+    def _mirror_urls(self, iso_config: Dict) -> List[str]:
+        """URLs of ``iso_config`` on the mirrors in ``settings.downloads.mirrors``.
+
+        Mirrors serve the ISO tree layout (see ``serve``), so the file is
+        expected at ``<mirror>/<downloadLocation>/<fileName>``.
+        """
+        mirrors = self._settings().get('mirrors') or []
+        if isinstance(mirrors, str):
+            mirrors = [mirrors]
+        if iso_config.get('mirror') is False:
+            return []
+        relative = self._iso_path(iso_config).relative_to(self.iso_base_dir).as_posix()
+        return [f"{mirror.rstrip('/')}/{quote(relative)}" for mirror in mirrors]
+
+    def _remote_unchanged(self, url: str, dest: Path) -> bool:
+        """Check with a single HEAD request whether ``url`` still matches ``dest``.
+
+        The stored ETag/Last-Modified are sent as If-None-Match/If-Modified-Since,
+        so servers answer 304 without a body. Servers that ignore conditional
+        headers are compared on ETag, Last-Modified and Content-Length instead.
+        Files downloaded before validators were recorded are trusted when
+        their size matches the remote Content-Length.
+        """
+        stored = self.remote_state.validators(dest, url)
+        headers = {}
+        if stored and stored.get('etag'):
+            headers['If-None-Match'] = stored['etag']
+        if stored and stored.get('lastModified'):
+            headers['If-Modified-Since'] = stored['lastModified']
+        try:
+            response = self.session.head(url, headers=headers, allow_redirects=True, timeout=self._timeout())
+        except requests.RequestException:
+            return False
+        if response.status_code == 304:
+            self.remote_state.touch(dest)
+            return True
+        if not response.ok:
             return False
 
-        if 'checkSum' in iso_config:
-            if not self.verify_iso(dest_path, iso_config['checkSum'], 
-                                 iso_config.get('checkSumAlgo', 'sha256').lower()):
-                self.console.print(f"[red]✗ Checksum verification failed for {iso_name}")
-                return False
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        length = response.headers.get('content-length')
+        length = int(length) if length and length.isdigit() else None
+        if stored:
+            if etag and stored.get('etag'):
+                unchanged = etag == stored['etag']
+            elif last_modified and stored.get('lastModified'):
+                unchanged = (last_modified == stored['lastModified']
+                             and length in (None, stored.get('contentLength')))
+            else:
+                unchanged = False
+        else:
+            unchanged = length is not None and length == dest.stat().st_size
+        if unchanged:
+            self.remote_state.record(dest, url, etag, last_modified, length)
+        return unchanged
+
+    def download_all(self, tag_name: str = None, isos: List[Dict] = None,
+                     max_workers: int = None, max_per_host: int = None) -> List[DownloadResult]:
+        """Download several ISOs concurrently.
+
+        Args:
+            tag_name: Only download ISOs carrying this tag ('all' or None for every ISO)
+            isos: Explicit list of ISO entries, overrides ``tag_name``
+            max_workers: Global cap on concurrent downloads (``settings.downloads.maxWorkers``)
+            max_per_host: Cap on concurrent downloads from one host (``settings.downloads.maxPerHost``)
+
+        The queue is started in the order given by ``settings.downloads.queueOrder``
+        (see ``_queue_order``) and transfers respect the configured bandwidth
+        limits.
+
+        Returns:
+            List of DownloadResult in the order of the selected ISOs
+        """
+        if isos is None:
+            isos = self._select_isos(tag_name)
+        if not isos:
+            self.console.print("[yellow]No ISOs selected for download.")
+            return []
+        queue = self._queue_order(isos)
+
+        settings = self._settings()
+        max_workers = max(1, max_workers or settings.get('maxWorkers', DEFAULT_MAX_WORKERS))
+        max_per_host = max(1, max_per_host or settings.get('maxPerHost', DEFAULT_MAX_PER_HOST))
+
+        host_limits: Dict[str, threading.Semaphore] = {}
+        for iso in isos:
+            host = urlparse(iso.get('downloadLink', '')).netloc
+            host_limits.setdefault(host, threading.BoundedSemaphore(max_per_host))
+
+        self.console.print(f"[cyan]Downloading {len(isos)} ISO(s) with {max_workers} worker(s), "
+                           f"{max_per_host} per host{self._describe_limits()}")
+        with self._new_progress(transient=False) as progress:
+            # ThreadPoolExecutor starts work in submission order
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='iso-download') as pool:
+                futures = {}
+                for iso in queue:
+                    task = progress.add_task(f"Queued {iso.get('fileName', 'N/A')}", total=None, start=False)
+                    futures[id(iso)] = pool.submit(self.download_iso, iso, progress, task,
+                                                   host_limits[urlparse(iso.get('downloadLink', '')).netloc])
+                results = [futures[id(iso)].result() for iso in isos]
+
+        self.print_summary(results)
+        return results
+
+    def _queue_order(self, isos: List[Dict]) -> List[Dict]:
+        """Sort a batch by ``settings.downloads.queueOrder``.
+
+        ``queueOrder`` is a list of criteria applied in turn:
+
+        - ``priority``: higher ``priority`` values of the entries first (default 0)
+        - ``tag``: entries whose tag comes first in ``settings.downloads.tagPriority``
+        - ``smallest`` / ``largest``: by remote size (probed with HEAD requests)
+
+        Entries that compare equal keep their config order.
+        """
+        settings = self._settings()
+        order = settings.get('queueOrder') or []
+        if isinstance(order, str):
+            order = [order]
+        if not order:
+            return list(isos)
+
+        sizes = {}
+        if {'smallest', 'largest'} & set(order):
+            sizes = self._probe_sizes(isos)
+        tag_priority = settings.get('tagPriority') or []
+
+        def key(iso: Dict) -> tuple:
+            criteria = []
+            for criterion in order:
+                if criterion == 'priority':
+                    criteria.append(-int(iso.get('priority', 0)))
+                elif criterion == 'tag':
+                    ranks = [tag_priority.index(tag) for tag in iso.get('tags', []) if tag in tag_priority]
+                    criteria.append(min(ranks, default=len(tag_priority)))
+                elif criterion == 'smallest':
+                    criteria.append(sizes.get(id(iso), float('inf')))
+                elif criterion == 'largest':
+                    criteria.append(-sizes.get(id(iso), -1))
+                else:
+                    raise ValueError(f"Unknown queueOrder criterion: {criterion!r}")
+            return tuple(criteria)
+
+        return sorted(isos, key=key)
+
+    def _remote_size(self, url: str) -> Optional[int]:
+        """Content-Length of ``url`` from a HEAD request, or None if unknown."""
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=self._timeout())
+        except requests.RequestException:
+            return None
+        length = response.headers.get('content-length')
+        return int(length) if response.ok and length and length.isdigit() else None
+
+    def _probe_sizes(self, isos: List[Dict]) -> Dict[int, int]:
+        """Remote sizes of ``isos`` (keyed by ``id``) from concurrent HEAD requests."""
+        def probe(iso: Dict) -> Optional[int]:
+            return self._remote_size(iso.get('downloadLink', ''))
+
+        with ThreadPoolExecutor(max_workers=8, thread_name_prefix='iso-probe') as pool:
+            sizes = dict(zip([id(iso) for iso in isos], pool.map(probe, isos)))
+        return {key: size for key, size in sizes.items() if size is not None}
+
+    def _describe_limits(self) -> str:
+        """Current bandwidth limits for the batch header, e.g. ', limited to 5.0 MiB/s'."""
+        global_rate, download_rate = self.rate_schedule.limits()
+        limits = []
+        if global_rate:
+            limits.append(f"{global_rate / (1024 * 1024):.1f} MiB/s total")
+        if download_rate:
+            limits.append(f"{download_rate / (1024 * 1024):.1f} MiB/s per download")
+        return f", limited to {' and '.join(limits)}" if limits else ""
+
+    def print_summary(self, results: List[DownloadResult]) -> None:
+        """Print an aggregate summary table for a batch of downloads."""
+        table = Table(title="📦 Download Summary", show_header=True, header_style="bold magenta", box=None)
+        table.add_column("File", style="green")
+        table.add_column("Status", style="magenta")
+        table.add_column("Size", style="yellow", justify="right")
+        table.add_column("Time", style="blue", justify="right")
+
+        styles = {'downloaded': '[green]', 'linked': '[cyan]', 'skipped': '[cyan]', 'failed': '[red]'}
+        for result in results:
+            status = f"{styles[result.status]}{result.status}"
+            if result.error:
+                status += f" ({result.error})"
+            table.add_row(result.name, status, f"{result.bytes / (1024 * 1024):.1f} MiB",
+                          f"{result.elapsed:.1f}s")
+
+        total_bytes = sum(r.bytes for r in results)
+        counts = {status: sum(1 for r in results if r.status == status) for status in styles}
+        self.console.print()
+        self.console.print(Panel.fit(table))
+        self.console.print(
+            f"[bold]{counts['downloaded']} downloaded, {counts['linked']} linked, "
+            f"{counts['skipped']} up to date, {counts['failed']} failed[/] • {total_bytes / (1024 * 1024):.1f} MiB transferred"
+        )
+
+    def _select_isos(self, tag_name: str = None) -> List[Dict]:
+        """Return the ISOs carrying ``tag_name``, or every ISO for None/'all'."""
+        if tag_name and tag_name != 'all':
+            return self.get_isos_by_tag(tag_name)
+        return self.config.get('isos', [])
+
+    def find_isos(self, targets: List[str]) -> List[Dict]:
+        """Resolve ISO names, file names or tags to ISO entries.
+
+        Matching is case-insensitive. Each target is first tried as a tag,
+        then as an ISO ``name`` or ``fileName``. Entries are returned once, in
+        config order.
+
+        Raises:
+            ValueError: If a target matches neither a tag nor an ISO
+        """
+        selected = set()
+        for target in targets:
+            matches = self.catalog.find(target)
+            if not matches:
+                raise ValueError(f"No ISO or tag matches {target!r}")
+            selected.update(id(iso) for iso in matches)
+        return [iso for iso in self.catalog.isos if id(iso) in selected]
+
+    def describe_isos(self, tag_name: str = None) -> List[Dict]:
+        """Return ISO entries with their local path and verification status.
+
+        Status comes from the verification cache (see ``VerifyCache.status``)
+        and a single scan of the tree, so no file is read or stat'ed twice.
+        """
+        described = []
+        files = scan_tree(self.iso_base_dir)
+        for iso in self._select_isos(tag_name):
+            iso_path = self._iso_path(iso)
+            st = files.get(str(iso_path))
+            try:
+                expected, algorithm = self._expected_checksum(iso, offline=True)
+            except ChecksumSourceError:
+                expected, algorithm = None, iso.get('checkSumAlgo', 'sha256')
+            described.append({
+                'name': iso.get('name', 'N/A'),
+                'version': iso.get('version', 'N/A'),
+                'platform': iso.get('platform', 'N/A'),
+                'fileName': iso.get('fileName'),
+                'tags': iso.get('tags', []),
+                'path': str(iso_path),
+                'status': self.verify_cache.status(iso_path, expected, algorithm, st) if st else MISSING,
+            })
+        return described
+
+    def prune(self, delete: bool = False, include_partials: bool = False, keep_last: int = None,
+              max_total_size: str = None, max_unused_days: float = None, orphans: bool = False) -> Dict:
+        """Find files in the ISO tree to remove: orphans and entries evicted by retention.
+
+        The tree is scanned once with ``os.scandir``. Hidden files/directories
+        (such as the manager's state directory) and Markdown documentation are
+        ignored, and so is the firmware the OpenWRT firmware manager downloads
+        for the profiles in ``settings.retention.deviceProfiles``. Unfinished
+        ``.part`` downloads are reported separately since they are needed to
+        resume a download. Content-store blobs no longer linked from the tree
+        are orphans too.
+
+        Unknown files in a directory holding catalog entries are orphans.
+        Unknown files anywhere else (backups, firmware kept by hand) are
+        only reported as ``unmanaged`` and deleted when ``orphans`` is set.
+
+        Downloaded catalog entries are then evicted according to
+        ``settings.retention`` (see ``RetentionPolicy``); the arguments
+        override its ``keepLast``, ``maxTotalSize`` and ``maxUnusedDays``.
+        Evicted entries stay in the catalog and show up as missing.
+
+        Args:
+            delete: Delete the files instead of only reporting them
+            include_partials: Also delete partial downloads
+            keep_last: Newest versions to keep per product
+            max_total_size: Size budget for the tree (e.g. "200GiB")
+            max_unused_days: Evict entries not used for this many days
+            orphans: Also delete unknown files outside the catalog's directories
+
+        Returns:
+            Dictionary with ``orphans``, ``unmanaged``, ``partials``, ``blobs``
+            and ``evicted`` (lists of {path, size}, evictions also with name and
+            reason) and the ``bytes`` freed (or that would be freed)
+        """
+        files = scan_tree(self.iso_base_dir)
+        retention = self.config.get('settings', {}).get('retention') or {}
+        profiles = retention.get('deviceProfiles')
+        firmware = DeviceFirmware(Path(self.config_path).parent / profiles if profiles else DEFAULT_DEVICE_PROFILES)
+        known = set()
+        artifacts = []
+        for iso in self.config.get('isos', []):
+            iso_path = self._iso_path(iso)
+            paths = [iso_path]
+            try:
+                processor = PostProcessor.from_config(iso, iso_path)
+            except PostProcessError:
+                processor = None
+            if processor:
+                paths.extend(processor.outputs())
+            paths = [str(path) for path in paths]
+            known.update(paths)
+            present = [path for path in paths if path in files]
+            if not present:
+                continue
+            stats = [files[path] for path in present]
+            last_used = self.usage.last_used(iso_path) or max(st.st_mtime for st in stats)
+            artifacts.append(Artifact(
+                name=iso.get('name', 'N/A'),
+                version=str(iso.get('version', '')),
+                product=product_key(iso),
+                paths=present,
+                files={(st.st_dev, st.st_ino): st.st_size for st in stats},
+                last_used=last_used,
+                pinned=bool(iso.get('retain')),
+                sort_key=(version_key(str(iso.get('version', ''))), max(st.st_mtime for st in stats)),
+            ))
+
+        managed = {os.path.dirname(path) for path in known}
+        orphaned, unmanaged, partials = [], [], []
+        for path, st in sorted(files.items()):
+            name = os.path.basename(path)
+            if path in known or name.lower().endswith('.md'):
+                continue
+            if os.path.relpath(path, self.iso_base_dir).replace(os.sep, '/') in firmware:
+                continue
+            entry = {'path': path, 'size': st.st_size}
+            if name.endswith(('.part', '.part.json')):
+                partials.append(entry)
+            elif os.path.dirname(path) in managed:
+                orphaned.append(entry)
+            else:
+                unmanaged.append(entry)
+
+        settings = dict(retention)
+        for key, value in (('keepLast', keep_last), ('maxTotalSize', max_total_size),
+                           ('maxUnusedDays', max_unused_days)):
+            if value is not None:
+                settings[key] = value
+        evicted = []
+        for artifact, reason in RetentionPolicy(settings).plan(artifacts):
+            for path in artifact.paths:
+                evicted.append({'path': path, 'size': files[path].st_size,
+                                'name': f"{artifact.name} {artifact.version}".strip(), 'reason': reason})
+
+        removable = orphaned + evicted + (unmanaged if orphans else []) + (partials if include_partials else [])
+        if delete:
+            for entry in removable:
+                path = Path(entry['path'])
+                try:
+                    path.unlink()
+                except OSError as e:
+                    entry['error'] = str(e)
+                    continue
+                self.verify_cache.forget(path)
+                self.remote_state.forget(path)
+                self.usage.forget(path)
+        # Evicted files may have held the last link to a blob
+        blobs = self.blob_store.unreferenced()
+        if delete:
+            for entry in blobs:
+                try:
+                    Path(entry['path']).unlink()
+                except OSError as e:
+                    entry['error'] = str(e)
+        return {
+            'deleted': delete,
+            'orphans': orphaned,
+            'unmanaged': unmanaged,
+            'partials': partials,
+            'blobs': blobs,
+            'evicted': evicted,
+            'bytes': sum(entry['size'] for entry in removable + blobs if 'error' not in entry),
+        }
+
+    def serve(self, host: str = '0.0.0.0', port: int = DEFAULT_MIRROR_PORT) -> None:
+        """Serve the verified ISO tree over HTTP until interrupted.
+
+        Other nodes list this server in ``settings.downloads.mirrors`` to
+        fetch images over the LAN before falling back to ``downloadLink``.
+        Files are verified first (cheap for files in the verification cache)
+        and only verified files are served.
+        """
+        report = self.verify_all()
+        server = MirrorServer((host, port), self)
+        self.console.print(f"[cyan]Serving {report['summary'].get(VERIFIED, 0)} verified ISO(s) from "
+                           f"{self.iso_base_dir} on http://{host}:{port}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    def discover_releases(self, dry_run: bool = False, refresh: bool = False) -> Dict:
+        """Look for new upstream releases and regenerate the discovered catalog file.
+
+        Sources are configured under ``settings.discovery`` (see
+        ``ReleaseDiscovery``). Index pages are cached for ``ttl`` seconds
+        unless ``refresh`` is set; with ``dry_run`` nothing is written.
+
+        Returns:
+            Report of added, removed, updated and unchanged entries
+        """
+        discovery = ReleaseDiscovery(self, refresh=refresh)
+        if not discovery.settings.get('sources'):
+            self.console.print("[yellow]No sources configured under settings.discovery.sources")
+        with self.console.status("Discovering releases..."):
+            report = discovery.update_catalog(dry_run=dry_run)
+        if report['written']:
+            self.config = self._load_config()
+        return report
+
+    def print_discovery_report(self, report: Dict) -> None:
+        """Print a report produced by ``discover_releases``."""
+        for label, style, key in (("Added", "green", 'added'), ("Updated", "cyan", 'updated'),
+                                  ("Removed", "red", 'removed')):
+            for name in report[key]:
+                self.console.print(f"[{style}]{label}:[/] {name}")
+        for error in report['errors']:
+            self.console.print(f"[red]✗ {error['source']}: {error['error']} (previous entries kept)")
+        for url in report['stale']:
+            self.console.print(f"[yellow]⚠ Using cached copy of {url}")
+        changed = report['added'] or report['updated'] or report['removed']
+        action = "Wrote" if report['written'] else "Would write" if changed else "Unchanged:"
+        self.console.print(f"[bold]{action} {report['output']}[/] ({len(report['added'])} added, "
+                           f"{len(report['updated'])} updated, {len(report['removed'])} removed, "
+                           f"{len(report['unchanged'])} unchanged)")
+
+    def print_prune_report(self, report: Dict) -> None:
+        """Print a report produced by ``prune``."""
+        action = "Deleted" if report['deleted'] else "Would delete"
+        for label, entries in (("Orphaned file", report['orphans']), ("Unreferenced blob", report['blobs']),
+                               ("Partial download", report['partials'])):
+            for entry in entries:
+                error = f" [red]({entry['error']})" if entry.get('error') else ""
+                self.console.print(f"[yellow]{label}:[/] {entry['path']} "
+                                   f"[dim]{entry['size'] / (1024 * 1024):.1f} MiB[/]{error}")
+        for entry in report['unmanaged']:
+            error = f" [red]({entry['error']})" if entry.get('error') else ""
+            self.console.print(f"[cyan]Not in the catalog:[/] {entry['path']} "
+                               f"[dim]{entry['size'] / (1024 * 1024):.1f} MiB[/]{error}")
+        for entry in report['evicted']:
+            error = f" [red]({entry['error']})" if entry.get('error') else ""
+            self.console.print(f"[yellow]Retention ({entry['reason']}):[/] {entry['path']} "
+                                   f"[dim]{entry['size'] / (1024 * 1024):.1f} MiB[/]{error}")
+        self.console.print(f"[bold]{action} {report['bytes'] / (1024 * 1024):.1f} MiB")
 
-        self.console.print(f"[green]✓ Successfully downloaded and verified {iso_name}")
-        return True
+    def verify_all(self, tag_name: str = None, jobs: int = None, rehash: bool = False,
+                   isos: List[Dict] = None) -> Dict:
+        """Audit every downloaded ISO against its configured checksum.
+
+        Files are hashed in parallel on ``jobs`` threads (default: CPU count).
+        Digests from the verification cache are reused unless ``rehash`` is set.
+        ``isos`` restricts the audit to explicit entries instead of ``tag_name``.
+
+        Returns:
+            Report dictionary with a per-file ``results`` list, a ``summary`` of
+            status counts and an overall ``ok`` flag (no corrupt or unreadable files)
+        """
+        if isos is None:
+            isos = self._select_isos(tag_name)
+        entries = []
+        for iso in isos:
+            path = self._iso_path(iso)
+            error = None
+            try:
+                expected, algorithm = self._expected_checksum(iso)
+            except ChecksumSourceError as e:
+                expected, algorithm, error = None, iso.get('checkSumAlgo', 'sha256').lower(), str(e)
+            entries.append({
+                'name': iso.get('name', 'N/A'),
+                'version': iso.get('version'),
+                'fileName': iso.get('fileName'),
+                'path': str(path),
+                'algorithm': algorithm,
+                'expected': expected,
+                'actual': None,
+                'status': MISSING,
+                'size': None,
+                'cached': False,
+                'seconds': 0.0,
+                'error': error,
+            })
+
+        pending = []
+        for entry in entries:
+            path = Path(entry['path'])
+            try:
+                entry['size'] = path.stat().st_size
+            except OSError:
+                continue
+            digest = None if rehash else self.verify_cache.lookup(path, entry['algorithm'])
+            if digest:
+                entry['actual'], entry['cached'] = digest, True
+            else:
+                pending.append(entry)
+
+        def hash_entry(entry: Dict) -> None:
+            started = time.monotonic()
+            try:
+                path = Path(entry['path'])
+                entry['actual'] = hash_file(path, (entry['algorithm'],))[entry['algorithm']]
+                self.verify_cache.store(path, entry['algorithm'], entry['actual'])
+            except (OSError, ValueError) as e:
+                entry['error'] = str(e)
+            entry['seconds'] = round(time.monotonic() - started, 3)
+
+        if pending:
+            jobs = max(1, jobs or os.cpu_count() or 1)
+            with self._new_progress() as progress:
+                task = progress.add_task(f"Verifying {len(pending)} file(s)...",
+                                         total=sum(entry['size'] for entry in pending))
+                with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='iso-verify') as pool:
+                    # Largest files first so the pool is not left waiting on one big image
+                    ordered = sorted(pending, key=lambda entry: entry['size'], reverse=True)
+                    futures = {pool.submit(hash_entry, entry): entry for entry in ordered}
+                    for future in as_completed(futures):
+                        progress.update(task, advance=futures[future]['size'])
+
+        for entry in entries:
+            if entry['error']:
+                entry['status'] = 'error'
+            elif entry['actual'] is None:
+                entry['status'] = MISSING
+            elif not entry['expected']:
+                entry['status'] = UNVERIFIED
+            else:
+                entry['status'] = VERIFIED if entry['actual'] == entry['expected'] else CORRUPT
+
+        summary = {}
+        for entry in entries:
+            summary[entry['status']] = summary.get(entry['status'], 0) + 1
+        return {
+            'generated': datetime.now(timezone.utc).isoformat(),
+            'root': str(self.iso_base_dir),
+            'tag': tag_name,
+            'ok': not summary.get(CORRUPT) and not summary.get('error'),
+            'summary': summary,
+            'results': entries,
+        }
+
+    def print_verify_report(self, report: Dict) -> None:
+        """Print a verification report produced by ``verify_all``."""
+        table = Table(title="🔍 Verification Report", show_header=True, header_style="bold magenta", box=None)
+        table.add_column("Name", style="green")
+        table.add_column("Version", style="yellow")
+        table.add_column("File", style="blue")
+        table.add_column("Status", style="magenta", justify="right")
+
+        for entry in report['results']:
+            status = ISO_STATUS_LABELS.get(entry['status'], f"[red]✗ {entry['status']}")
+            if entry['cached'] and entry['status'] in (VERIFIED, CORRUPT):
+                status += " [dim](cached)"
+            table.add_row(entry['name'], entry['version'] or 'N/A', entry['fileName'] or 'N/A', status)
+
+        self.console.print()
+        self.console.print(Panel.fit(table))
+        self.console.print("[bold]" + ", ".join(f"{count} {status}"
+                                                for status, count in sorted(report['summary'].items())))
 
     def list_tags(self) -> List[Dict]:
         """List all available tags with their ISOs."""
@@ -149,15 +1298,11 @@ class ISOManager:
 
     def get_isos_by_tag(self, tag_name: str) -> List[Dict]:
         """Get all ISOs for a specific tag."""
-        return [iso for iso in self.config.get('isos', []) 
-                if tag_name in iso.get('tags', [])]
+        return list(self.catalog.by_tag.get(tag_name, []))
 
     def get_all_tags(self) -> Set[str]:
         """Get all unique tags from ISOs."""
-        tags = set()
-        for iso in self.config.get('isos', []):
-            tags.update(iso.get('tags', []))
-        return tags
+        return set(self.catalog.by_tag)
 
     def show_tag_menu(self) -> str:
         """Show tag selection menu and return selected tag or 'all'."""
@@ -185,19 +1330,16 @@ class ISOManager:
 
     def list_isos(self, tag_name: str = None) -> None:
         """List ISOs, optionally filtered by tag."""
-        if tag_name and tag_name != "all":
-            isos = self.get_isos_by_tag(tag_name)
-            if not isos:
+        isos = self.describe_isos(tag_name)
+        if not isos:
+            if tag_name and tag_name != "all":
                 self.console.print(f"[yellow]No ISOs found for tag: {tag_name}")
-                return
-        else:
-            isos = self.config.get('isos', [])
-            if not isos:
+            else:
                 self.console.print("[yellow]No ISOs configured in the config file.")
-                return
+            return
 
         table = Table(
-            title=f"📁 {'All ISOs' if tag_name == 'all' else 'Tag: ' + tag_name}",
+            title=f"📁 {'All ISOs' if not tag_name or tag_name == 'all' else 'Tag: ' + tag_name}",
             show_header=True,
             header_style="bold magenta",
             box=None
@@ -210,17 +1352,13 @@ class ISOManager:
         table.add_column("Status", style="magenta", justify="right")
 
         for i, iso in enumerate(isos, 1):
-            iso_path = self.iso_base_dir / iso.get('downloadLocation', '').lstrip('/') / iso.get('fileName', '')
-            status = "[green]✓" if iso_path.exists() else "[yellow]✗"
-            tags = ", ".join(iso.get('tags', ['-']))
-            
             table.add_row(
                 str(i),
-                iso.get('name', 'N/A'),
-                iso.get('version', 'N/A'),
-                iso.get('platform', 'N/A'),
-                tags,
-                status
+                iso['name'],
+                iso['version'],
+                iso['platform'],
+                ", ".join(iso['tags']) or '-',
+                ISO_STATUS_LABELS[iso['status']]
             )
 
         self.console.print()
@@ -251,7 +1389,7 @@ class ISOManager:
                     continue
 
                 choice = Prompt.ask(
-                    "\n[bold]Select ISO to download (number), 'b' to go back, or 'q' to quit: [/]",
+                    "\n[bold]Select ISO to download (number), 'a' for all listed, 'b' to go back, or 'q' to quit: [/]",
                     default="b"
                 ).strip().lower()
 
@@ -259,6 +1397,8 @@ class ISOManager:
                     break
                 elif choice == 'b':
                     continue
+                elif choice == 'a':
+                    self.download_all(isos=isos)
                 elif choice.isdigit() and 1 <= int(choice) <= len(isos):
                     self.download_iso(isos[int(choice)-1])
                 else:
@@ -271,12 +1411,133 @@ class ISOManager:
                 self.console.print(f"[red]✗ An error occurred: {e}")
                 break
 
-def main():
-    try:
-        manager = ISOManager()
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="TuxTechIaaC ISO Download Manager. Runs the interactive menu when no command is given."
+    )
+    parser.add_argument('--config', help="Path to the ISO config file")
+    parser.add_argument('--iso-dir', help="Root directory of the ISO tree (default: <repo>/iso)")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON on stdout")
+    parser.add_argument('--quiet', '-q', action='store_true', help="Suppress console output")
+    # Also accepted after the command ('list --json'); SUPPRESS keeps an option
+    # given before the command from being reset by the subparser's default
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--json', action='store_true', default=argparse.SUPPRESS,
+                        help="Print results as JSON on stdout")
+    common.add_argument('--quiet', '-q', action='store_true', default=argparse.SUPPRESS,
+                        help="Suppress console output")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    list_parser = commands.add_parser('list', parents=[common], help="List ISOs and their verification status")
+    list_parser.add_argument('--tag', help="Only list ISOs carrying this tag")
+
+    download_parser = commands.add_parser('download', parents=[common],
+                                          help="Download ISOs by name, file name or tag")
+    download_parser.add_argument('targets', nargs='*', metavar='NAME|TAG')
+    download_parser.add_argument('--all', action='store_true', help="Download every configured ISO")
+    download_parser.add_argument('--jobs', '-j', type=int, help="Maximum concurrent downloads")
+    download_parser.add_argument('--per-host', type=int, help="Maximum concurrent downloads per host")
+
+    verify_parser = commands.add_parser('verify', parents=[common],
+                                        help="Verify downloaded ISOs against their checksums")
+    verify_parser.add_argument('targets', nargs='*', metavar='NAME|TAG',
+                               help="ISOs to verify (default: all)")
+    verify_parser.add_argument('--all', action='store_true', help="Verify every configured ISO (default)")
+    verify_parser.add_argument('--tag', help="Only verify ISOs carrying this tag")
+    verify_parser.add_argument('--jobs', '-j', type=int, help="Hashing threads (default: CPU count)")
+    verify_parser.add_argument('--rehash', action='store_true',
+                               help="Hash every file even if a cached digest is valid")
+    verify_parser.add_argument('--report', metavar='FILE', help="Also write the JSON report to FILE")
+
+    prune_parser = commands.add_parser('prune', parents=[common],
+                                       help="Find orphaned files and entries evicted by the retention policy")
+    prune_parser.add_argument('--delete', action='store_true', help="Delete them instead of only reporting")
+    prune_parser.add_argument('--include-partials', action='store_true',
+                              help="Also delete unfinished .part downloads")
+    prune_parser.add_argument('--orphans', action='store_true',
+                              help="Also delete unknown files outside the catalog's directories")
+    prune_parser.add_argument('--keep-last', type=int, metavar='N',
+                              help="Keep the N newest versions per product (overrides settings.retention)")
+    prune_parser.add_argument('--max-size', metavar='SIZE',
+                              help="Evict least recently used entries until the tree fits, e.g. 200GiB")
+    prune_parser.add_argument('--max-unused-days', type=float, metavar='DAYS',
+                              help="Evict entries not used for this many days")
+
+    serve_parser = commands.add_parser('serve', parents=[common], help="Serve the verified ISO tree to other nodes over HTTP")
+    serve_parser.add_argument('--bind', default='0.0.0.0', help="Address to listen on (default: 0.0.0.0)")
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_MIRROR_PORT,
+                              help=f"Port to listen on (default: {DEFAULT_MIRROR_PORT})")
+
+    discover_parser = commands.add_parser('discover', parents=[common], help="Find new upstream releases and update the "
+                                                           "generated catalog")
+    discover_parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+    discover_parser.add_argument('--refresh', action='store_true',
+                                 help="Revalidate cached index pages even if their TTL has not expired")
+
+    commands.add_parser('menu', parents=[common], help="Run the interactive menu (default)")
+    return parser.parse_args(argv)
+
+def run_command(manager: ISOManager, args: argparse.Namespace) -> int:
+    """Execute a CLI command and return the process exit code.
+
+    ``verify`` exits with 0 when all present files are verified, 1 on corrupt
+    or unreadable files and 2 when there is no corruption but files are missing.
+    """
+    if args.command == 'list':
+        result = manager.describe_isos(args.tag)
+        if not args.json:
+            manager.list_isos(args.tag)
+        code = 0
+    elif args.command == 'download':
+        if not args.targets and not args.all:
+            raise ValueError("download needs at least one NAME|TAG, or --all")
+        isos = manager.config.get('isos', []) if args.all else manager.find_isos(args.targets)
+        results = manager.download_all(isos=isos, max_workers=args.jobs, max_per_host=args.per_host)
+        result = [r.to_dict() for r in results]
+        code = 0 if results and all(results) else 1
+    elif args.command == 'verify':
+        isos = manager.find_isos(args.targets) if args.targets else None
+        result = manager.verify_all(tag_name=args.tag, jobs=args.jobs, rehash=args.rehash, isos=isos)
+        if not args.json:
+            manager.print_verify_report(result)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(result, f, indent=2)
+        code = 1 if not result['ok'] else 2 if result['summary'].get(MISSING) else 0
+    elif args.command == 'prune':
+        result = manager.prune(delete=args.delete, include_partials=args.include_partials,
+                               keep_last=args.keep_last, max_total_size=args.max_size,
+                               max_unused_days=args.max_unused_days, orphans=args.orphans)
+        if not args.json:
+            manager.print_prune_report(result)
+        code = 0
+    elif args.command == 'discover':
+        result = manager.discover_releases(dry_run=args.dry_run, refresh=args.refresh)
+        if not args.json:
+            manager.print_discovery_report(result)
+        code = 1 if result['errors'] else 0
+    elif args.command == 'serve':
+        manager.serve(args.bind, args.port)
+        return 0
+    else:
         manager.run()
+        return 0
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    return code
+
+def main(argv: List[str] = None):
+    args = parse_args(argv)
+    try:
+        # With --json the console goes to stderr so stdout only carries the JSON document
+        with ISOManager(args.config, args.iso_dir, quiet=args.quiet) as manager:
+            if args.json and not args.quiet:
+                manager.console = Console(stderr=True)
+            code = run_command(manager, args)
+        sys.exit(code)
     except Exception as e:
-        console = Console()
+        console = Console(stderr=True)
         console.print(f"[bold red]Fatal error:[/] {e}")
         sys.exit(1)
 
@@ -0,0 +1,88 @@
+"""Small JSON-backed indexes stored in the ISO manager state directory."""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class JsonStore:
+    """Thread-safe dictionary persisted as a JSON file.
+
+    Entries are keyed by file path relative to ``root`` and record the file
+    identity (size, mtime, inode) they were written for, so subclasses can
+    tell when a file changed behind their back.
+    """
+
+    def __init__(self, store_path: Path, root: Path):
+        self.store_path = Path(store_path)
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.store_path, 'r') as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.store_path.with_name(self.store_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.store_path)
+
+    def _key(self, path: Path) -> str:
+        path = Path(path)
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return str(path)
+
+    @staticmethod
+    def _identity(st: os.stat_result) -> Dict:
+        return {'size': st.st_size, 'mtime': st.st_mtime_ns, 'inode': st.st_ino}
+
+    def _entry(self, path: Path, st: os.stat_result = None) -> Optional[Dict]:
+        """Return the entry for ``path`` if the file is unchanged since it was written."""
+        entry = self._entries.get(self._key(path))
+        if not entry:
+            return None
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+        identity = self._identity(st)
+        if any(entry.get(field) != value for field, value in identity.items()):
+            return None
+        return entry
+
+    def forget(self, path: Path) -> None:
+        """Drop the entry for ``path``."""
+        with self._lock:
+            if self._entries.pop(self._key(path), None) is not None:
+                self._save()
+
+
+class UrlStore(JsonStore):
+    """JSON store of plain entries keyed by URL (or any string) instead of file path."""
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry) if entry else None
+
+    def put(self, key: str, entry: Dict, save: bool = True) -> None:
+        """Store ``entry``; with ``save=False`` it is only written by the next ``save()``."""
+        with self._lock:
+            self._entries[key] = entry
+            if save:
+                self._save()
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
@@ -0,0 +1,146 @@
+"""Read-only HTTP server exposing the verified ISO tree to other nodes."""
+import os
+import re
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+try:
+    from .checksum_sources import ChecksumSourceError
+    from .verify_cache import VERIFIED
+except ImportError:  # executed as a script
+    from checksum_sources import ChecksumSourceError
+    from verify_cache import VERIFIED
+
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+class MirrorRequestHandler(BaseHTTPRequestHandler):
+    """Serves catalog files with ETag, conditional and single Range support.
+
+    File bodies are sent with ``socket.sendfile``, which uses the zero-copy
+    ``sendfile(2)`` system call where available.
+    """
+
+    server_version = 'TuxTechIaaC-ISOMirror'
+    protocol_version = 'HTTP/1.1'
+    timeout = 60
+
+    def do_GET(self) -> None:
+        self._serve(head=False)
+
+    def do_HEAD(self) -> None:
+        self._serve(head=True)
+
+    def log_message(self, format: str, *args) -> None:
+        self.server.console.print(f"[dim]{self.address_string()} {format % args}")
+
+    def _serve(self, head: bool) -> None:
+        path = self.server.resolve(self.path)
+        if path is None:
+            self.send_error(404)
+            return
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            etag = f'"{st.st_ino:x}-{size:x}-{st.st_mtime_ns:x}"'
+            last_modified = formatdate(st.st_mtime, usegmt=True)
+
+            if self._not_modified(etag, last_modified):
+                return
+
+            byte_range = self._parse_range(size, etag, last_modified)
+            if byte_range == 'unsatisfiable':
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start, end = byte_range or (0, size)
+
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(end - start))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            if byte_range:
+                self.send_header('Content-Range', f"bytes {start}-{end - 1}/{size}")
+            self.end_headers()
+            if not head and end > start:
+                self.server.manager.usage.touch(path)
+                self.connection.sendfile(f, start, end - start)
+
+    def _not_modified(self, etag: str, last_modified: str) -> bool:
+        """Answer a conditional request whose validators still match with a 304."""
+        if self.headers.get('If-None-Match') == etag or (
+                'If-None-Match' not in self.headers
+                and self.headers.get('If-Modified-Since') == last_modified):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            return True
+        return False
+
+    def _parse_range(self, size: int, etag: str, last_modified: str):
+        """Return (start, end) of a satisfiable single range, None for the full file."""
+        header = self.headers.get('Range')
+        if not header:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range not in (etag, last_modified):
+            return None
+        match = RANGE_RE.fullmatch(header.strip())
+        if not match or match.groups() == ('', ''):
+            # Multiple or malformed ranges: serve the whole file
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last) + 1, size) if last else size
+        else:
+            start, end = max(size - int(last), 0), size
+        if start >= size or start >= end:
+            return 'unsatisfiable'
+        return start, end
+
+
+class MirrorServer(ThreadingHTTPServer):
+    """HTTP server for the files of an ISOManager catalog.
+
+    Only catalog entries whose checksum is recorded as verified in the
+    manager's verification cache are served; everything else is a 404.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], manager):
+        self.manager = manager
+        self.console = manager.console
+        self.entries: Dict[str, Tuple[Path, Dict]] = {}
+        for iso in manager.config.get('isos', []):
+            if iso.get('fileName') and (iso.get('checkSum') or iso.get('checkSumUrl')):
+                path = manager._iso_path(iso)
+                self.entries[path.relative_to(manager.iso_base_dir).as_posix()] = (path, iso)
+        super().__init__(address, MirrorRequestHandler)
+
+    def resolve(self, request_path: str) -> Optional[Path]:
+        """Map a request path to a verified file of the tree."""
+        entry = self.entries.get(unquote(urlsplit(request_path).path).lstrip('/'))
+        if entry is None:
+            return None
+        path, iso = entry
+        try:
+            expected, algorithm = self.manager._expected_checksum(iso, offline=True)
+        except ChecksumSourceError:
+            return None
+        status = self.manager.verify_cache.status(path, expected, algorithm)
+        return path if status == VERIFIED else None
@@ -0,0 +1,266 @@
+"""Streaming post-processing of downloaded images (decompression, conversion)."""
+import bz2
+import lzma
+import os
+import shutil
+import subprocess
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+READ_SIZE = 4 * 1024 * 1024
+# Upper bound of decompressed bytes produced per call, whatever the ratio
+OUTPUT_LIMIT = 16 * 1024 * 1024
+
+COMPRESSION_FORMATS = {
+    # format: (suffix, stream magic)
+    'gzip': ('.gz', b'\x1f\x8b'),
+    'xz': ('.xz', b'\xfd7zXZ\x00'),
+    'bzip2': ('.bz2', b'BZh'),
+    'zstd': ('.zst', b'\x28\xb5\x2f\xfd'),
+}
+CONVERT_FORMATS = ('qcow2', 'vmdk', 'vdi', 'vhdx', 'raw')
+POST_PROCESS_KEYS = ('decompress', 'output', 'convert', 'keepRaw')
+
+
+class PostProcessError(IOError):
+    """A downloaded image could not be post-processed."""
+
+
+def _decompressor_factory(fmt: str) -> Callable:
+    if fmt == 'gzip':
+        return lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if fmt == 'xz':
+        return lzma.LZMADecompressor
+    if fmt == 'bzip2':
+        return bz2.BZ2Decompressor
+    if fmt == 'zstd':
+        if zstd is not None:
+            return zstd.ZstdDecompressor
+        if zstandard is not None:
+            return lambda: _ZstandardAdapter(zstandard.ZstdDecompressor().decompressobj())
+        raise PostProcessError("zstd decompression needs Python 3.14+ or the 'zstandard' package "
+                               "(pip install zstandard)")
+    raise ValueError(f"Unsupported compression format: {fmt}")
+
+
+class _ZstandardAdapter:
+    """Give a ``zstandard`` decompressobj the interface of ``lzma.LZMADecompressor``."""
+
+    needs_input = True
+    unused_data = b''
+
+    def __init__(self, obj):
+        self._obj = obj
+
+    @property
+    def eof(self) -> bool:
+        return getattr(self._obj, 'eof', False)
+
+    def decompress(self, data: bytes, max_length: int = -1) -> bytes:
+        # zstandard cannot bound its output; feed small slices instead
+        return b''.join(self._obj.decompress(data[i:i + 65536]) for i in range(0, len(data), 65536))
+
+
+class StreamDecompressor:
+    """Decompress a byte stream into ``<output>.part`` as it arrives.
+
+    Data must be fed in order with ``write``; ``PrefixHasher`` does that
+    while a download is in progress, so the image is decompressed in the same
+    pass that hashes it. The output is only moved to ``output`` by
+    ``finish``, once the compressed file has been verified.
+    """
+
+    def __init__(self, fmt: str, output: Path):
+        self.format = fmt
+        self.output = output
+        self.part = output.with_name(output.name + '.part')
+        self._factory = _decompressor_factory(fmt)
+        self._magic = COMPRESSION_FORMATS[fmt][1]
+        self._file = None
+        self._obj = None
+        self._pending = False
+        self._trailing = False
+        # Start of what follows a finished member, too short to tell a new member from trailing data
+        self._held = b''
+        self.received = 0
+
+    def reset(self) -> None:
+        """Discard the output, the compressed stream starts over."""
+        self.close()
+        self.part.unlink(missing_ok=True)
+        self._obj = None
+        self._pending = self._trailing = False
+        self._held = b''
+        self.received = 0
+
+    def write(self, data) -> None:
+        if self._file is None:
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.part, 'wb')
+            self._obj = self._factory()
+        self.received += len(data)
+        if self._trailing:
+            return
+        if self._held:
+            data, self._held = self._held + bytes(data), b''
+        while data or self._pending:
+            if self._obj.eof:
+                # Concatenated members/streams; anything else after the end of
+                # the stream is padding or signature data and is ignored, as
+                # gzip(1) does for OpenWRT images.
+                head = bytes(data[:len(self._magic)])
+                if len(head) < len(self._magic) and self._magic.startswith(head):
+                    self._held = head
+                    return
+                if head != self._magic:
+                    self._trailing = True
+                    return
+                self._obj = self._factory()
+            out = self._obj.decompress(data, OUTPUT_LIMIT)
+            self._file.write(out)
+            if hasattr(self._obj, 'unconsumed_tail'):  # zlib
+                data = self._obj.unconsumed_tail
+                self._pending = len(out) == OUTPUT_LIMIT and not self._obj.eof
+            else:  # lzma/bz2/zstd keep unconsumed input internally
+                data = b''
+                self._pending = not self._obj.needs_input and not self._obj.eof
+            if self._obj.eof:
+                # Input after the end of this member, possibly a whole next member
+                data = self._obj.unused_data + bytes(data)
+
+    def finish(self) -> None:
+        """Check the stream is complete and publish the output file."""
+        if self._file is None:
+            raise PostProcessError(f"no {self.format} data was received")
+        if not self._obj.eof:
+            self.reset()
+            raise PostProcessError(f"truncated {self.format} stream")
+        self.close()
+        self.part.replace(self.output)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PostProcessor:
+    """The ``postProcess`` stage of one catalog entry.
+
+    ``postProcess`` options:
+
+    - ``decompress``: gzip, xz, bzip2, zstd or auto (from the file suffix)
+    - ``output``: name of the decompressed file (default: fileName without
+      the compression suffix)
+    - ``convert``: run ``qemu-img convert -O <format>`` on the result, e.g. qcow2
+    - ``keepRaw``: keep the decompressed file after a conversion (default: false)
+    """
+
+    def __init__(self, source: Path, decompress: Optional[str] = None, output: Optional[str] = None,
+                 convert: Optional[str] = None, keep_raw: bool = False):
+        self.source = source
+        self.convert = convert
+        self.keep_raw = keep_raw
+        self.raw = source
+        self.sink = None
+        if decompress:
+            suffix = COMPRESSION_FORMATS[decompress][0]
+            if not output:
+                output = source.name[:-len(suffix)] if source.name.endswith(suffix) else source.name + '.raw'
+            self.raw = source.with_name(output)
+            self.sink = StreamDecompressor(decompress, self.raw)
+        self.final_path = self.raw.with_suffix(f'.{convert}') if convert else self.raw
+
+    @classmethod
+    def from_config(cls, iso_config: Dict, source: Path) -> Optional['PostProcessor']:
+        """Build the stage described by ``iso_config['postProcess']``, if any."""
+        options = iso_config.get('postProcess')
+        if not options:
+            return None
+        decompress = options.get('decompress')
+        if decompress == 'auto':
+            decompress = detect_format(source.name)
+        return cls(source, decompress, options.get('output'), options.get('convert'),
+                   bool(options.get('keepRaw', False)))
+
+    def up_to_date(self) -> bool:
+        """True if the final output exists and is newer than the source."""
+        try:
+            return self.final_path.stat().st_mtime_ns >= self.source.stat().st_mtime_ns
+        except OSError:
+            return False
+
+    def finish(self) -> Path:
+        """Produce the final output from the verified ``source``.
+
+        Output streamed while downloading is published as is; otherwise (the
+        file was already present, linked from the store, or the stream missed
+        data) the source is decompressed in a single read pass.
+
+        Returns:
+            Path of the final output
+        """
+        if self.sink:
+            if self.sink.received != self.source.stat().st_size:
+                self.sink.reset()
+                self._decompress_file()
+            self.sink.finish()
+        if self.convert:
+            self._convert()
+        # Newer than the source, so up_to_date() holds on the next run
+        os.utime(self.final_path)
+        return self.final_path
+
+    def outputs(self) -> List[Path]:
+        """Files this stage creates next to the source."""
+        outputs = [self.final_path]
+        if self.convert and self.keep_raw and self.raw != self.source:
+            outputs.append(self.raw)
+        return outputs
+
+    def discard(self) -> None:
+        """Drop streamed output of a download that failed verification."""
+        if self.sink:
+            self.sink.reset()
+
+    def _decompress_file(self) -> None:
+        buffer = bytearray(READ_SIZE)
+        view = memoryview(buffer)
+        with open(self.source, 'rb', buffering=0) as f:
+            while True:
+                count = f.readinto(view)
+                if not count:
+                    break
+                self.sink.write(view[:count])
+
+    def _convert(self) -> None:
+        qemu_img = shutil.which('qemu-img')
+        if not qemu_img:
+            raise PostProcessError(f"qemu-img is required to convert {self.raw.name} to {self.convert}")
+        part = self.final_path.with_name(self.final_path.name + '.part')
+        result = subprocess.run([qemu_img, 'convert', '-O', self.convert, str(self.raw), str(part)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            part.unlink(missing_ok=True)
+            raise PostProcessError(f"qemu-img convert failed: {result.stderr.strip()}")
+        part.replace(self.final_path)
+        if not self.keep_raw and self.raw != self.source:
+            self.raw.unlink(missing_ok=True)
+
+
+def detect_format(file_name: str) -> Optional[str]:
+    """Compression format of ``file_name`` from its suffix, or None."""
+    for fmt, (suffix, _) in COMPRESSION_FORMATS.items():
+        if file_name.endswith(suffix):
+            return fmt
+    return None
@@ -0,0 +1,165 @@
+"""Bandwidth limits and time-window schedules for ISO downloads."""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .units import parse_size
+except ImportError:  # executed as a script
+    from units import parse_size
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+# How often a running download re-reads the schedule
+SCHEDULE_CHECK_INTERVAL = 5.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting throughput to ``rate`` bytes/s.
+
+    Consumers may overdraw the bucket (a network chunk can be larger than
+    the burst size) and then sleep until the debt is paid back, so several
+    threads sharing one bucket together stay at ``rate``.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._burst = burst
+        self.rate = None
+        self.set_rate(rate)
+
+    def set_rate(self, rate: Optional[float]) -> None:
+        """Change the rate; None or 0 disables limiting."""
+        with self._lock:
+            rate = rate or None
+            if rate != self.rate:
+                self.rate = rate
+                self.burst = self._burst or rate or 0
+                self._tokens = self.burst
+                self._stamp = time.monotonic()
+
+    def consume(self, amount: int) -> None:
+        """Take ``amount`` bytes from the bucket, sleeping if it runs dry."""
+        with self._lock:
+            if not self.rate:
+                return
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class RateSchedule:
+    """Global and per-download limits, optionally depending on the time of day.
+
+    Built from ``settings.downloads``::
+
+        rateLimit: "50MiB"         # all downloads together, bytes per second
+        perDownloadLimit: "20MiB"  # each download
+        schedule:                  # first matching window wins
+          - days: [mon, tue, wed, thu, fri]
+            start: "08:00"
+            end: "18:00"           # an end before start wraps past midnight,
+                                   # an end equal to start covers the whole day
+            rateLimit: "5MiB"
+            perDownloadLimit: "2MiB"
+
+    Outside every window the top-level limits apply; a missing or zero limit
+    means unlimited.
+    """
+
+    def __init__(self, settings: Dict):
+        self.default = (self._rate(settings.get('rateLimit')), self._rate(settings.get('perDownloadLimit')))
+        self.windows: List[Tuple[Tuple[str, ...], int, int, Tuple]] = []
+        for window in settings.get('schedule') or []:
+            days = window.get('days') or DAYS
+            if isinstance(days, str):
+                days = self._day_range(days)
+            days = tuple(day.lower()[:3] for day in days)
+            unknown = [day for day in days if day not in DAYS]
+            if unknown:
+                raise ValueError(f"Invalid schedule day(s): {', '.join(unknown)}")
+            limits = (self._rate(window.get('rateLimit')), self._rate(window.get('perDownloadLimit')))
+            self.windows.append((days, self._minutes(window.get('start', '00:00')),
+                                 self._minutes(window.get('end', '24:00')), limits))
+
+    @staticmethod
+    def _rate(value) -> Optional[int]:
+        """Bytes/s of a limit such as ``"10MiB"`` or ``"10MiB/s"``; None when unlimited."""
+        if not value:
+            return None
+        if isinstance(value, str) and value.strip().endswith('/s'):
+            value = value.strip()[:-2]
+        return parse_size(value) or None
+
+    @staticmethod
+    def _minutes(value) -> int:
+        hours, _, minutes = str(value).partition(':')
+        try:
+            total = int(hours) * 60 + int(minutes or 0)
+        except ValueError:
+            raise ValueError(f"Invalid schedule time: {value!r}") from None
+        if not 0 <= total <= 24 * 60:
+            raise ValueError(f"Invalid schedule time: {value!r}")
+        return total
+
+    @staticmethod
+    def _day_range(value: str) -> Tuple[str, ...]:
+        """Expand 'mon-fri' or 'sat,sun' into day names."""
+        days = []
+        for part in value.lower().split(','):
+            first, _, last = part.strip().partition('-')
+            if last and first[:3] in DAYS and last[:3] in DAYS:
+                start, end = DAYS.index(first[:3]), DAYS.index(last[:3])
+                days.extend(DAYS[(start + i) % 7] for i in range((end - start) % 7 + 1))
+            else:
+                days.append(first)
+        return tuple(days)
+
+    def limits(self, now: datetime = None) -> Tuple[Optional[int], Optional[int]]:
+        """(global, per-download) limits in bytes/s at ``now`` (default: local time)."""
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        today = DAYS[now.weekday()]
+        yesterday = DAYS[(now.weekday() - 1) % 7]
+        for days, start, end, limits in self.windows:
+            if start == end:
+                active = today in days
+            elif start < end:
+                active = today in days and start <= minute < end
+            else:
+                active = (today in days and minute >= start) or (yesterday in days and minute < end)
+            if active:
+                return limits
+        return self.default
+
+    @property
+    def enabled(self) -> bool:
+        return any(self.default) or any(any(limits) for *_, limits in self.windows)
+
+
+class Throttle:
+    """Rate limiting for one download: its own bucket plus the shared global one.
+
+    Both rates follow the schedule, re-read every few seconds, so a sync that
+    runs into or out of a window changes speed without restarting.
+    """
+
+    def __init__(self, schedule: RateSchedule, global_bucket: TokenBucket):
+        self.schedule = schedule
+        self.global_bucket = global_bucket
+        self.bucket = TokenBucket()
+        self._checked = None
+
+    def consume(self, amount: int) -> None:
+        now = time.monotonic()
+        if self._checked is None or now - self._checked >= SCHEDULE_CHECK_INTERVAL:
+            self._checked = now
+            global_rate, download_rate = self.schedule.limits()
+            self.global_bucket.set_rate(global_rate)
+            self.bucket.set_rate(download_rate)
+        self.bucket.consume(amount)
+        self.global_bucket.consume(amount)
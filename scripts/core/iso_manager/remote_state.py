@@ -0,0 +1,45 @@
+"""Remembered HTTP validators of downloaded ISOs."""
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    from .json_store import JsonStore
+except ImportError:  # executed as a script
+    from json_store import JsonStore
+
+
+class RemoteState(JsonStore):
+    """ETag/Last-Modified/Content-Length of the remote copy of each artifact.
+
+    The validators are only trusted while the URL is the same and the local
+    file is untouched since it was downloaded.
+    """
+
+    def record(self, path: Path, url: str, etag: Optional[str], last_modified: Optional[str],
+               size: Optional[int]) -> None:
+        """Remember the validators ``url`` was downloaded to ``path`` with."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            self._entries[self._key(path)] = dict(
+                self._identity(st), url=url, etag=etag, lastModified=last_modified,
+                contentLength=size, checked=int(time.time()))
+            self._save()
+
+    def validators(self, path: Path, url: str) -> Optional[Dict]:
+        """Return the stored validators of ``path`` if they still apply."""
+        with self._lock:
+            entry = self._entry(path)
+            return dict(entry) if entry and entry.get('url') == url else None
+
+    def touch(self, path: Path) -> None:
+        """Mark ``path`` as checked against its remote just now."""
+        with self._lock:
+            entry = self._entry(path)
+            if entry:
+                entry['checked'] = int(time.time())
+                self._save()
@@ -0,0 +1,216 @@
+"""Retention policies for the ISO tree: keep last N per product, size budget, LRU."""
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+try:
+    from .json_store import JsonStore
+    from .units import parse_size
+except ImportError:  # executed as a script
+    from json_store import JsonStore
+    from units import parse_size
+
+# Uses closer together than this are not written to the usage log again
+USAGE_RESOLUTION = 3600
+
+# Eviction reasons
+KEEP_LAST = 'keepLast'
+UNUSED = 'maxUnusedDays'
+SIZE_BUDGET = 'maxTotalSize'
+
+# Default downloadLocation of the OpenWRT firmware manager's device profiles
+FIRMWARE_LOCATION = 'networking/router/openwrt/{version}'
+
+
+def scan_tree(root: Path) -> Dict[str, os.stat_result]:
+    """Stat every regular file below ``root`` in a single ``os.scandir`` pass.
+
+    Hidden files and directories (such as the state directory) are skipped.
+
+    Returns:
+        Dictionary mapping each file path (as joined from ``root``) to its
+        ``lstat`` result
+    """
+    files = {}
+    pending = [str(root)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files[entry.path] = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files
+
+
+def product_key(iso: Dict) -> str:
+    """Group of an entry for ``keepLast``: its ``product``, or its path with the version wildcarded.
+
+    ``hypervisor/bare-metal/proxmox/9.0-1/proxmox-ve_9.0-1.iso`` and the 8.4-1
+    entry both become ``hypervisor/bare-metal/proxmox/*/proxmox-ve_*.iso``.
+    """
+    if iso.get('product'):
+        return str(iso['product'])
+    relative = f"{iso.get('downloadLocation', '').strip('/')}/{iso.get('fileName', '')}".lstrip('/')
+    version = str(iso.get('version') or '')
+    return relative.replace(version, '*') if version and version in relative else relative
+
+
+class DeviceFirmware:
+    """Firmware the OpenWRT firmware manager downloads for its device profiles.
+
+    Those files are not in the catalog: ``scripts/core/openwrt/firmware_manager.py``
+    builds their entries from ``devices.yml`` and the published releases. A
+    path (relative to the ISO tree) belongs to a profile when it is
+    ``<downloadLocation>/openwrt-<version>-<target>-<image>`` for any release
+    version, named and placed the way the firmware manager does.
+    """
+
+    FILE_RE = re.compile(r'^openwrt-(\d+\.\d+\.\d+(?:-rc\d+)?)-(.+)$')
+
+    def __init__(self, devices_path: Path):
+        self.devices: List[Dict] = []
+        try:
+            with open(devices_path, 'r') as f:
+                data = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError):
+            return
+        location = (data.get('settings') or {}).get('downloadLocation', FIRMWARE_LOCATION)
+        for device in data.get('devices') or []:
+            if device.get('target') and device.get('image'):
+                self.devices.append({
+                    'name': device.get('name', ''),
+                    'image': f"{str(device['target']).strip('/').replace('/', '-')}-{device['image']}",
+                    'location': device.get('downloadLocation', location),
+                })
+
+    def __contains__(self, relative_path: str) -> bool:
+        directory, _, name = relative_path.rpartition('/')
+        match = self.FILE_RE.match(name)
+        if not match:
+            return False
+        version, image = match.groups()
+        return any(device['image'] == image and
+                   device['location'].format(version=version, device=device['name']).strip('/') == directory
+                   for device in self.devices)
+
+
+class UsageLog(JsonStore):
+    """When each artifact was last used (downloaded, linked or served to a mirror client).
+
+    Entries are keyed by path only, not by file identity, so an artifact
+    keeps its history when it is downloaded again.
+    """
+
+    def touch(self, path: Path) -> None:
+        now = int(time.time())
+        with self._lock:
+            key = self._key(path)
+            if now - self._entries.get(key, {}).get('lastUsed', 0) < USAGE_RESOLUTION:
+                return
+            self._entries[key] = {'lastUsed': now}
+            self._save()
+
+    def last_used(self, path: Path) -> Optional[int]:
+        with self._lock:
+            return self._entries.get(self._key(path), {}).get('lastUsed')
+
+
+@dataclass
+class Artifact:
+    """The files of one catalog entry present in the tree."""
+    name: str
+    version: str
+    product: str
+    paths: List[str]
+    files: Dict[Tuple[int, int], int]  # (st_dev, st_ino) -> size
+    last_used: float
+    pinned: bool = False
+    sort_key: Tuple = ()
+
+    @property
+    def size(self) -> int:
+        return sum(self.files.values())
+
+
+class RetentionPolicy:
+    """Which downloaded catalog entries to evict, from ``settings.retention``::
+
+        retention:
+          keepLast: 2            # newest versions kept per product (0: all)
+          maxUnusedDays: 90      # evict entries not used for this long
+          maxTotalSize: "500GiB" # then evict least recently used entries
+                                 # until the tree fits
+
+    Entries with ``retain: true`` are never evicted. Versions are ordered
+    with the release discovery version key, last use comes from the usage
+    log (falling back to the file's mtime), and hardlinked files are only
+    counted once against the size budget.
+    """
+
+    def __init__(self, settings: Dict):
+        self.keep_last = int(settings.get('keepLast') or 0)
+        self.max_unused_days = settings.get('maxUnusedDays')
+        max_total = settings.get('maxTotalSize')
+        self.max_total_size = parse_size(max_total) if max_total else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.keep_last or self.max_unused_days or self.max_total_size)
+
+    def plan(self, artifacts: List[Artifact], now: float = None) -> List[Tuple[Artifact, str]]:
+        """Return ``(artifact, reason)`` for every artifact to evict, in eviction order."""
+        now = now or time.time()
+        evicted: List[Tuple[Artifact, str]] = []
+        remaining = [artifact for artifact in artifacts if not artifact.pinned]
+
+        if self.keep_last:
+            products: Dict[str, List[Artifact]] = {}
+            for artifact in remaining:
+                products.setdefault(artifact.product, []).append(artifact)
+            for group in products.values():
+                group.sort(key=lambda artifact: artifact.sort_key, reverse=True)
+                evicted.extend((artifact, KEEP_LAST) for artifact in group[self.keep_last:])
+
+        if self.max_unused_days:
+            cutoff = now - float(self.max_unused_days) * 86400
+            gone = {id(artifact) for artifact, _ in evicted}
+            evicted.extend((artifact, UNUSED) for artifact in remaining
+                           if id(artifact) not in gone and artifact.last_used < cutoff)
+
+        if self.max_total_size is not None:
+            # Hardlinked files count once, and stop counting when the last
+            # artifact kept that links them is evicted
+            gone = {id(artifact) for artifact, _ in evicted}
+            holders: Dict[Tuple[int, int], int] = {}
+            sizes: Dict[Tuple[int, int], int] = {}
+            for artifact in artifacts:
+                if id(artifact) not in gone:
+                    for inode, size in artifact.files.items():
+                        holders[inode] = holders.get(inode, 0) + 1
+                        sizes[inode] = size
+            total = sum(sizes.values())
+            for artifact in sorted(remaining, key=lambda artifact: artifact.last_used):
+                if total <= self.max_total_size:
+                    break
+                if id(artifact) in gone:
+                    continue
+                evicted.append((artifact, SIZE_BUDGET))
+                for inode in artifact.files:
+                    holders[inode] -= 1
+                    if not holders[inode]:
+                        total -= sizes[inode]
+        return evicted
@@ -0,0 +1,42 @@
+"""Shared fixtures: the iso_manager modules on sys.path and a local stand-in for upstream sites."""
+import shutil
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_server import OriginRequestHandler, OriginServer  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+
+class RecordingHandler(OriginRequestHandler):
+    """Origin handler that records (method, path, If-None-Match, status) of every request."""
+
+    def log_request(self, code='-', size='-') -> None:
+        self.server.requests.append((self.command, urlsplit(self.path).path,
+                                     self.headers.get('If-None-Match'), int(code)))
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """``OriginServer`` on a free port serving the recorded pages of ``fixtures/discovery``.
+
+    ``{origin}`` in the recorded pages (absolute asset links of the GitHub
+    API) is replaced with the server's URL.
+    """
+    root = tmp_path / 'origin'
+    shutil.copytree(FIXTURES / 'discovery', root)
+    server = OriginServer(('127.0.0.1', 0), root)
+    server.RequestHandlerClass = RecordingHandler
+    server.requests = []
+    for path in root.rglob('*'):
+        if path.is_file():
+            path.write_text(path.read_text().replace('{origin}', server.url))
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,55 @@
+"""Release key import for checksum file signatures (settings.checksums.keyFiles)."""
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+import yaml
+
+from checksum_sources import ChecksumSourceError
+from iso_manager import ISOManager
+
+pytestmark = pytest.mark.skipif(shutil.which('gpg') is None, reason='gpg is not installed')
+
+
+@pytest.fixture
+def gnupg_home():
+    # Short path: gpg-agent's socket must fit in a sockaddr_un
+    home = tempfile.mkdtemp(prefix='isot-')
+    yield home
+    subprocess.run(['gpgconf', '--homedir', home, '--kill', 'all'], capture_output=True)
+    shutil.rmtree(home, ignore_errors=True)
+
+
+def resolver(tmp_path, gnupg_home, key_files):
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump({
+        'settings': {'checksums': {'gnupgHome': gnupg_home, 'keyFiles': key_files}},
+        'tags': [], 'isos': [],
+    }))
+    return ISOManager(str(config_path), str(tmp_path / 'iso'), quiet=True).checksums
+
+
+def test_key_files_are_imported(tmp_path, gnupg_home):
+    source = tempfile.mkdtemp(prefix='isok-')
+    try:
+        subprocess.run(['gpg', '--homedir', source, '--batch', '--passphrase', '', '--quick-gen-key',
+                        'Release <release@example.com>', 'ed25519', 'sign', 'never'], check=True, capture_output=True)
+        key = subprocess.run(['gpg', '--homedir', source, '--batch', '--export', 'release@example.com'],
+                             check=True, capture_output=True).stdout
+    finally:
+        subprocess.run(['gpgconf', '--homedir', source, '--kill', 'all'], capture_output=True)
+        shutil.rmtree(source, ignore_errors=True)
+    (tmp_path / 'release.gpg').write_bytes(key)
+
+    keys = resolver(tmp_path, gnupg_home, ['release.gpg'])._gpg_manager().list_keys()
+    assert [uid for key in keys for uid in key['uids']] == ['Release <release@example.com>']
+
+
+@pytest.mark.parametrize('content', [None, b'not a key\n'])
+def test_unusable_key_file_is_a_checksum_source_error(tmp_path, gnupg_home, content):
+    if content is not None:
+        (tmp_path / 'release.asc').write_bytes(content)
+
+    with pytest.raises(ChecksumSourceError, match='Cannot import key file release.asc'):
+        resolver(tmp_path, gnupg_home, ['release.asc'])._gpg_manager()
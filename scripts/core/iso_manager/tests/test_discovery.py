@@ -0,0 +1,214 @@
+"""Release discovery against recorded upstream pages (see conftest.origin).
+
+Digests in the recorded checksum files are the sha256 of the file name
+(of ``<tag>/<asset>`` for GitHub releases), so expected values are derived
+with ``digest()`` instead of being copied around.
+"""
+import hashlib
+import time
+
+import pytest
+import requests
+import yaml
+
+from catalog import CatalogError
+from discovery import (Crawler, OpenWrtProvider, ProxmoxProvider, ReleaseDiscovery, ReleaseProvider,
+                       TalosProvider, UbuntuProvider, version_key)
+from iso_manager import ISOManager
+from json_store import UrlStore
+
+A6_FACTORY = 'tplink_archer-a6-v3-squashfs-factory.bin'
+A6_SYSUPGRADE = 'tplink_archer-a6-v3-squashfs-sysupgrade.bin'
+
+
+def digest(name: str) -> str:
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    session = requests.Session()
+    yield Crawler(session, UrlStore(tmp_path / 'cache.json', tmp_path), ttl=3600, workers=4, timeout=10)
+    session.close()
+
+
+def openwrt(origin, **source):
+    return OpenWrtProvider(dict({'provider': 'openwrt', 'target': 'ramips/mt7621', 'images': [A6_FACTORY],
+                                 'baseUrl': f"{origin.url}/openwrt/releases/"}, **source))
+
+
+def test_version_key_orders_releases_and_prereleases():
+    assert sorted(['24.10.1', '24.10.0', '24.10.0-rc7', '23.05.5', '25.12.0-rc1'], key=version_key) == \
+        ['23.05.5', '24.10.0-rc7', '24.10.0', '24.10.1', '25.12.0-rc1']
+    assert sorted(['8.3-1', '8.2-2', '8.2-1', '7.4-1'], key=version_key) == ['7.4-1', '8.2-1', '8.2-2', '8.3-1']
+    assert version_key('v1.10.0-beta.0') > version_key('1.9.2')
+    assert version_key('1.10.0-beta.0') < version_key('1.10.0')
+
+
+def test_provider_without_releases_cannot_be_created():
+    class Incomplete(ReleaseProvider):
+        default_images = ('.iso',)
+
+    with pytest.raises(TypeError):
+        Incomplete({'provider': 'incomplete'})
+
+
+def test_openwrt_keeps_newest_releases_with_checksums(origin, crawler):
+    releases = openwrt(origin, keep=2).releases(crawler)
+
+    assert [release.version for release in releases] == ['24.10.1', '24.10.0']
+    newest = releases[0]
+    assert newest.file_name == f"openwrt-24.10.1-ramips-mt7621-{A6_FACTORY}"
+    assert newest.download_link == \
+        f"{origin.url}/openwrt/releases/24.10.1/targets/ramips/mt7621/{newest.file_name}"
+    assert newest.checksum == digest(newest.file_name)
+    assert newest.platform == 'ramips/mt7621'
+
+
+def test_openwrt_prerelease_and_min_version(origin, crawler):
+    assert [r.version for r in openwrt(origin, prerelease=True).releases(crawler)] == ['25.12.0-rc1']
+    assert [r.version for r in openwrt(origin, keep=0, minVersion='23.05.5').releases(crawler)] == \
+        ['24.10.1', '24.10.0', '23.05.5']
+
+
+def test_openwrt_skips_versions_and_images_without_checksums(origin, crawler):
+    # 22.03.7 has no sha256sums (404); 23.05.4 lists no A6 sysupgrade image
+    releases = openwrt(origin, keep=0, images=[A6_FACTORY, A6_SYSUPGRADE]).releases(crawler)
+
+    found = {(release.version, release.image) for release in releases}
+    assert ('23.05.4', A6_FACTORY) in found
+    assert ('23.05.4', A6_SYSUPGRADE) not in found
+    assert not any(version == '22.03.7' for version, _ in found)
+    assert all(release.checksum == digest(release.file_name) for release in releases)
+    assert ('GET', '/openwrt/releases/22.03.7/targets/ramips/mt7621/sha256sums', None, 404) in origin.requests
+
+
+def test_ubuntu_lts_series_and_point_releases(origin, crawler):
+    provider = UbuntuProvider({'provider': 'ubuntu', 'lts': True, 'keep': 2, 'baseUrl': f"{origin.url}/ubuntu/"})
+    releases = provider.releases(crawler)
+
+    assert [(release.version, release.file_name) for release in releases] == [
+        ('24.04.2', 'ubuntu-24.04.2-live-server-amd64.iso'),
+        ('22.04.5', 'ubuntu-22.04.5-live-server-amd64.iso'),
+    ]
+    assert releases[0].download_link == f"{origin.url}/ubuntu/24.04/ubuntu-24.04.2-live-server-amd64.iso"
+    assert all(release.checksum == digest(release.file_name) for release in releases)
+
+
+def test_ubuntu_explicit_series(origin, crawler):
+    provider = UbuntuProvider({'provider': 'ubuntu', 'series': ['24.10'], 'images': ['desktop-amd64.iso'],
+                               'baseUrl': f"{origin.url}/ubuntu/"})
+
+    [release] = provider.releases(crawler)
+    assert release.file_name == 'ubuntu-24.10-desktop-amd64.iso'
+    assert release.checksum == digest('ubuntu-24.10-desktop-amd64.iso')
+
+
+def test_proxmox_products_share_one_checksum_file(origin, crawler):
+    base = f"{origin.url}/proxmox/iso/"
+    ve = ProxmoxProvider({'provider': 'proxmox', 'keep': 2, 'baseUrl': base}).releases(crawler)
+    pbs = ProxmoxProvider({'provider': 'proxmox', 'product': 'proxmox-backup-server',
+                           'baseUrl': base}).releases(crawler)
+
+    assert [release.version for release in ve] == ['8.3-1', '8.2-2']
+    assert ve[0].name == 'Proxmox VE 8.3-1'
+    assert ve[0].download_link == base + 'proxmox-ve_8.3-1.iso'
+    assert ve[0].checksum == digest('proxmox-ve_8.3-1.iso')
+    assert [(release.name, release.checksum) for release in pbs] == \
+        [('Proxmox Backup Server 3.3-1', digest('proxmox-backup-server_3.3-1.iso'))]
+
+
+def test_github_releases_skip_drafts_and_prereleases(origin, crawler):
+    source = {'provider': 'talos', 'keep': 2, 'apiUrl': f"{origin.url}/github/api/"}
+    releases = TalosProvider(source).releases(crawler)
+
+    # v1.9.3 is a draft and v1.10.0-beta.0 a pre-release
+    assert [release.version for release in releases] == ['1.9.2', '1.9.1']
+    assert releases[0].download_link == \
+        f"{origin.url}/github/siderolabs/talos/releases/download/v1.9.2/metal-amd64.iso"
+    assert releases[0].checksum == digest('v1.9.2/metal-amd64.iso')
+
+    beta = TalosProvider(dict(source, keep=1, prerelease=True)).releases(crawler)
+    assert [(release.version, release.checksum) for release in beta] == \
+        [('1.10.0-beta.0', digest('v1.10.0-beta.0/metal-amd64.iso'))]
+
+
+def test_crawler_reuses_fresh_responses_and_revalidates_stale_ones(origin, tmp_path):
+    url = f"{origin.url}/proxmox/iso/SHA256SUMS"
+    path = '/proxmox/iso/SHA256SUMS'
+    cache = UrlStore(tmp_path / 'cache.json', tmp_path)
+    with requests.Session() as session:
+        crawler = Crawler(session, cache, ttl=3600, timeout=10)
+        body = crawler.get(url)
+        assert crawler.get(url) == body
+        assert [request for request in origin.requests if request[1] == path] == [('GET', path, None, 200)]
+
+        # Past the TTL the copy is revalidated with its ETag and kept on a 304
+        entry = cache.get(url)
+        entry['fetched'] -= 7200
+        cache.put(url, entry)
+        assert crawler.get(url) == body
+        etag = entry['etag']
+        assert [request for request in origin.requests if request[1] == path][-1] == ('GET', path, etag, 304)
+        assert time.time() - cache.get(url)['fetched'] < 60
+
+    # A refresh that fails falls back to the cached copy
+    origin.shutdown()
+    origin.server_close()
+    with requests.Session() as session:
+        offline = Crawler(session, cache, ttl=0, timeout=2)
+        assert offline.get(url) == body
+        assert offline.stale == [url]
+
+
+@pytest.fixture
+def manager(origin, tmp_path):
+    """ISOManager whose discovery sources point at the stand-in."""
+    config = {
+        'settings': {'discovery': {
+            'output': 'generated/discovered.yml',
+            'sources': [{
+                'provider': 'openwrt', 'target': 'ramips/mt7621', 'images': [A6_FACTORY], 'keep': 2,
+                'baseUrl': f"{origin.url}/openwrt/releases/",
+                'downloadLocation': 'networking/router/openwrt/{version}', 'tags': ['Networking'],
+            }],
+        }},
+        'tags': [{'name': 'Networking', 'description': 'Routers'}],
+        'include': ['generated/*.yml'],
+        'isos': [],
+    }
+    config_path = tmp_path / 'config' / 'config.yml'
+    config_path.parent.mkdir()
+    config_path.write_text(yaml.safe_dump(config, sort_keys=False))
+    return ISOManager(str(config_path), str(tmp_path / 'iso'), quiet=True)
+
+
+def test_update_catalog_writes_generated_entries(manager, origin):
+    report = ReleaseDiscovery(manager).update_catalog()
+
+    assert report['written'] and not report['errors']
+    assert report['added'] == ['OpenWRT 24.10.1', 'OpenWRT 24.10.0']
+    entries = yaml.safe_load(open(report['output']))['isos']
+    assert entries[0]['downloadLocation'] == 'networking/router/openwrt/24.10.1'
+    assert entries[0]['checkSum'] == digest(entries[0]['fileName'])
+    assert entries[0]['discoveredBy'] == 'openwrt:ramips/mt7621'
+
+    again = ReleaseDiscovery(manager).update_catalog()
+    assert not again['written'] and again['unchanged'] == report['added']
+
+
+def test_update_catalog_rolls_back_output_the_catalog_rejects(manager):
+    discovery = ReleaseDiscovery(manager)
+    discovery.update_catalog()
+    written = discovery.output.read_bytes()
+
+    # Entries tagged with an undefined tag fail Catalog.load
+    discovery.settings['sources'][0]['tags'] = ['Undefined']
+    with pytest.raises(CatalogError):
+        discovery.update_catalog()
+    assert discovery.output.read_bytes() == written
+
+    discovery.output.unlink()
+    with pytest.raises(CatalogError):
+        discovery.update_catalog()
+    assert not discovery.output.exists()
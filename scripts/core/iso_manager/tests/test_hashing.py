@@ -0,0 +1,35 @@
+"""checkSumAlgo: the catalog accepts exactly the algorithms the hashing code can use."""
+import hashlib
+
+import pytest
+import yaml
+
+from catalog import Catalog, CatalogError
+from hashing import hash_file, new_hash
+
+
+def load(tmp_path, algorithm, checksum):
+    path = tmp_path / 'config.yml'
+    path.write_text(yaml.safe_dump({'tags': [], 'isos': [{
+        'name': 'Image', 'fileName': 'image.iso', 'downloadLink': 'https://example.com/image.iso',
+        'downloadLocation': 'linux', 'checkSumAlgo': algorithm, 'checkSum': checksum,
+    }]}))
+    return Catalog.load(path)
+
+
+@pytest.mark.parametrize('algorithm', ['sha256', 'SHA512', 'sha512_256', 'sha3_256', 'blake2b'])
+def test_algorithms_accepted_by_the_catalog_can_hash_files(tmp_path, algorithm):
+    image = tmp_path / 'image.iso'
+    image.write_bytes(b'image' * 1000)
+    expected = hashlib.new(algorithm.lower(), image.read_bytes()).hexdigest()
+
+    load(tmp_path, algorithm, expected)
+    assert hash_file(image, (algorithm,)) == {algorithm.lower(): expected}
+
+
+@pytest.mark.parametrize('algorithm', ['shake_128', 'shake_256', 'sha7'])
+def test_unusable_algorithms_are_rejected_by_both(tmp_path, algorithm):
+    with pytest.raises(CatalogError, match='unsupported checkSumAlgo'):
+        load(tmp_path, algorithm, 'ab' * 32)
+    with pytest.raises(ValueError, match='Unsupported hash algorithm'):
+        new_hash(algorithm)
@@ -0,0 +1,61 @@
+"""StreamDecompressor on concatenated members split at awkward chunk boundaries."""
+import bz2
+import gzip
+import lzma
+import os
+
+import pytest
+
+from postprocess import PostProcessError, StreamDecompressor
+
+COMPRESS = {'gzip': gzip.compress, 'xz': lzma.compress, 'bzip2': bz2.compress}
+MEMBERS = [os.urandom(1000), b'a' * 5000, os.urandom(300)]
+
+
+def feed(tmp_path, fmt, data, chunks):
+    """Decompress ``data`` written in pieces of the given sizes (the rest in one piece)."""
+    sink = StreamDecompressor(fmt, tmp_path / 'image.raw')
+    offset = 0
+    for size in chunks:
+        sink.write(data[offset:offset + size])
+        offset += size
+    sink.write(memoryview(data)[offset:])
+    sink.finish()
+    return (tmp_path / 'image.raw').read_bytes()
+
+
+@pytest.mark.parametrize('fmt', sorted(COMPRESS))
+def test_next_member_in_the_same_chunk_as_the_end_of_the_previous(tmp_path, fmt):
+    first, second = COMPRESS[fmt](MEMBERS[0]), COMPRESS[fmt](MEMBERS[1])
+
+    assert feed(tmp_path, fmt, first + second, [10]) == MEMBERS[0] + MEMBERS[1]
+
+
+@pytest.mark.parametrize('fmt', sorted(COMPRESS))
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 7, 64, 1021])
+def test_members_fed_in_small_chunks(tmp_path, fmt, size):
+    data = b''.join(COMPRESS[fmt](member) for member in MEMBERS)
+
+    assert feed(tmp_path, fmt, data, [size] * (len(data) // size)) == b''.join(MEMBERS)
+
+
+@pytest.mark.parametrize('fmt', sorted(COMPRESS))
+def test_split_inside_the_magic_of_the_next_member(tmp_path, fmt):
+    first, second = COMPRESS[fmt](MEMBERS[0]), COMPRESS[fmt](MEMBERS[1])
+
+    assert feed(tmp_path, fmt, first + second, [len(first) + 1, 1]) == MEMBERS[0] + MEMBERS[1]
+
+
+def test_trailing_data_after_the_last_member_is_ignored(tmp_path):
+    data = gzip.compress(MEMBERS[0]) + b'\x00' * 100 + b'signature'
+
+    assert feed(tmp_path, 'gzip', data, [1001]) == MEMBERS[0]
+    assert feed(tmp_path, 'gzip', gzip.compress(MEMBERS[0]) + b'\x1f', []) == MEMBERS[0]
+
+
+def test_truncated_member_is_rejected(tmp_path):
+    data = gzip.compress(MEMBERS[0]) + gzip.compress(MEMBERS[1])[:-20]
+
+    with pytest.raises(PostProcessError):
+        feed(tmp_path, 'gzip', data, [7])
+    assert not (tmp_path / 'image.raw').exists()
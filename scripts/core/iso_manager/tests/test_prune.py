@@ -0,0 +1,58 @@
+"""Orphan detection of ISOManager.prune on a small ISO tree."""
+import pytest
+import yaml
+
+from iso_manager import ISOManager
+
+A6_FIRMWARE = 'openwrt-{version}-ramips-mt7621-tplink_archer-a6-v3-squashfs-factory.bin'
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """ISOManager with one catalog entry, an OpenWRT device profile and unrelated files."""
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    (config_dir / 'devices.yml').write_text(yaml.safe_dump({
+        'settings': {'downloadLocation': 'networking/router/openwrt/{version}'},
+        'devices': [{'name': 'Archer A6 v3', 'target': 'ramips/mt7621',
+                     'image': 'tplink_archer-a6-v3-squashfs-factory.bin'}],
+    }))
+    (config_dir / 'config.yml').write_text(yaml.safe_dump({
+        'settings': {'retention': {'deviceProfiles': 'devices.yml'}},
+        'tags': [],
+        'isos': [{'name': 'Ubuntu 24.04', 'version': '24.04', 'fileName': 'ubuntu.iso',
+                  'downloadLocation': 'linux/ubuntu', 'downloadLink': 'http://localhost/ubuntu.iso'}],
+    }))
+    root = tmp_path / 'iso'
+    files = {
+        'catalog': root / 'linux/ubuntu/ubuntu.iso',
+        'orphan': root / 'linux/ubuntu/ubuntu-old.iso',
+        'firmware': root / 'networking/router/openwrt/24.10.1' / A6_FIRMWARE.format(version='24.10.1'),
+        'misplaced': root / 'networking/router/openwrt/24.10.0' / A6_FIRMWARE.format(version='24.10.1'),
+        'backup': root / 'linux/openwrt/backup/router.backup-tar-gz',
+    }
+    for path in files.values():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'data')
+    return ISOManager(str(config_dir / 'config.yml'), str(root), quiet=True), files
+
+
+def test_prune_keeps_device_firmware_and_only_reports_unmanaged_files(tree):
+    manager, files = tree
+    report = manager.prune(delete=True)
+
+    assert [entry['path'] for entry in report['orphans']] == [str(files['orphan'])]
+    assert sorted(entry['path'] for entry in report['unmanaged']) == \
+        sorted([str(files['backup']), str(files['misplaced'])])
+    assert not files['orphan'].exists()
+    for name in ('catalog', 'firmware', 'misplaced', 'backup'):
+        assert files[name].exists(), name
+
+
+def test_prune_deletes_unmanaged_files_with_orphans(tree):
+    manager, files = tree
+    report = manager.prune(delete=True, orphans=True)
+
+    assert report['bytes'] == 3 * len(b'data')
+    assert not files['backup'].exists() and not files['misplaced'].exists()
+    assert files['catalog'].exists() and files['firmware'].exists()
@@ -0,0 +1,15 @@
+"""Byte size parsing for the ISO manager config."""
+import re
+
+SIZE_UNITS = {'': 1, 'B': 1, 'K': 1000, 'KB': 1000, 'KIB': 1024, 'M': 1000 ** 2, 'MB': 1000 ** 2,
+              'MIB': 1024 ** 2, 'G': 1000 ** 3, 'GB': 1000 ** 3, 'GIB': 1024 ** 3}
+
+
+def parse_size(value) -> int:
+    """Parse a byte size such as ``67108864``, ``"64MiB"`` or ``"1.5 GB"``."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*([0-9.]+)\s*([A-Za-z]*)\s*', str(value))
+    if not match or match.group(2).upper() not in SIZE_UNITS:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
@@ -0,0 +1,67 @@
+"""Persistent record of verified ISO checksums."""
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    from .json_store import JsonStore
+except ImportError:  # executed as a script
+    from json_store import JsonStore
+
+# Verification states reported by VerifyCache.status()
+MISSING = 'missing'
+VERIFIED = 'verified'
+CORRUPT = 'corrupt'
+STALE = 'stale'
+UNVERIFIED = 'unverified'
+
+
+class VerifyCache(JsonStore):
+    """JSON index of file digests keyed by file identity.
+
+    Every entry stores the size, mtime and inode a digest was computed for, so
+    an unchanged file is verified with a single ``stat()`` instead of being
+    hashed again. Any change to the file invalidates its digests.
+    """
+
+    def lookup(self, path: Path, algorithm: str) -> Optional[str]:
+        """Return the cached ``algorithm`` digest of ``path`` if it is still valid."""
+        with self._lock:
+            entry = self._entry(path)
+            return entry['digests'].get(algorithm.lower()) if entry else None
+
+    def store(self, path: Path, algorithm: str, digest: str) -> None:
+        """Record ``digest`` for the current state of ``path``."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            entry = self._entry(path, st)
+            if entry is None:
+                entry = dict(self._identity(st), digests={})
+                self._entries[self._key(path)] = entry
+            entry['digests'][algorithm.lower()] = digest.lower()
+            self._save()
+
+    def status(self, path: Path, expected_hash: Optional[str], algorithm: str = 'sha256',
+               st: os.stat_result = None) -> str:
+        """Classify ``path`` without reading it.
+
+        Returns one of MISSING, VERIFIED, CORRUPT, STALE (file changed since it
+        was last hashed) or UNVERIFIED (never hashed, or no expected checksum).
+        """
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return MISSING
+        with self._lock:
+            known = self._key(path) in self._entries
+            entry = self._entry(path, st)
+        if entry is None:
+            return STALE if known else UNVERIFIED
+        digest = entry['digests'].get(algorithm.lower())
+        if digest is None or not expected_hash:
+            return UNVERIFIED
+        return VERIFIED if digest == expected_hash.lower() else CORRUPT
@@ -0,0 +1,3 @@
+from .firmware_manager import DeviceProfile, OpenWrtFirmwareManager, ReleaseIndex, clean_version
+
+__all__ = ['DeviceProfile', 'OpenWrtFirmwareManager', 'ReleaseIndex', 'clean_version']
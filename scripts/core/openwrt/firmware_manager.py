@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+OpenWRT firmware manager.
+
+Python port of scripts/network/router/openwrt-firmware-manager.sh: checks
+devices for firmware updates and downloads factory/sysupgrade images through
+the ISO manager's download engine (resume, retries, checksum verification,
+mirrors, rate limits).
+"""
+import argparse
+import bisect
+import json
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+from rich.console import Console
+from rich.panel import Panel
+from rich.table import Table
+
+try:
+    from ..iso_manager.checksum_sources import parse_sums
+    from ..iso_manager.discovery import Crawler, DiscoveryError, version_key, is_prerelease
+    from ..iso_manager.iso_manager import ISOManager
+    from ..iso_manager.json_store import UrlStore
+except ImportError:  # executed as a script: make scripts/core importable as 'core'
+    sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+    from core.iso_manager.checksum_sources import parse_sums
+    from core.iso_manager.discovery import Crawler, DiscoveryError, version_key, is_prerelease
+    from core.iso_manager.iso_manager import ISOManager
+    from core.iso_manager.json_store import UrlStore
+
+DEFAULT_BASE_URL = 'https://downloads.openwrt.org/releases/'
+DEFAULT_DOWNLOAD_LOCATION = 'networking/router/openwrt/{version}'
+DEFAULT_TTL = 3600
+VERSION_RE = re.compile(r'^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(-rc\d+)?$')
+RELEASE_DIR_RE = re.compile(r'^(\d+\.\d+\.\d+(?:-rc\d+)?)/$')
+
+# check() status values
+UP_TO_DATE = 'up to date'
+UPDATE_AVAILABLE = 'update available'
+NEWER = 'newer than latest'
+UNKNOWN = 'unknown'
+STATUS_STYLES = {UP_TO_DATE: 'green', UPDATE_AVAILABLE: 'yellow', NEWER: 'cyan', UNKNOWN: 'dim'}
+
+
+def clean_version(value) -> str:
+    """Normalise a version such as ``v24.10``, ``24.10.0`` or ``24.10.0-rc2``.
+
+    Missing minor/patch parts are filled with zeros, as OpenWRT release
+    directories are always named ``X.Y.Z``; zero-padded parts such as the
+    ``05`` of ``23.05.2`` are kept.
+
+    Raises:
+        ValueError: If ``value`` is not a version
+    """
+    match = VERSION_RE.match(str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid version format: {value!r} (expected X.Y.Z, e.g. 24.10.0)")
+    major, minor, patch, rc = match.groups()
+    return f"{major}.{minor or '0'}.{patch or '0'}{rc or ''}"
+
+
+@dataclass
+class DeviceProfile:
+    """A router model and the firmware image it needs."""
+    name: str
+    target: str
+    image: str
+    current_version: Optional[str] = None
+    download_location: str = DEFAULT_DOWNLOAD_LOCATION
+
+    @classmethod
+    def from_config(cls, raw: Dict, defaults: Dict) -> 'DeviceProfile':
+        missing = [key for key in ('name', 'target', 'image') if not raw.get(key)]
+        if missing:
+            raise ValueError(f"Device profile {raw.get('name', '?')!r} is missing {', '.join(missing)}")
+        current = raw.get('currentVersion')
+        return cls(
+            name=raw['name'],
+            target=str(raw['target']).strip('/'),
+            image=raw['image'],
+            current_version=clean_version(current) if current else None,
+            download_location=raw.get('downloadLocation',
+                                       defaults.get('downloadLocation', DEFAULT_DOWNLOAD_LOCATION)),
+        )
+
+    def file_name(self, version: str) -> str:
+        return f"openwrt-{version}-{self.target.replace('/', '-')}-{self.image}"
+
+
+class ReleaseIndex:
+    """The published OpenWRT releases, sorted once for bisecting."""
+
+    def __init__(self, versions):
+        self.versions: List[str] = sorted(set(versions), key=version_key)
+        self._keys = [version_key(version) for version in self.versions]
+
+    def latest(self, prerelease: bool = False) -> Optional[str]:
+        for version in reversed(self.versions):
+            if prerelease or not is_prerelease(version):
+                return version
+        return None
+
+    def between(self, current: str, latest: str, prerelease: bool = False) -> List[str]:
+        """Published versions newer than ``current`` up to and including ``latest``."""
+        start = bisect.bisect_right(self._keys, version_key(current))
+        end = bisect.bisect_right(self._keys, version_key(latest))
+        return [version for version in self.versions[start:end] if prerelease or not is_prerelease(version)]
+
+    def __contains__(self, version: str) -> bool:
+        index = bisect.bisect_left(self._keys, version_key(version))
+        return index < len(self.versions) and self.versions[index] == version
+
+
+class OpenWrtFirmwareManager:
+    """Check and download OpenWRT firmware for a set of device profiles.
+
+    Profiles come from ``config/devices.yml``. Release listings and the
+    ``sha256sums`` of every target directory are fetched through the
+    release discovery crawler (cached for ``settings.ttl`` seconds), and
+    downloads go through ``ISOManager.download_all``, so firmware for many
+    devices is fetched concurrently and verified against the published
+    checksums.
+    """
+
+    def __init__(self, devices_path: str = None, iso_manager: ISOManager = None, quiet: bool = False):
+        self.devices_path = Path(devices_path or Path(__file__).resolve().parent / 'config' / 'devices.yml')
+        self.iso_manager = iso_manager or ISOManager(quiet=quiet)
+        self.console = self.iso_manager.console
+        self.settings, self.devices = self._load_devices()
+        self.base_url = self.settings.get('baseUrl', DEFAULT_BASE_URL).rstrip('/') + '/'
+        cache = UrlStore(self.iso_manager.state_dir / 'discovery-cache.json', self.iso_manager.iso_base_dir)
+        self.crawler = Crawler(self.iso_manager.session, cache, self.settings.get('ttl', DEFAULT_TTL),
+                               timeout=self.iso_manager._timeout())
+        self._index = None
+
+    def __enter__(self) -> 'OpenWrtFirmwareManager':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.crawler.cache.save()
+        self.iso_manager.close()
+
+    def _load_devices(self):
+        with open(self.devices_path, 'r') as f:
+            data = yaml.safe_load(f) or {}
+        settings = data.get('settings') or {}
+        devices = [DeviceProfile.from_config(raw, settings) for raw in data.get('devices') or []]
+        return settings, devices
+
+    def find_devices(self, names: List[str]) -> List[DeviceProfile]:
+        """Profiles matching ``names`` (case-insensitive), all profiles for an empty list."""
+        if not names:
+            return list(self.devices)
+        by_name = {device.name.lower(): device for device in self.devices}
+        unknown = [name for name in names if name.lower() not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown device(s): {', '.join(unknown)} "
+                             f"(known: {', '.join(device.name for device in self.devices)})")
+        return [by_name[name.lower()] for name in names]
+
+    @property
+    def index(self) -> ReleaseIndex:
+        if self._index is None:
+            links = self.crawler.links(self.base_url)
+            self._index = ReleaseIndex(match.group(1) for match in map(RELEASE_DIR_RE.match, links) if match)
+            if not self._index.versions:
+                raise DiscoveryError(f"No releases found at {self.base_url}")
+        return self._index
+
+    def checksums(self, version: str, target: str) -> Dict[str, str]:
+        """Published digests of the files of one release target."""
+        body = self.crawler.get(f"{self.base_url}{version}/targets/{target}/sha256sums", missing_ok=True)
+        return parse_sums(body or '')
+
+    def check(self, devices: List[DeviceProfile], current: str = None, prerelease: bool = False) -> List[Dict]:
+        """Compare every device's current version with the latest release.
+
+        Args:
+            devices: Profiles to check
+            current: Version to assume for all devices instead of their ``currentVersion``
+            prerelease: Consider release candidates
+
+        Returns:
+            One dictionary per device with its ``status``, the ``latest``
+            version, the ``available`` versions in between, and whether the
+            latest release has an ``image`` for the device
+        """
+        latest = self.index.latest(prerelease)
+        targets = sorted({device.target for device in devices})
+        sums = dict(zip(targets, self.crawler.map(lambda target: self.checksums(latest, target), targets)))
+        results = []
+        for device in devices:
+            version = clean_version(current) if current else device.current_version
+            if version is None:
+                status, available = UNKNOWN, []
+            else:
+                order = (version_key(version) > version_key(latest)) - (version_key(version) < version_key(latest))
+                status = {0: UP_TO_DATE, 1: NEWER, -1: UPDATE_AVAILABLE}[order]
+                available = self.index.between(version, latest, prerelease)
+            results.append({
+                'device': device.name,
+                'current': version,
+                'latest': latest,
+                'status': status,
+                'available': available,
+                'image': device.file_name(latest) in sums[device.target],
+            })
+        return results
+
+    def firmware_entry(self, device: DeviceProfile, version: str) -> Dict:
+        """ISO-manager entry for the firmware of ``device`` at ``version``.
+
+        Raises:
+            DiscoveryError: If the release has no such image
+        """
+        file_name = device.file_name(version)
+        digest = self.checksums(version, device.target).get(file_name)
+        if digest is None:
+            raise DiscoveryError(f"OpenWRT {version} has no {file_name} for {device.name}")
+        return {
+            'name': f"OpenWRT {version} {device.name}",
+            'version': version,
+            'platform': device.target,
+            'fileName': file_name,
+            'checkSum': digest,
+            'checkSumAlgo': 'sha256',
+            'downloadLink': f"{self.base_url}{version}/targets/{device.target}/{file_name}",
+            'downloadLocation': device.download_location.format(version=version, device=device.name),
+            'tags': [],
+        }
+
+    def download(self, devices: List[DeviceProfile], version: str = None, force: bool = False,
+                 max_workers: int = None) -> List[Dict]:
+        """Download firmware for ``devices`` concurrently.
+
+        Args:
+            devices: Profiles to fetch firmware for
+            version: Release to fetch (default: the latest)
+            force: Also fetch for devices already running that release
+            max_workers: Concurrent downloads (default: settings.downloads.maxWorkers)
+
+        Returns:
+            One result dictionary per device; devices that are skipped or
+            have no image carry a ``status`` and ``error`` instead of a download
+        """
+        version = clean_version(version) if version else self.index.latest()
+        if version not in self.index:
+            raise ValueError(f"OpenWRT {version} is not published at {self.base_url}")
+
+        wanted, results = [], {}
+        for device in devices:
+            if not force and device.current_version == version:
+                self.console.print(f"[green]✓ {device.name} already runs OpenWRT {version} (use --force)")
+                results[device.name] = {'device': device.name, 'version': version, 'status': 'skipped',
+                                        'error': f"already running {version}"}
+            else:
+                wanted.append(device)
+
+        def entry(device: DeviceProfile):
+            try:
+                return device, self.firmware_entry(device, version), None
+            except DiscoveryError as e:
+                return device, None, str(e)
+
+        entries = []
+        for device, iso, error in self.crawler.map(entry, wanted):
+            if error:
+                self.console.print(f"[red]✗ {error}")
+                results[device.name] = {'device': device.name, 'version': version, 'status': 'failed',
+                                        'error': error}
+            else:
+                entries.append((device, iso))
+
+        # Several devices can share one image; download each file once
+        unique = list({iso['downloadLink']: iso for _, iso in entries}.values())
+        downloaded = {}
+        if unique:
+            for iso, result in zip(unique, self.iso_manager.download_all(isos=unique, max_workers=max_workers)):
+                downloaded[iso['downloadLink']] = result
+        for device, iso in entries:
+            results[device.name] = dict(downloaded[iso['downloadLink']].to_dict(), device=device.name,
+                                        version=version)
+        return [results[device.name] for device in devices]
+
+    def print_check_report(self, results: List[Dict]) -> None:
+        table = Table(title="📡 OpenWrt Update Check", show_header=True, header_style="bold magenta", box=None)
+        table.add_column("Device", style="green")
+        table.add_column("Current", style="yellow")
+        table.add_column("Latest", style="yellow")
+        table.add_column("Status")
+        table.add_column("Newer releases", style="cyan")
+        for result in results:
+            status = result['status']
+            if status == UPDATE_AVAILABLE and not result['image']:
+                status += " (no image yet)"
+            table.add_row(result['device'], result['current'] or '-', result['latest'],
+                          f"[{STATUS_STYLES[result['status']]}]{status}",
+                          ", ".join(result['available']) or '-')
+        self.console.print()
+        self.console.print(Panel.fit(table))
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check and download OpenWRT firmware for device profiles.")
+    parser.add_argument('--devices', dest='devices_file',
+                        help="Device profile file (default: scripts/core/openwrt/config/devices.yml)")
+    parser.add_argument('--config', help="ISO manager config file (download settings)")
+    parser.add_argument('--iso-dir', help="Root directory of the ISO tree (default: <repo>/iso)")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON on stdout")
+    parser.add_argument('--quiet', '-q', action='store_true', help="Suppress console output")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    check_parser = commands.add_parser('check', help="Check devices for firmware updates (default)")
+    check_parser.add_argument('devices', nargs='*', metavar='DEVICE', help="Device names (default: all)")
+    check_parser.add_argument('--current', metavar='VERSION', help="Current version for all devices")
+    check_parser.add_argument('--prerelease', action='store_true', help="Consider release candidates")
+
+    versions_parser = commands.add_parser('versions', help="List published OpenWRT releases")
+    versions_parser.add_argument('--prerelease', action='store_true', help="Include release candidates")
+
+    download_parser = commands.add_parser('download', help="Download firmware for devices")
+    download_parser.add_argument('devices', nargs='*', metavar='DEVICE', help="Device names (default: all)")
+    download_parser.add_argument('--version', help="Release to download (default: latest)")
+    download_parser.add_argument('--force', '-f', action='store_true',
+                                 help="Download even for devices already on that release")
+    download_parser.add_argument('--jobs', '-j', type=int, help="Maximum concurrent downloads")
+    return parser.parse_args(argv)
+
+
+def run_command(manager: OpenWrtFirmwareManager, args: argparse.Namespace) -> int:
+    """Execute a CLI command; exit code 1 on failures, 2 when ``check`` finds updates."""
+    if args.command == 'versions':
+        result = [version for version in manager.index.versions
+                  if args.prerelease or not is_prerelease(version)]
+        if not args.json:
+            manager.console.print("\n".join(result))
+        code = 0
+    elif args.command == 'download':
+        result = manager.download(manager.find_devices(args.devices), args.version, args.force, args.jobs)
+        code = 0 if all(entry['status'] != 'failed' for entry in result) else 1
+    else:
+        devices = getattr(args, 'devices', None)
+        result = manager.check(manager.find_devices(devices or []), getattr(args, 'current', None),
+                               getattr(args, 'prerelease', False))
+        if not args.json:
+            manager.print_check_report(result)
+        code = 2 if any(entry['status'] == UPDATE_AVAILABLE for entry in result) else 0
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    return code
+
+
+def main(argv: List[str] = None):
+    args = parse_args(argv)
+    try:
+        iso_manager = ISOManager(args.config, args.iso_dir, quiet=args.quiet)
+        if args.json and not args.quiet:
+            iso_manager.console = Console(stderr=True)
+        with OpenWrtFirmwareManager(args.devices_file, iso_manager) as manager:
+            code = run_command(manager, args)
+        sys.exit(code)
+    except Exception as e:
+        Console(stderr=True).print(f"[bold red]Fatal error:[/] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
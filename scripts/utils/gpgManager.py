@@ -1,8 +1,9 @@
 import os
 import sys
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash
 from datetime import datetime
+from werkzeug.utils import secure_filename
 
 # Get the directory of the current file
 current_dir = Path(__file__).parent.absolute()
@@ -12,7 +13,9 @@ project_root = current_dir.parent
 # Add the project root to the Python path
 sys.path.append(str(project_root))
 
-from core.gpg_manager import GPGKeyManager
+from core.gpg_manager import BatchSigner, GPGError, GPGKeyManager, JobQueue, PathError, QueueFullError
+from core.gpg_manager.keyring import SORTS, STATUSES
+from core.gpg_manager.signing import MANIFEST_NAME
 # Set up paths
 template_dir = os.path.join(project_root, 'core', 'gpg_manager', 'templates')
 static_dir = os.path.join(project_root, 'core', 'gpg_manager', 'static')
@@ -24,6 +27,23 @@ app.secret_key = os.urandom(24)
 # Initialize GPG key manager
 gpg_manager = GPGKeyManager()
 
+# Key generation runs on a background worker pool so it does not block web
+# workers. Jobs live in this process: run gunicorn with one worker and
+# several threads (see the Dockerfile) so status polls reach the same process.
+keygen_jobs = JobQueue(workers=int(os.environ.get('GPG_KEYGEN_WORKERS', 2)),
+                       max_queued=int(os.environ.get('GPG_KEYGEN_QUEUE', 16)),
+                       name='keygen')
+
+# Detached signing of files below GPG_SIGN_ROOT (the repository's iso/ tree by
+# default). Batch requests become jobs; each batch hashes and signs its files on
+# a pool of GPG_SIGN_WORKERS threads (default: one per CPU), one gpg process each.
+signer = BatchSigner(gpg_manager,
+                     os.environ.get('GPG_SIGN_ROOT', os.path.join(project_root.parent, 'iso')),
+                     workers=int(os.environ.get('GPG_SIGN_WORKERS', 0)) or None)
+signing_jobs = JobQueue(workers=int(os.environ.get('GPG_SIGN_BATCHES', 2)),
+                        max_queued=int(os.environ.get('GPG_SIGN_QUEUE', 16)),
+                        name='sign')
+
 # Initialize Git GPG setup
 try:
     from core.gpg_manager.git_gpg_setup import GitGPGSetup
@@ -48,47 +68,119 @@ app.jinja_env.filters['timestamp_to_date'] = timestamp_to_date
 def inject_now():
     return {'now': int(datetime.now().timestamp())}
 
+# URL of the current page with one query parameter changed (pagination links)
+@app.template_global()
+def page_url(param, value):
+    args = request.args.to_dict()
+    args[param] = value
+    return url_for(request.endpoint, **args)
+
 @app.route('/')
 def index():
     return redirect(url_for('list_keys'))
 
 @app.route('/keys')
 def list_keys():
-    public_keys = gpg_manager.list_keys(secret=False)
-    secret_keys = gpg_manager.list_keys(secret=True)
+    # Search, filter and paginate on the server so the page stays small for large keyrings
+    query = request.args.get('q', '').strip()
+    status = request.args.get('status', 'all')
+    status = status if status in STATUSES else 'all'
+    sort = request.args.get('sort', 'keyring')
+    sort = sort if sort in SORTS else 'keyring'
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+    
+    if request.args.get('format') == 'json':
+        secret = request.args.get('secret', 'false').lower() == 'true'
+        return jsonify(gpg_manager.search_keys(query, secret=secret, status=status, sort=sort,
+                                               page=request.args.get('page', 1, type=int),
+                                               per_page=per_page))
+    
+    public_keys = gpg_manager.search_keys(query, secret=False, status=status, sort=sort,
+                                          page=request.args.get('page', 1, type=int),
+                                          per_page=per_page)
+    secret_keys = gpg_manager.search_keys(query, secret=True, status=status, sort=sort,
+                                          page=request.args.get('secret_page', 1, type=int),
+                                          per_page=per_page)
     return render_template('keys.html', 
                          public_keys=public_keys, 
-                         secret_keys=secret_keys)
+                         secret_keys=secret_keys,
+                         query=query,
+                         status=status,
+                         sort=sort,
+                         per_page=per_page,
+                         statuses=STATUSES,
+                         sorts=SORTS)
+
+def _generate_key_job(**params):
+    """Run GPGKeyManager.generate_key on a job worker, failing the job if gpg failed."""
+    result = gpg_manager.generate_key(**params)
+    if not result.get('fingerprint'):
+        raise RuntimeError(result.get('error') or result.get('status'))
+    return result
 
 @app.route('/keys/generate', methods=['GET', 'POST'])
 def generate_key():
     if request.method == 'POST':
+        # Accept JSON bodies from scripts as well as the HTML form
+        wants_json = request.is_json
+        form = (request.get_json(silent=True) or {}) if wants_json else request.form
         try:
-            name = request.form.get('name')
-            email = request.form.get('email')
-            passphrase = request.form.get('passphrase')
+            name = form.get('name')
+            email = form.get('email')
+            passphrase = form.get('passphrase')
             
             if not all([name, email, passphrase]):
+                if wants_json:
+                    return jsonify(error='Name, email, and passphrase are required'), 400
                 flash('Name, email, and passphrase are required', 'error')
                 return redirect(url_for('generate_key'))
                 
-            result = gpg_manager.generate_key(
+            job = keygen_jobs.submit(
+                'generate_key', f'{name} <{email}>', _generate_key_job,
                 name=name,
                 email=email,
                 passphrase=passphrase,
-                key_type=request.form.get('key_type', 'RSA'),
-                key_length=int(request.form.get('key_length', 4096)),
-                expire_date=request.form.get('expire_date', '1y')
+                key_type=form.get('key_type', 'RSA'),
+                key_length=int(form.get('key_length', 4096)),
+                expire_date=form.get('expire_date', '1y')
             )
-            flash('Key generated successfully!', 'success')
-            return redirect(url_for('list_keys'))
-            
+        except QueueFullError as e:
+            if wants_json:
+                return jsonify(error=str(e)), 503, {'Retry-After': '30'}
+            flash(f'Key generation queue is full: {str(e)}', 'error')
+            return redirect(url_for('generate_key'))
         except Exception as e:
+            if wants_json:
+                return jsonify(error=str(e)), 400
             flash(f'Error generating key: {str(e)}', 'error')
             return redirect(url_for('generate_key'))
+        
+        status_url = url_for('key_job_status', job_id=job['id'])
+        if wants_json:
+            return jsonify(dict(job, status_url=status_url)), 202, {'Location': status_url}
+        return redirect(url_for('key_job', job_id=job['id']))
     
     return render_template('generate_key.html')
 
+@app.route('/keys/jobs')
+def key_jobs():
+    return jsonify(jobs=keygen_jobs.jobs(), **keygen_jobs.stats())
+
+@app.route('/keys/jobs/<job_id>')
+def key_job(job_id):
+    job = keygen_jobs.get(job_id)
+    if job is None:
+        flash('Unknown or expired key generation job', 'error')
+        return redirect(url_for('list_keys'))
+    return render_template('key_job.html', job=job)
+
+@app.route('/keys/jobs/<job_id>/status')
+def key_job_status(job_id):
+    job = keygen_jobs.get(job_id)
+    if job is None:
+        return jsonify(error='Unknown or expired job'), 404
+    return jsonify(job)
+
 @app.route('/keys/delete/<fingerprint>', methods=['POST'])
 def delete_key(fingerprint):
     try:
@@ -178,6 +270,190 @@ def export_key(fingerprint):
         flash(f'Error exporting key: {str(e)}', 'error')
         return redirect(url_for('list_keys'))
 
+@app.route('/keys/import', methods=['GET', 'POST'])
+def import_keys():
+    if request.method == 'GET':
+        return render_template('import_keys.html')
+    
+    # Forms may upload several files and/or paste keys; anything else is a key
+    # bundle in the raw body, streamed to gpg as it arrives
+    wants_json = request.mimetype not in ('multipart/form-data', 'application/x-www-form-urlencoded')
+    if wants_json:
+        sources = [request.stream]
+    else:
+        sources = [upload.stream for upload in request.files.getlist('file') if upload.filename]
+        if request.form.get('key_data', '').strip():
+            sources.append(request.form['key_data'])
+        if not sources:
+            flash('Select key files or paste keys to import', 'error')
+            return redirect(url_for('import_keys'))
+    
+    try:
+        result = gpg_manager.import_keys(sources)
+    except Exception as e:
+        if wants_json:
+            return jsonify(error=str(e)), 500
+        flash(f'Error importing keys: {str(e)}', 'error')
+        return redirect(url_for('import_keys'))
+    
+    if wants_json:
+        return jsonify(result), 200 if result['status'] == 'success' else 400
+    if result['status'] != 'success':
+        flash(f"No keys imported: {result['message'] or 'no valid key data found'}", 'error')
+        return redirect(url_for('import_keys'))
+    counts = result['counts']
+    flash(f"Processed {result['imported']} key(s): {counts.get('imported', 0)} new, "
+          f"{counts.get('unchanged', 0)} unchanged, {counts.get('sec_imported', 0)} secret key(s) imported", 'success')
+    return redirect(url_for('list_keys'))
+
+@app.route('/keys/export', methods=['GET', 'POST'])
+def export_keys():
+    # Selected fingerprints (query string, form or JSON list); none exports the whole public keyring
+    if request.is_json:
+        fingerprints = (request.get_json(silent=True) or {}).get('fingerprints') or []
+    else:
+        fingerprints = request.values.getlist('fingerprint')
+    armor = request.values.get('armor', 'true').lower() != 'false'
+    from_form = request.method == 'POST' and not request.is_json
+    if from_form and not fingerprints:
+        flash('Select the keys to export', 'error')
+        return redirect(url_for('list_keys'))
+    
+    try:
+        chunks = gpg_manager.export_keys(fingerprints, armor=armor)
+    except GPGError as e:
+        if from_form:
+            flash(f'Error exporting keys: {str(e)}', 'error')
+            return redirect(url_for('list_keys'))
+        return jsonify(error=str(e), missing=e.missing), 404
+    
+    name = f'gpg_public_keys_{len(fingerprints)}' if fingerprints else 'gpg_public_keyring'
+    return Response(chunks, mimetype='application/pgp-keys' if armor else 'application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename="{name}.{"asc" if armor else "gpg"}"'})
+
+@app.route('/sign', methods=['GET', 'POST'])
+def sign():
+    if request.method == 'GET':
+        return render_template('sign.html', keys=gpg_manager.list_keys(secret=True))
+    
+    # An uploaded file from the form, or the data itself as the raw request body,
+    # which is hashed and piped to gpg as it arrives
+    from_form = request.mimetype == 'multipart/form-data'
+    if from_form:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Select a file to sign', 'error')
+            return redirect(url_for('sign'))
+        source, name, params = upload.stream, upload.filename, request.form
+        passphrase = request.form.get('passphrase') or None
+    else:
+        source, name, params = request.stream, request.args.get('name', 'data'), request.args
+        passphrase = request.headers.get('X-GPG-Passphrase')
+    armor = params.get('armor', 'true').lower() != 'false'
+    
+    result = gpg_manager.sign_detached(source, key=params.get('key') or None,
+                                       passphrase=passphrase, armor=armor)
+    if result['status'] != 'success':
+        if from_form:
+            flash(f"Signing failed: {result['message']}", 'error')
+            return redirect(url_for('sign'))
+        return jsonify({k: v for k, v in result.items() if k != 'signature'}), 400
+    
+    filename = (secure_filename(name) or 'data') + ('.asc' if armor else '.sig')
+    return result['signature'], 200, {
+        'Content-Type': 'application/pgp-signature' if armor else 'application/octet-stream',
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        f"X-Checksum-{result['algorithm'].upper()}": result['digest']
+    }
+
+@app.route('/verify', methods=['POST'])
+def verify():
+    wants_json = request.args.get('format') == 'json'
+    upload = request.files.get('file')
+    signature = request.files.get('signature')
+    if not upload or not signature:
+        if wants_json:
+            return jsonify(error='Both a file and its signature are required'), 400
+        flash('Select both a file and its signature', 'error')
+        return redirect(url_for('sign'))
+    
+    result = gpg_manager.verify_detached_file(upload.stream, signature.read())
+    if wants_json:
+        return jsonify(result)
+    if result['valid']:
+        flash(f"Good signature on {upload.filename} from {result['username']} ({result['fingerprint']}), "
+              f"{result['algorithm'].upper()} {result['digest']}", 'success')
+    else:
+        flash(f"Verification of {upload.filename} failed: {result['message']}", 'error')
+    return redirect(url_for('sign'))
+
+def _batch_files(data, key='files'):
+    """Paths of a batch request, checked to exist below the signing root."""
+    files = data.get(key) or []
+    if not isinstance(files, list) or not all(isinstance(name, str) for name in files):
+        raise PathError(f'{key} must be a list of paths relative to the signing root')
+    missing = [name for name in files if not os.path.isfile(signer.resolve(name))]
+    if missing:
+        raise PathError(f"Not found: {', '.join(missing[:10])}")
+    return files
+
+def _batch_accepted(job):
+    status_url = url_for('sign_job_status', job_id=job['id'])
+    return jsonify(dict(job, status_url=status_url)), 202, {'Location': status_url}
+
+@app.route('/sign/batch', methods=['POST'])
+def sign_batch():
+    data = request.get_json(silent=True) or {}
+    try:
+        files = _batch_files(data)
+        if not files:
+            raise PathError('files must list at least one path')
+        manifest = data.get('manifest', MANIFEST_NAME)
+        if manifest:
+            signer.resolve(manifest)
+        job = signing_jobs.submit(
+            'sign', f'Sign {len(files)} file(s)', signer.sign, files,
+            key=data.get('key'),
+            passphrase=data.get('passphrase'),
+            armor=bool(data.get('armor', True)),
+            detached=bool(data.get('detached', True)),
+            manifest=manifest
+        )
+    except PathError as e:
+        return jsonify(error=str(e)), 400
+    except QueueFullError as e:
+        return jsonify(error=str(e)), 503, {'Retry-After': '30'}
+    return _batch_accepted(job)
+
+@app.route('/verify/batch', methods=['POST'])
+def verify_batch():
+    data = request.get_json(silent=True) or {}
+    try:
+        files = _batch_files(data)
+        manifest = data.get('manifest')
+        if manifest:
+            signer.resolve(manifest)
+        if not files and not manifest:
+            raise PathError('Give files and/or a manifest to verify')
+        description = f'Verify {len(files)} file(s)' + (f' and {manifest}' if manifest else '')
+        job = signing_jobs.submit('verify', description, signer.verify, files, manifest=manifest)
+    except PathError as e:
+        return jsonify(error=str(e)), 400
+    except QueueFullError as e:
+        return jsonify(error=str(e)), 503, {'Retry-After': '30'}
+    return _batch_accepted(job)
+
+@app.route('/sign/jobs')
+def sign_jobs():
+    return jsonify(jobs=signing_jobs.jobs(), root=signer.root, pool=signer.workers, **signing_jobs.stats())
+
+@app.route('/sign/jobs/<job_id>')
+def sign_job_status(job_id):
+    job = signing_jobs.get(job_id)
+    if job is None:
+        return jsonify(error='Unknown or expired job'), 404
+    return jsonify(job)
+
 @app.route('/git/setup', methods=['GET', 'POST'])
 def git_setup():
     if git_gpg is None:
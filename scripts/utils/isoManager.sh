@@ -9,23 +9,23 @@ REQUIREMENTS="$REPO_ROOT/core/iso_manager/requirements.txt"
 
 # Check if Python 3 is available
 if ! command -v python3 &> /dev/null; then
-    echo "❌ Python 3 is required but not installed. Please install Python 3 and try again."
+    echo "❌ Python 3 is required but not installed. Please install Python 3 and try again." >&2
     exit 1
 fi
 
 # Check if pip is available
 if ! command -v pip3 &> /dev/null; then
-    echo "❌ pip3 is required but not installed. Please install pip3 and try again."
+    echo "❌ pip3 is required but not installed. Please install pip3 and try again." >&2
     exit 1
 fi
 
 # Function to install requirements
 install_requirements() {
-    echo "🔧 Installing/updating Python dependencies..."
-    if ! pip3 install --user -r "$REQUIREMENTS"; then
-        echo "❌ Failed to install requirements. Trying with --break-system-packages..."
-        pip3 install --user --break-system-packages -r "$REQUIREMENTS" || {
-            echo "❌ Failed to install requirements. Please check your Python/pip setup."
+    echo "🔧 Installing/updating Python dependencies..." >&2
+    if ! pip3 install --user -r "$REQUIREMENTS" >&2; then
+        echo "❌ Failed to install requirements. Trying with --break-system-packages..." >&2
+        pip3 install --user --break-system-packages -r "$REQUIREMENTS" >&2 || {
+            echo "❌ Failed to install requirements. Please check your Python/pip setup." >&2
             exit 1
         }
     fi
@@ -35,7 +35,7 @@ install_requirements() {
 run_iso_manager() {
     # Check if the Python script exists
     if [ ! -f "$PY_SCRIPT" ]; then
-        echo "❌ ISO Manager script not found at: $PY_SCRIPT"
+        echo "❌ ISO Manager script not found at: $PY_SCRIPT" >&2
         exit 1
     fi
 
@@ -44,12 +44,20 @@ run_iso_manager() {
         install_requirements
     fi
 
-    # Run the ISO manager
-    echo "---------------------------------------"
-    echo "       TuxTechIaaC : isoManager"
-    echo "---------------------------------------"
-    echo "🚀 Starting "
-    echo 
+    # Run the ISO manager. Wrapper messages go to stderr so stdout carries only
+    # the manager's own output (e.g. `list --json`); --json/--quiet skip the banner.
+    case " $* " in
+        *" --json "*|*" --quiet "*|*" -q "*) ;;
+        *)
+            {
+                echo "---------------------------------------"
+                echo "       TuxTechIaaC : isoManager"
+                echo "---------------------------------------"
+                echo "🚀 Starting "
+                echo
+            } >&2
+            ;;
+    esac
     python3 "$PY_SCRIPT" "$@"
 }
 